@@ -4,7 +4,14 @@ import os
 import optparse
 import fileinput
 import string
+import glob
+import json
+import hashlib
+import collections
 from argparse import ArgumentParser
+# Shared Python library of the pipeline
+sys.path.insert(0, '{}/supmat/lib'.format(os.path.dirname(os.path.abspath(__file__))))
+import pipetrace
 #from pyasp.asp import *
 #from __iggy__ import query, utils, parsers
 
@@ -14,16 +21,20 @@ from argparse import ArgumentParser
 # Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
 
 
+def shell(command):
+  """Run a shell command (as os.system), recorded in the trace with --trace"""
+  return pipetrace.system(command, trace)
+
 def diffanalysis():
   print('----------- [1] Pre-treatment -----------')
-  os.system('sh ./supmat/1-graph-extraction/scripts/run-extract.sh %s' % (ns.icgc))
+  return shell('sh ./supmat/1-graph-extraction/scripts/run-extract.sh %s %s %s %s' % (ns.icgc, ns.up_threshold, ns.down_threshold, ns.padj_threshold))
 def pathrider():
   print('----------- [2] Run pathrider -----------')
   param = 'sh ./supmat/2-pathrider/scripts/run-pathrider.sh %s %s %s' % (ns.sif, ns.dir, ns.b)
   #param1 = 'go run ./supmat/2-pathrider/scripts/pathrider/pathrider.go %s ./supmat/2-pathrider/data/column_name.csv %s' % (ns.sif, ns.dir)
   #go run pathrider.go sif file nodes_name.txt up (se positionner au repertoire de pathrider)
   #os.system(param1)
-  os.system(param)
+  return shell(param)
   
   #traiter le résultat de pathrider (1 et -1)
   #file = '/home/computer/.local/bin/supmat/2-graph-extraction/data/graphesteam.sif'
@@ -38,14 +49,178 @@ def iggyvalidation():
   print('----------- [3] Run iggy + Validation (comparaison) -----------')
   #print('sh /home/computer/.local/bin/supmat/3-iggy/scripts/run-iggy.sh %s %s ${HOME}/.local/bin/supmat/1-diff-analysis/data/GSEA_EMThigh_vs_EMTlow_diffexp.csv 0 0' % (sys.argv[4], sys.argv[1]))
   #os.system('sh ./supmat/3-iggy/scripts/run-iggy.sh %s %s %s' % (ns.sif, ns.obs, ns.icgc))
-  os.system('sh ./supmat/3-iggy/scripts/run-iggy.sh %s' %(ns.icgc))
+  return shell('sh ./supmat/3-iggy/scripts/run-iggy.sh %s' %(ns.icgc))
 def crossvalidation():
   print('----------- [4] Cross-Validation -----------')
-  os.system('sh ./supmat/4-validation/scripts/run-validation.sh %s %s %s %s %s %s' % (ns.sif, ns.icgc, ns.start_sampling, ns.stop_sampling, ns.step_sampling, ns.numbers_run))
+  # A cross-validation interrupted (or whose outputs were removed) with the same inputs and parameters
+  # is resumed; otherwise (changed inputs or parameters, or --force) it is started over
+  return shell('sh ./supmat/4-validation/scripts/run-validation.sh %s %s %s %s %s %s %s %s %s "%s" %s %s %s' % (ns.sif, ns.icgc, ns.start_sampling, ns.stop_sampling, ns.step_sampling, ns.numbers_run, ns.jobs, 'store' if ns.store else 'dirs', 'resume' if 'crossvalidation' in resumableSteps else 'new', ns.tolerance, ns.up_threshold, ns.down_threshold, ns.padj_threshold))
 
 def plot():
   print('----------- [5] Run Plot -----------')
-  os.system('sh ./supmat/5-plots/scripts/run-plots.sh')
+  return shell('sh ./supmat/5-plots/scripts/run-plots.sh')
+
+
+
+# -------------------------------------------------------------
+# Step DAG and content-hashed step cache
+# Each step declares its inputs (files, folders or glob patterns), its outputs and its parameters.
+# Before a step is run, a manifest of its input hashes and parameters is written in MANIFEST_DIR,
+# marked as complete once the step succeeded and produced all its outputs (non-empty files or folders);
+# a step whose complete manifest is unchanged and whose outputs exist is skipped.
+
+MANIFEST_DIR = './supmat/.manifests'
+
+Step = collections.namedtuple('Step', ['num', 'name', 'function', 'deps', 'inputs', 'outputs', 'params'])
+
+# Steps run with the same inputs and parameters as their previous run (interrupted, or whose outputs
+# were removed): they can resume their previous computation (see crossvalidation())
+resumableSteps = set()
+
+def declareSteps():
+  """Declare the steps of the pipeline, in topological order"""
+  return [
+    Step('1', 'diffanalysis', diffanalysis, [],
+      inputs = [ns.icgc, './supmat/1-graph-extraction/scripts', './supmat/lib'],
+      outputs = ['./supmat/2-pathrider/data/updown-noinputs_gen.obs',
+        './supmat/2-pathrider/data/updown-noinputs_gen2.obs',
+        './supmat/2-pathrider/data/genes_name.txt'],
+      params = {'up_threshold': ns.up_threshold, 'down_threshold': ns.down_threshold,
+        'padj_threshold': ns.padj_threshold}),
+    Step('2', 'pathrider', pathrider, ['diffanalysis'],
+      inputs = [ns.sif, ns.b, './supmat/2-pathrider/data/genes_name.txt', './supmat/2-pathrider/scripts',
+        './supmat/lib'],
+      outputs = ['./supmat/2-pathrider/data/out_pathrider.sif',
+        './supmat/2-pathrider/data/out-filtered.sif'],
+      params = {'dir': ns.dir}),
+    Step('3', 'iggyvalidation', iggyvalidation, ['diffanalysis', 'pathrider'],
+      inputs = [ns.icgc, './supmat/2-pathrider/data/out-filtered.sif',
+        './supmat/2-pathrider/data/updown-noinputs_gen.obs', './supmat/3-iggy/scripts', './supmat/lib'],
+      outputs = ['./supmat/3-iggy/data/2345-result.tsv',
+        './supmat/3-iggy/data/2345-result-nochange.tsv'],
+      params = {}),
+    Step('4', 'crossvalidation', crossvalidation, ['diffanalysis', 'pathrider'],
+      inputs = [ns.sif, ns.icgc, './supmat/2-pathrider/data/out-filtered.sif',
+        './supmat/1-graph-extraction/scripts', './supmat/3-iggy/scripts',
+        './supmat/4-validation/scripts', './supmat/lib'],
+      outputs = ['./supmat/4-validation/output/prp-info.csv', './supmat/4-validation/output/prp-done.tsv'],
+      params = {'start_sampling': ns.start_sampling, 'stop_sampling': ns.stop_sampling,
+        'step_sampling': ns.step_sampling, 'numbers_run': ns.numbers_run, 'store': ns.store,
+        'tolerance': ns.tolerance, 'up_threshold': ns.up_threshold, 'down_threshold': ns.down_threshold,
+        'padj_threshold': ns.padj_threshold}),
+    Step('5', 'plot', plot, ['iggyvalidation', 'crossvalidation'],
+      # The results of the cross-validation are given by its sampling plan (seed and input hashes)
+      # and its manifest of completed runs, without hashing each run (nor the store, in which
+      # the statistics scripts record the scores)
+      inputs = ['./supmat/3-iggy/data/2345-result-nochange.tsv',
+        './supmat/4-validation/output/prp-info.csv',
+        './supmat/4-validation/output/prp-plan.tsv',
+        './supmat/4-validation/output/prp-done.tsv',
+        './supmat/4-validation/scripts', './supmat/5-plots/scripts', './supmat/lib'],
+      outputs = ['./supmat/5-plots/data', './supmat/5-plots/plots'],
+      params = {})]
+
+def selectSteps(arg, steps):
+  """Return the names of the steps given by number or by name in a comma-separated argument"""
+  selected = set()
+  for s in arg.split(','):
+    s = s.strip()
+    match = [step.name for step in steps if s in (step.num, step.name)]
+    if len(match) == 0 and s != '':
+      print('WARNING: Unknown step: {}'.format(s))
+    selected.update(match)
+  return selected
+
+def hashFile(fileName, h):
+  """Feed the content of a file into the hash object h"""
+  with open(fileName, 'rb') as f:
+    for chunk in iter(lambda: f.read(1 << 20), b''):
+      h.update(chunk)
+
+def hashInput(path):
+  """Compute the SHA-256 of an input (file, folder or glob pattern); None if it does not exist"""
+  if path is None:
+    return None
+  fileNames = []
+  for match in sorted(glob.glob(path)):
+    if os.path.isdir(match):
+      for root, dirs, files in os.walk(match):
+        dirs.sort()
+        fileNames += [os.path.join(root, f) for f in sorted(files) if f[-4:] != '.pyc']
+    else:
+      fileNames.append(match)
+  if len(fileNames) == 0:
+    return None
+  h = hashlib.sha256()
+  for fileName in fileNames:
+    h.update(fileName.encode('utf-8') + b'\0')
+    hashFile(fileName, h)
+  return h.hexdigest()
+
+def manifestFileName(step):
+  return '{}/{}.json'.format(MANIFEST_DIR, step.name)
+
+def makeManifest(step):
+  """Build the manifest of a step: hashes of its inputs and its parameters"""
+  return {
+    'step': step.name,
+    'inputs': {str(path): hashInput(path) for path in step.inputs},
+    'params': step.params}
+
+def loadManifest(step):
+  """Manifest of the previous run of a step, and whether this run was complete (None, False if none)"""
+  try:
+    with open(manifestFileName(step), 'r') as f:
+      previous = json.load(f)
+  except (OSError, ValueError):
+    return None, False
+  return previous, previous.pop('complete', False) is True
+
+def writeManifest(step, manifest, complete):
+  os.makedirs(MANIFEST_DIR, exist_ok = True)
+  with open(manifestFileName(step), 'w') as f:
+    json.dump(dict(manifest, complete = complete), f, indent = 2, sort_keys = True)
+
+def isProduced(path):
+  """Check that an output is a non-empty file, or a folder containing files"""
+  if os.path.isdir(path):
+    return any(len(files) > 0 for _, _, files in os.walk(path))
+  return os.path.isfile(path) and os.path.getsize(path) > 0
+
+def runStep(step, force, failed):
+  """Run a step unless its inputs are unchanged since its last successful run"""
+  with pipetrace.span(trace, '[{}] {}'.format(step.num, step.name), 'step') as stepArgs:
+    failedDeps = [dep for dep in step.deps if dep in failed]
+    if len(failedDeps) > 0:
+      print('WARNING: step {} not run because of failed step(s): {}'.format(step.name, ', '.join(failedDeps)))
+      stepArgs['status'] = 'not run'
+      return False
+    manifest = makeManifest(step)
+    previous, complete = loadManifest(step)
+    if not force and complete and previous == manifest and all(os.path.exists(path) for path in step.outputs):
+      print('----------- [{}] Skip {} (inputs unchanged, use --force {} to rerun) -----------'.format(step.num, step.name, step.num))
+      stepArgs['status'] = 'skipped'
+      return True
+    missing = [path for path in manifest['inputs'] if manifest['inputs'][path] is None]
+    if len(missing) > 0:
+      print('WARNING: missing inputs for step {}: {}'.format(step.name, ', '.join(missing)))
+    # A previous run with the same inputs and parameters can be resumed; otherwise it is started over
+    if not force and previous == manifest:
+      resumableSteps.add(step.name)
+    # Until the step succeeds, its manifest is incomplete: an interrupted run is not up to date
+    writeManifest(step, manifest, False)
+    status = step.function()
+    stepArgs['status'] = status
+    if status != 0:
+      print('WARNING: step {} failed (exit status {}); manifest left incomplete'.format(step.name, status))
+      return False
+    notProduced = [path for path in step.outputs if not isProduced(path)]
+    if len(notProduced) > 0:
+      print('WARNING: step {} did not produce: {}; manifest left incomplete'.format(step.name, ', '.join(notProduced)))
+      stepArgs['status'] = 'missing outputs'
+      return False
+    writeManifest(step, manifest, True)
+    return True
 
 if __name__ == '__main__':
 
@@ -109,31 +284,40 @@ optional.add_argument('--dir', help='follows the up stream (\'up\') or the down
 required.add_argument('--icgc', help='ICGC file')
 required.add_argument('--b', help='a list of blacklisted genes (weakly expressed)')
 optional.add_argument('--steps', type=str, default='1,2,3,4,5', help='specify the number of the steps to run:\n [1] Graph extraction\n [2] Pathrider\n [3] Iggy\n [4] Cross-Validation\n [5] Plots. (If many, separate by \',\'). Default run all steps')
+optional.add_argument('--up_threshold', type=str, default='2', help='genes with a fold-change above this threshold are observed as up-regulated. Default= 2')
+optional.add_argument('--down_threshold', type=str, default='-0.5', help='genes with a fold-change below this threshold are observed as down-regulated. Default= -0.5')
+optional.add_argument('--padj_threshold', type=str, default='5', help='only the genes with -log10(adjusted p-value) above this threshold are observed. Default= 5')
 optional.add_argument('--start_sampling', type=str, default='10', help='The start sampling percentage. Default= 10')
 optional.add_argument('--stop_sampling', type=str, default='15', help='The stop sampling percentage. Default= 100')
 optional.add_argument('--step_sampling', type=str, default='5', help='The step of sampling. Default= 5')
 optional.add_argument('--numbers_run', type=str, default='2', help='The number of runs on each step. Default= 100')
+optional.add_argument('--jobs', type=str, default='1', help='The number of cross-validation runs computed in parallel. Default= 1')
+optional.add_argument('--tolerance', type=str, default='', help='adaptive number of runs: stop the runs of a sampling once the 95%% confidence intervals of the mean score and number of predictions are within +/- this fraction of their means (--numbers_run is then the maximum)')
+optional.add_argument('--store', action='store_true', help='record the cross-validation runs in a single result store (output/prp-results.db) instead of one folder per run')
+optional.add_argument('--trace', type=str, metavar='FILE', default='', help='record the wall time, CPU time, peak memory and exit status of each step and of the processes it runs (including each Iggy call of the cross-validation) in FILE, in the Chrome trace-event format (open it in chrome://tracing or https://ui.perfetto.dev)')
+optional.add_argument('--force', type=str, nargs='?', const='1,2,3,4,5', default='', help='rerun the given steps (numbers or names, separated by \',\') even if their inputs are unchanged. Without value, force all steps')
 
 ns = parser.parse_args()
 
+# Trace of the run, shared with the scripts of the steps through the environment
+trace = pipetrace.Trace(ns.trace) if ns.trace != '' else None
 
 
-if ns.steps :
-  list_steps=ns.steps.split(',')
+steps = declareSteps()
+selectedSteps = selectSteps(ns.steps, steps)
+forcedSteps = selectSteps(ns.force, steps)
 
+failedSteps = set()
+with pipetrace.span(trace, 'pipe.py', 'pipe', {'steps': ns.steps, 'force': ns.force}) as pipeArgs:
+  for step in steps:
+    if step.name in selectedSteps:
+      if not runStep(step, step.name in forcedSteps, failedSteps):
+        failedSteps.add(step.name)
+  pipeArgs['status'] = 'failed: {}'.format(', '.join(sorted(failedSteps))) if len(failedSteps) > 0 else 0
 
-if '1' in ns.steps:
-  diffanalysis()
-if '2' in ns.steps:
-  pathrider()
-if '3' in ns.steps:
-  iggyvalidation()
-if '4' in ns.steps:
-  crossvalidation()
-if '5' in ns.steps:
-  plot()
+if trace is not None:
+  trace.close()
+  print('Trace written in {}'.format(ns.trace))
 
-if '1' not in ns.steps and '2' not in ns.steps and '3' not in ns.steps and '4' not in ns.steps and '5' not in ns.steps:
+if len(selectedSteps) == 0:
   print('WARNING: Please enter a valid step number')
-
-
@@ -0,0 +1,186 @@
+#!/bin/python3
+#coding=utf-8
+
+# Build the observations of the pipeline from experimental (ICGC) data in a single pass
+# -------------------------------------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+
+###
+# Build the observations of the pipeline from experimental (ICGC) data in a single pass
+###
+# Help:
+#   python build-observations.py --help
+#
+# The experimental data file (TSV, possibly gzipped) is read once, line by line;
+# a gene is observed as up-regulated (+) if its fold-change is > UP and its adjusted p-value
+# is significant (-log10(p-value) > LOGP), and as down-regulated (-) if its fold-change is < DOWN
+# and its p-value is significant, as with the former awk scripts (obs_construction.sh).
+# The requested outputs are all written during this pass, in the order of the data file:
+#   --obs: observation file without suffixes (X = +/-), as updown-noinputs_gen.obs
+#   --obs-gen: observation file (X_gen = +/-), as updown-noinputs_gen2.obs
+#   --names: names of the observed genes (X_gen), as genes_name.txt
+#   --true-up, --true-down: observed genes (X_gen) that are nodes of the network given with --sif
+#     (sorted, without duplicates), as name-true-up_gen.csv and name-true-down_gen.csv
+#     (formerly built from the observation file by construct_trueup_truedown.sh)
+#
+# Example:
+#   python build-observations.py ../../../../example/GSEA_EMThigh_vs_EMTlow_diffexp.csv \
+#     --obs updown-noinputs_gen.obs --obs-gen updown-noinputs_gen2.obs --names genes_name.txt
+###
+
+
+
+import os
+import sys
+import gzip
+import math
+import argparse
+
+# Shared Python library of the pipeline (supmat/lib)
+sys.path.insert(0, '{}/../../lib'.format(os.path.dirname(os.path.abspath(__file__))))
+import sifgraph
+
+
+
+# Suffix of the gene nodes of the network
+GEN_SUFFIX = '_gen'
+
+
+
+# [Argparse] Command line parsing options
+parser = argparse.ArgumentParser(
+  add_help = False,
+  description = """Build the observation files of the pipeline from experimental data in a single pass.""",
+  epilog = """The experimental data file is a TSV file (gzipped if its name ends with .gz)
+    with a header line, containing at least the gene names, fold-changes and adjusted p-values
+    (by default, in the first three columns).""")
+
+parser.add_argument('dataFileName', metavar = 'DATAFILE', type = str,
+  help = 'The experimental data file (for instance ICGC data) in TSV format')
+parser.add_argument('--gene-column', dest = 'geneColumn', metavar = 'COL', type = str, default = '1',
+  help = 'Name (in the header) or number (starting from 1) of the column of the gene names (default: 1)')
+parser.add_argument('--fc-column', dest = 'fcColumn', metavar = 'COL', type = str, default = '2',
+  help = 'Name or number of the column of the fold-changes (default: 2)')
+parser.add_argument('--padj-column', dest = 'padjColumn', metavar = 'COL', type = str, default = '3',
+  help = 'Name or number of the column of the adjusted p-values (default: 3)')
+parser.add_argument('--up', dest = 'up', metavar = 'UP', type = float, default = 2,
+  help = 'Genes with a fold-change > UP are up-regulated (default: 2)')
+parser.add_argument('--down', dest = 'down', metavar = 'DOWN', type = float, default = -0.5,
+  help = 'Genes with a fold-change < DOWN are down-regulated (default: -0.5)')
+parser.add_argument('--log-padj', dest = 'logPadj', metavar = 'LOGP', type = float, default = 5,
+  help = 'Only the genes with -log10(p-value) > LOGP are observed (default: 5)')
+parser.add_argument('--obs', dest = 'obsFileName', metavar = 'FILE', type = str, default = None,
+  help = 'Output observation file without suffixes (X = +/-)')
+parser.add_argument('--obs-gen', dest = 'obsGenFileName', metavar = 'FILE', type = str, default = None,
+  help = 'Output observation file with suffixes (X_gen = +/-)')
+parser.add_argument('--names', dest = 'namesFileName', metavar = 'FILE', type = str, default = None,
+  help = 'Output file of the names of the observed genes (X_gen)')
+parser.add_argument('--sif', dest = 'sifFileName', metavar = 'SIF', type = str, default = None,
+  help = 'The network whose nodes are kept in the lists of --true-up and --true-down')
+parser.add_argument('--true-up', dest = 'trueUpFileName', metavar = 'FILE', type = str, default = None,
+  help = 'Output file of the up-regulated genes (X_gen) that are nodes of the network (requires --sif)')
+parser.add_argument('--true-down', dest = 'trueDownFileName', metavar = 'FILE', type = str, default = None,
+  help = 'Output file of the down-regulated genes (X_gen) that are nodes of the network (requires --sif)')
+parser.add_argument('-v', '--verbose', dest = 'verbose', action = 'store_true',
+  help = 'Print computation steps information on the standard output')
+parser.add_argument('-h', '--help', action = 'help',
+  help = 'Print this help message')
+
+args = parser.parse_args()
+
+if (args.trueUpFileName is not None or args.trueDownFileName is not None) and args.sifFileName is None:
+  print('Arguments error: Options --true-up and --true-down require option --sif', file = sys.stderr)
+  exit(1)
+
+
+
+def openText(fileName):
+  """Open a text file for reading, decompressing it if its name ends with .gz"""
+  if fileName[-3:] == '.gz':
+    return gzip.open(fileName, 'rt')
+  return open(fileName, 'r')
+
+def columnIndex(column, header):
+  """Index of a column given by name (in the header) or by number (starting from 1)"""
+  if column in header:
+    return header.index(column)
+  if column.isdigit() and 1 <= int(column) <= len(header):
+    return int(column) - 1
+  print('Error: no column {} in {} (columns: {})'.format(column, args.dataFileName, ', '.join(header)), file = sys.stderr)
+  exit(1)
+
+def minusLog10(p):
+  """-log10(p), as computed by awk (infinite for 0, NaN for negative values)"""
+  if p > 0:
+    return -math.log(p) / math.log(10)
+  return math.inf if p == 0 else math.nan
+
+
+
+# Nodes of the network (for the true up and down lists), loaded through its binary cache file
+nodes = sifgraph.load(args.sifFileName, cache = True).ids if args.sifFileName is not None else None
+
+outputs = [args.obsFileName, args.obsGenFileName, args.namesFileName]
+outFiles = [open(fileName, 'w') if fileName is not None else None for fileName in outputs]
+trueGenes = {'+': set(), '-': set()}   # Observed genes (X_gen) that are nodes of the network
+numObs = {'+': 0, '-': 0}
+skipped = 0   # Lines without numeric fold-change or p-value
+
+# Single pass over the data
+with openText(args.dataFileName) as dataFile:
+  header = dataFile.readline().rstrip('\r\n').split('\t')
+  geneIndex = columnIndex(args.geneColumn, header)
+  fcIndex = columnIndex(args.fcColumn, header)
+  padjIndex = columnIndex(args.padjColumn, header)
+  lastIndex = max(geneIndex, fcIndex, padjIndex)
+  for line in dataFile:
+    fields = line.rstrip('\r\n').split('\t')
+    if len(fields) <= lastIndex:
+      if line.strip() != '':
+        skipped += 1
+      continue
+    try:
+      fc = float(fields[fcIndex])
+      logPadj = minusLog10(float(fields[padjIndex]))
+    except ValueError:
+      skipped += 1
+      continue
+    if not logPadj > args.logPadj:
+      continue
+    if fc > args.up:
+      sign = '+'
+    elif fc < args.down:
+      sign = '-'
+    else:
+      continue
+    gene = fields[geneIndex]
+    numObs[sign] += 1
+    if outFiles[0] is not None:
+      outFiles[0].write('{} = {}\n'.format(gene, sign))
+    if outFiles[1] is not None:
+      outFiles[1].write('{}{} = {}\n'.format(gene, GEN_SUFFIX, sign))
+    if outFiles[2] is not None:
+      outFiles[2].write('{}{}\n'.format(gene, GEN_SUFFIX))
+    if nodes is not None and gene + GEN_SUFFIX in nodes:
+      trueGenes[sign].add(gene + GEN_SUFFIX)
+
+for outFile in outFiles:
+  if outFile is not None:
+    outFile.close()
+
+# True up and down lists, sorted (as by sort in the C locale)
+for sign, fileName in [('+', args.trueUpFileName), ('-', args.trueDownFileName)]:
+  if fileName is not None:
+    with open(fileName, 'w') as trueFile:
+      trueFile.writelines('{}\n'.format(gene) for gene in sorted(trueGenes[sign]))
+
+if skipped > 0:
+  print('Warning: {} line(s) of {} without numeric fold-change or p-value ignored'.format(skipped, args.dataFileName),
+    file = sys.stderr)
+if args.verbose:
+  print('{} up-regulated and {} down-regulated observations'.format(numObs['+'], numObs['-']))
+  if nodes is not None:
+    print('{} up-regulated and {} down-regulated genes in {}'.format(len(trueGenes['+']), len(trueGenes['-']),
+      args.sifFileName))
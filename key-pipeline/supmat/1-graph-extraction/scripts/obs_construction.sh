@@ -10,11 +10,13 @@
 # Load experimental (ICGC) data and extract the relevant observations
 #
 # Usage:
-#   bash obs_construction.sh icgc_data.csv
+#   bash obs_construction.sh icgc_data.csv [up down logpadj]
 # where icgc_data is the experimental data file (for instance ICGC data) in TSV format containing
-# at least 3 columns: gene names, fold-change and p-value (the other columns are ignored).
+# at least 3 columns: gene names, fold-change and p-value (the other columns are ignored),
+# possibly gzipped (.gz); a gene is observed as + if its fold-change is > up (default: 2),
+# and as - if its fold-change is < down (default: -0.5), provided that -log10(p-value) > logpadj (default: 5)
 #
-# Output: two files are created
+# Output: three files are created (in a single pass over the data, see build-observations.py)
 #   - genes_name.txt: name column file (X_gen)
 #   - updown-noinputs_gen.obs: observation file without suffixes (X = +/-)
 #   - updown-noinputs_gen2.obs: observation file (X_gen = +/-)
@@ -25,15 +27,14 @@
 
 if [ -z "$1" ]
 then
-  echo "Usage: bash obs_construction.sh icgc_data.csv"
+  echo "Usage: bash obs_construction.sh icgc_data.csv [up down logpadj]"
   echo "where icgc_data.csv is the experimental data file in TSV format"
   echo "containing gene names, fold-change and p-values"
   exit
 fi
 
 
-awk -F"\t" 'FNR > 1 {if ($2 > 2  && -log($3)/log(10)>5) print $1 "_gen = +"; else if ($2 < -0.5 && -log($3)/log(10)>5) print $1 "_gen = -";}' "$1" > ./supmat/2-pathrider/data/updown-noinputs_gen2.obs
-awk -F"\t" 'FNR > 1 {if ($2 > 2  && -log($3)/log(10)>5) print $1 " = +"; else if ($2 < -0.5 && -log($3)/log(10)>5) print $1 " = -";}' "$1" > ./supmat/2-pathrider/data/updown-noinputs_gen.obs
-
-#construct column_name.txt
-awk -F" " '{print $1}' ./supmat/2-pathrider/data/updown-noinputs_gen2.obs  > ./supmat/2-pathrider/data/genes_name.txt
+python3 "$(dirname "$0")/build-observations.py" "$1" --up "${2:-2}" --down "${3:--0.5}" --log-padj "${4:-5}" \
+  --obs ./supmat/2-pathrider/data/updown-noinputs_gen.obs \
+  --obs-gen ./supmat/2-pathrider/data/updown-noinputs_gen2.obs \
+  --names ./supmat/2-pathrider/data/genes_name.txt
@@ -6,6 +6,9 @@
 # A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
 # Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
 
+# Stop at the first failing command, so that pipe.py records the step as failed
+set -e
+
 #create data folders
 if [ ! -d ./supmat/2-pathrider/data ]; then
   mkdir -p ./supmat/2-pathrider/data;
@@ -19,7 +22,7 @@ fi
 
 echo "Reading $1.."
 #construction of the observation from the icgc file
-sh ./supmat/1-graph-extraction/scripts/obs_construction.sh $1
+sh ./supmat/1-graph-extraction/scripts/obs_construction.sh $1 $2 $3 $4 || exit 1
 echo "Writing gene names"
 echo "writing observations"
 
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+#coding=utf-8
+
+# Remove the edges of blacklisted genes from a network
+# ----------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+
+###
+# Remove the edges of blacklisted genes from a network
+###
+# Usage:
+#   python3 filter-blacklist.py <blackFile> <networkFile> -o <outFile>
+# Replacement for:
+#   grep -wvi -f <blackFile> <networkFile> > <outFile>
+# with exact, case-insensitive comparisons of the node names (see ../../lib/sifblacklist.py)
+#
+# Complete help:
+#   python3 filter-blacklist.py --help
+###
+
+import os
+import sys
+import argparse
+
+# Shared Python library of the pipeline (supmat/lib)
+sys.path.insert(0, '{}/../../lib'.format(os.path.dirname(os.path.abspath(__file__))))
+import sifblacklist
+
+
+
+# [Argparse] Command line parsing options
+parser = argparse.ArgumentParser(
+  add_help = False,
+  description = 'Remove the edges of blacklisted genes from a network.',
+  epilog = """BLACKFILE lists the blacklisted genes, one per line. An edge of NETWORKFILE is removed
+    if its source or target is a blacklisted gene (with or without the suffix _gen or _prot),
+    or a complex with a blacklisted member.""")
+
+parser.add_argument('blackFile', metavar = 'BLACKFILE', type = str,
+  help = 'The blacklisted genes listed in a file (one gene per line)')
+parser.add_argument('networkFile', metavar = 'NETWORKFILE', type = str,
+  help = 'The network encoded in a SIF file')
+parser.add_argument('-o', '--out', dest = 'outFile',
+  metavar = 'OUTFILE', type = str, action = 'store', required = True,
+  help = 'The output SIF file')
+parser.add_argument('-h', '--help', action = 'help',
+  help = 'Print this help message')
+
+args = parser.parse_args()
+
+try:
+  blacklist = sifblacklist.Blacklist(sifblacklist.loadNames(args.blackFile))
+  kept, removed = sifblacklist.filterSIF(args.networkFile, args.outFile, blacklist)
+except OSError as e:
+  print('Error: {}'.format(e), file = sys.stderr)
+  exit(1)
+print('Blacklist {}: {} edge(s) removed, {} edge(s) kept'.format(args.blackFile, removed, kept))
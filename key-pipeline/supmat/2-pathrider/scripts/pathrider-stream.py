@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+#coding=utf-8
+
+# Find the upstream/downstream paths starting from some nodes of interest in a network
+# ------------------------------------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+
+###
+# Find the upstream/downstream paths starting from some nodes of interest in a network
+###
+# Usage:
+#   python3 pathrider-stream.py [-blacklist <blackFile>] [-out <outFile>] <networkFile> <rootFile> <direction>
+# Drop-in replacement for:
+#   go run pathrider/pathrider.go stream [-blacklist <blackFile>] [-out <outFile>] <networkFile> <rootFile> <direction>
+# with the same output, but without compiling pathrider at each launch
+# and in linear time (see ../../lib/pathstream.py)
+#
+# Complete help:
+#   python3 pathrider-stream.py --help
+###
+
+import os
+import sys
+import argparse
+
+# Shared Python library of the pipeline (supmat/lib)
+sys.path.insert(0, '{}/../../lib'.format(os.path.dirname(os.path.abspath(__file__))))
+import pathstream
+
+
+
+# [Argparse] Command line parsing options
+parser = argparse.ArgumentParser(
+  add_help = False,
+  description = 'Find the upstream/downstream paths starting from some nodes of interest in a network.',
+  epilog = """NETWORKFILE must be a SIF file without multi-edges; ROOTFILE (and BLACKFILE)
+    list the root (and blacklisted) nodes, one node per line.
+    The edges of the paths are written in OUTFILE as a SIF file.""")
+
+parser.add_argument('networkFile', metavar = 'NETWORKFILE', type = str,
+  help = 'The network encoded in a SIF file')
+parser.add_argument('rootFile', metavar = 'ROOTFILE', type = str,
+  help = 'The root nodes listed in a file (one node per line)')
+parser.add_argument('direction', metavar = 'DIRECTION', type = str, choices = ['up', 'down'],
+  help = 'Follows the up stream (up) or the down stream (down)')
+parser.add_argument('-o', '-out', dest = 'outFile',
+  metavar = 'OUTFILE', type = str, action = 'store', default = 'out.sif',
+  help = 'The output SIF file (default: out.sif)')
+parser.add_argument('-b', '-blacklist', dest = 'blackFile',
+  metavar = 'BLACKFILE', type = str, action = 'store', default = None,
+  help = 'A file containing a list of nodes to be blacklisted (one node per line)')
+parser.add_argument('-h', '--help', action = 'help',
+  help = 'Print this help message')
+
+args = parser.parse_args()
+
+edges = pathstream.stream(args.networkFile, args.rootFile, args.direction, args.outFile, args.blackFile)
+if edges is None:
+  exit(1)
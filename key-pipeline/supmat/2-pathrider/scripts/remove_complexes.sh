@@ -28,4 +28,5 @@ then
 fi
 
 #sed '/::/d' "$SIF_FILE" > ./supmat/2-pathrider/data/hsa_without_complexes_graph.sif
-grep -wvi -f ./supmat/0-diff-analysis/data/name-weakly_expressed.txt "$SIF_FILE" > ./supmat/2-pathrider/data/hsa-2345-out-filtered.sif
+#grep -wvi -f ./supmat/0-diff-analysis/data/name-weakly_expressed.txt "$SIF_FILE" > ./supmat/2-pathrider/data/hsa-2345-out-filtered.sif
+python3 "$(dirname "$0")/filter-blacklist.py" ./supmat/0-diff-analysis/data/name-weakly_expressed.txt "$SIF_FILE" -o ./supmat/2-pathrider/data/hsa-2345-out-filtered.sif
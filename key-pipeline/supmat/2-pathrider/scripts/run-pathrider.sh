@@ -6,6 +6,8 @@
 # A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
 # Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
 
+# Stop at the first failing command, so that pipe.py records the step as failed
+set -e
 
 #run pathrider 
 
@@ -17,9 +19,15 @@ echo "Reading $1.."
 echo "Reading gene names.."
 echo "Running Pathrider..."
 #./supmat/2-pathrider/scripts/pathrider stream $1 $2 $3 #-blacklist ./supmat/0-diff-analysis/data/LIHC_primary_weakly_expressed_genes.txt
-go run ./supmat/2-pathrider/scripts/pathrider/pathrider.go stream -blacklist ./supmat/2-pathrider/data/excluded_gen_prot.txt -out ./supmat/2-pathrider/data/out_pathrider.sif $1 ./supmat/2-pathrider/data/genes_name.txt $2 > ./supmat/2-pathrider/pathrider_out.out
+#go run ./supmat/2-pathrider/scripts/pathrider/pathrider.go stream -blacklist ./supmat/2-pathrider/data/excluded_gen_prot.txt -out ./supmat/2-pathrider/data/out_pathrider.sif $1 ./supmat/2-pathrider/data/genes_name.txt $2 > ./supmat/2-pathrider/pathrider_out.out
+# Equivalent in-process implementation (no compilation of pathrider at each launch)
+python3 ./supmat/2-pathrider/scripts/pathrider-stream.py -blacklist ./supmat/2-pathrider/data/excluded_gen_prot.txt -out ./supmat/2-pathrider/data/out_pathrider.sif $1 ./supmat/2-pathrider/data/genes_name.txt $2 > ./supmat/2-pathrider/pathrider_out.out
 #filter the graph from a black list
+# (not redundant with the blacklist of pathrider, which removes the exact nodes <gene>_gen and <gene>_prot
+# before searching the paths: this removes the edges of the nodes it misses, i.e. the complexes
+# with a blacklisted member and the case variants, from the paths found)
 #sh ./supmat/2-pathrider/scripts/remove_complexes.sh ./supmat/2-pathrider/data/out_pathrider.sif
-grep -wvi -f $3 ./supmat/2-pathrider/data/out_pathrider.sif > ./supmat/2-pathrider/data/out-filtered.sif
+#grep -wvi -f $3 ./supmat/2-pathrider/data/out_pathrider.sif > ./supmat/2-pathrider/data/out-filtered.sif
+python3 ./supmat/2-pathrider/scripts/filter-blacklist.py $3 ./supmat/2-pathrider/data/out_pathrider.sif -o ./supmat/2-pathrider/data/out-filtered.sif
 echo "Writing graph filtered"
 
@@ -12,13 +12,23 @@
 ###
 # Usage:
 #   python compare-to-icgc.py [--gen] <ICGC-file> <down-threshold> <up-threshold> [input-file]
+#   python compare-to-icgc.py [--gen] [--output-name <name>] --batch <ICGC-file> <down-threshold> <up-threshold> <input-file>...
+#   python compare-to-icgc.py [--gen] [--sweep-down=<thresholds>] [--sweep-up=<thresholds>] <ICGC-file> <down-threshold> <up-threshold> [input-file]...
 # where <ICGC-file> is the original ICGC file with gene expression fold-change analysis,
 # <down-threshold> and <up-threshold> are the thresholds to consider a down- or up-regulation,
 # and [obspred-file] is an optional file name for the list of observations and predictions
 # produced by Iggy in Cytoscape-readable format (attributes obs:xxx and pred:xxx).
+# With --batch, the ICGC file is loaded once and each input file is annotated into
+# a file <name> (default: result-0.0.tsv) in the same directory as the input file.
+# With --sweep-down and/or --sweep-up, the numbers of matches, weak matches and no-matches
+# are printed for each pair of thresholds of the grid (<down-threshold> and <up-threshold> being
+# used for the axis not swept), for each input file and in total; the thresholds are comma-separated
+# values or ranges from:to:step (use --sweep-down=... for negative values).
 #
 # Typical usage
 #   python compare-to-icgc.py icgc.csv 0 0 obspred.tsv
+#   python compare-to-icgc.py --gen --batch icgc.csv 0 0 output/prp*/*/obspred.tsv
+#   python compare-to-icgc.py --gen --sweep-down=-2:0:0.25 --sweep-up=0:2:0.25 icgc.csv 0 0 output/prp*/*/result-0.0.tsv
 #
 # Complete help:
 #   python compare-to-icgc.py --help
@@ -26,9 +36,34 @@
 # Remark: A dot (.) was found in the ICGC data file; check if this is a problem
 ###
 
+import os
 import sys
 import csv
 import argparse
+import numpy as np
+
+# Shared Python library of the pipeline (supmat/lib)
+sys.path.insert(0, '{}/../../lib'.format(os.path.dirname(os.path.abspath(__file__))))
+import iggypost
+
+
+
+def thresholdValues(s):
+  """Thresholds of a sweep axis, given as comma-separated values or ranges from:to:step"""
+  values = []
+  for part in s.split(','):
+    try:
+      bounds = [float(x) for x in part.split(':')]
+    except ValueError:
+      raise argparse.ArgumentTypeError('invalid thresholds: {}'.format(part))
+    if len(bounds) == 1:
+      values += bounds
+    elif len(bounds) == 3 and bounds[2] > 0 and bounds[0] <= bounds[1]:
+      n = int(np.floor((bounds[1] - bounds[0]) / bounds[2] + 1e-9)) + 1
+      values += list(np.round(bounds[0] + bounds[2] * np.arange(n), 10))
+    else:
+      raise argparse.ArgumentTypeError('invalid range of thresholds: {}'.format(part))
+  return values
 
 
 
@@ -41,7 +76,13 @@ parser = argparse.ArgumentParser(
     OBSPREDFILE should be a tab-delimited CSV file containing in its first two columns
     the gene names and the related Iggy predictions in format obs:xxx and pred:xxx.
     If omitted, this data is read from the standard input.
-    The result appends columns to Iggy results to detail the comparison with ICGC data.""")
+    The result appends columns to Iggy results to detail the comparison with ICGC data.
+    With --batch, several OBSPREDFILE can be given, and each result is written
+    next to its OBSPREDFILE instead of the standard output.
+    With --sweep-down and/or --sweep-up, several OBSPREDFILE can be given (such as the result files
+    of a cross-validation), and the numbers of matches, weak matches and no-matches of predictions
+    and observations are printed for each OBSPREDFILE and each pair of thresholds DOWN <= UP
+    of the grid, followed by their totals over all OBSPREDFILE.""")
 
 parser.add_argument('dataFileName', metavar = 'ICGCFILE',
   type = str,
@@ -52,137 +93,138 @@ parser.add_argument('downT', metavar = 'DOWN',
 parser.add_argument('upT', metavar = 'UP',
   type = float,
   help = 'The threshold to consider an up-regulation')
-parser.add_argument('obspredFile', metavar = 'OBSPREDFILE',
-  type = str, nargs = '?',
+parser.add_argument('obspredFiles', metavar = 'OBSPREDFILE',
+  type = str, nargs = '*',
   help = 'The observations & predictions file (read from standard input if omitted)')
 parser.add_argument('--gen',
   dest = 'suffix', action = 'store_true',
   help = 'Remove _gen and _prot suffixes (adds a type column)')
+parser.add_argument('--batch',
+  dest = 'batch', action = 'store_true',
+  help = 'Annotate all the given OBSPREDFILE, each result being written in the directory of its OBSPREDFILE')
+parser.add_argument('--output-name',
+  dest = 'outputName', type = str, default = 'result-0.0.tsv',
+  help = 'Name of the result files in batch mode (default: result-0.0.tsv)')
+parser.add_argument('--sweep-down',
+  dest = 'sweepDown', metavar = 'THRESHOLDS', type = thresholdValues,
+  help = 'Sweep the down-regulation threshold over comma-separated values or ranges from:to:step (instead of DOWN)')
+parser.add_argument('--sweep-up',
+  dest = 'sweepUp', metavar = 'THRESHOLDS', type = thresholdValues,
+  help = 'Sweep the up-regulation threshold over comma-separated values or ranges from:to:step (instead of UP)')
 parser.add_argument('-h', '--help',
   action = 'help',
   help = 'Print this help message')
 
 args = parser.parse_args()
+sweep = args.sweepDown is not None or args.sweepUp is not None
 
+if sweep and args.batch:
+  parser.error('--batch cannot be used with --sweep-down or --sweep-up')
+if not args.batch and not sweep and len(args.obspredFiles) > 1:
+  parser.error('several OBSPREDFILE require --batch')
+if args.batch and len(args.obspredFiles) == 0:
+  parser.error('--batch requires at least one OBSPREDFILE')
 
 
-# Define what weakly matches
-weakMatch = [
-# Predictions
-  ('-', 'NOT+'),
-  ('-', 'CHANGE'),
-  ('+', 'NOT-'),
-  ('+', 'CHANGE'),
-  ('0', 'NOT+'),
-  ('0', 'NOT-'),
-# Observations
-  ('-', 'notPlus'),
-  ('+', 'notMinus'),
-  ('0', 'notPlus'),
-  ('0', 'notMinus')
-]
 
 # Handle thresholds
-downRegThreshold = min(args.downT, args.upT)
-upRegThreshold = max(args.downT, args.upT)
-if downRegThreshold == upRegThreshold and downRegThreshold != 0:
-  print('Warning: identical non-null thresholds ({})'.format(downRegThreshold), sys.stderr)
-
+if sweep:
+  # Grid of the pairs of thresholds down <= up
+  downGrid, upGrid = np.meshgrid(args.sweepDown if args.sweepDown is not None else [args.downT],
+    args.sweepUp if args.sweepUp is not None else [args.upT], indexing = 'ij')
+  keep = downGrid <= upGrid
+  downTs, upTs = downGrid[keep], upGrid[keep]
+  if len(downTs) == 0:
+    parser.error('no pair of thresholds with DOWN <= UP in the sweep')
+downRegThreshold, upRegThreshold = iggypost.thresholds(args.downT, args.upT)
 
+# Open and parse the ICGC data (fold-changes indexed by gene name)
+dataFC = iggypost.loadICGC(args.dataFileName)
 
-# Open and parse the ICGC data
-dataName = []
-dataFC = []
-with open(args.dataFileName, 'r') as fdata:
-  dataReader = csv.reader(fdata, delimiter='\t')
-  # Ignore first line
-  next(dataReader)
-  # Check type (upreg, downreg, nochange)
-  for row in dataReader:
-    dataName.append(row[0])
-    dataFC.append(row[1])
 
 
+def compare(f, name):
+  """Compare the observations & predictions read in f (input file name) to the ICGC data;
+  return the list of result rows, or None in case of parsing error (printed on the standard error)"""
+  inputReader = csv.reader(f, delimiter='\t')
+  header = next(inputReader)
+  try:
+    return [iggypost.resultHeader(header, args.suffix)] + list(iggypost.compareRows(inputReader,
+      dataFC, downRegThreshold, upRegThreshold, args.suffix))
+  except ValueError as e:
+    print('Error: cannot annotate {}: {}'.format(name, e), file = sys.stderr)
+    return None
+
+
+def sweepRows(name, counts, notFound):
+  """Result rows of a sweep for an input name"""
+  for i in range(len(downTs)):
+    yield [name, downTs[i], upTs[i]] + [counts[(infoIggy, comp)][i]
+      for infoIggy in ['pred', 'obs'] for comp in iggypost.COMPARISONS] + [notFound]
+
+
+
+# Sweep mode: count the comparisons of every file for each pair of thresholds
+if sweep:
+  failed = 0
+  totalCounts = {key: np.zeros(len(downTs), dtype = int) for key in iggypost.sweepCounts({}, downTs, upTs)}
+  totalNotFound = 0
+  iggypost.writeResult([['input', 'down', 'up'] + ['{}:{}'.format(infoIggy, comp)
+    for infoIggy in ['pred', 'obs'] for comp in iggypost.COMPARISONS] + ['not-found']], sys.stdout)
+  for obspredFile in args.obspredFiles if len(args.obspredFiles) > 0 else ['-']:
+    try:
+      with (open(obspredFile, 'r') if obspredFile != '-' else sys.stdin) as f:
+        inputReader = csv.reader(f, delimiter='\t')
+        next(inputReader)
+        groups, notFound = iggypost.foldChangeGroups(inputReader, dataFC, args.suffix)
+    except (OSError, StopIteration, ValueError) as e:
+      print('Error: cannot read {}: {}'.format(obspredFile, e if str(e) else 'empty file'), file = sys.stderr)
+      failed += 1
+      continue
+    counts = iggypost.sweepCounts(groups, downTs, upTs)
+    iggypost.writeResult(sweepRows(obspredFile, counts, notFound), sys.stdout)
+    for key in totalCounts:
+      totalCounts[key] += counts[key]
+    totalNotFound += notFound
+  if len(args.obspredFiles) > 1:
+    iggypost.writeResult(sweepRows('total', totalCounts, totalNotFound), sys.stdout)
+  if failed > 0:
+    print('Error: {} of {} files could not be read'.format(failed, len(args.obspredFiles)), file = sys.stderr)
+    exit(1)
+  exit(0)
+
+# Batch mode: annotate every file, each result next to its input
+if args.batch:
+  failed = 0
+  for obspredFile in args.obspredFiles:
+    try:
+      with open(obspredFile, 'r') as f:
+        resList = compare(f, obspredFile)
+    except (OSError, StopIteration) as e:
+      print('Error: cannot read {}: {}'.format(obspredFile, e if str(e) else 'empty file'), file = sys.stderr)
+      resList = None
+    if resList is None:
+      failed += 1
+      continue
+    with open(os.path.join(os.path.dirname(obspredFile), args.outputName), 'w') as fout:
+      iggypost.writeResult(resList, fout)
+  if failed > 0:
+    print('Error: {} of {} files could not be annotated'.format(failed, len(args.obspredFiles)), file = sys.stderr)
+    exit(1)
+  exit(0)
 
 # Read on standard input or in a file if a name is specified
-if args.obspredFile is None:
+if len(args.obspredFiles) == 0:
   f = sys.stdin
 else:
-  f = open(args.obspredFile, 'r')
+  f = open(args.obspredFiles[0], 'r')
 
 # Parse and treat input
-resList = []
 try:
-  inputReader = csv.reader(f, delimiter='\t')
-  row = next(inputReader)
-  resList.append([row[0], row[1], 'diffexp-icgc', 'obs-icgc', 'comp'])
-
-  if args.suffix:
-    resList[0].append('type')
-  
-  # Main loop
-  for row in inputReader:
-    gene = row[0]  # Gene name
-    trueName = gene   # Gene name without suffix
-    obspred = row[1]  # Iggy's observation or prediction
-    
-    # Iggy change type (+, -, 0, etc.)
-    typeIggy = ''
-    if obspred[0:4] == 'obs:':
-      infoIggy = 'obs'
-      typeIggy = obspred[4:]
-    elif obspred[0:5] == 'pred:':
-      infoIggy = 'pred'
-      typeIggy = obspred[5:]
-    else:
-      print("Error in parsing input: {}".format(obspred))
-      exit()  # TODO: Turn into exception or error value
-    
-    # Extract true gene name & type
-    if args.suffix:
-      geneType = 'unknown'
-      if gene[-4:] == '_gen':
-        trueName = gene[:-4]
-        geneType = 'gen'
-      elif gene[-5:] == '_prot':
-        trueName = gene[:-5]
-        geneType = 'prot'
-      elif '::' in gene:
-        geneType = 'complex'
-    
-    # Search for gene in ICGC data
-    if dataName.count(trueName) == 0:
-      fc = 'not-found'
-      typeICGC = 'not-found'
-      comp = 'not-found'
-    else:
-      idx = dataName.index(trueName)  # Index in ICGC data
-      fc = float(dataFC[idx])  # Fold-change value
-      
-      # ICGC-only change type given fold-change and thresholds
-      typeICGC = ''
-      if fc < downRegThreshold:
-        typeICGC = '-'
-      elif fc > upRegThreshold:
-        typeICGC = '+'
-      else:
-        typeICGC = '0'
-      
-      # Compare ICGC and Iggy change types in predictions or observations
-      if typeICGC == typeIggy:
-        comp = 'match'
-      elif (typeICGC, typeIggy) in weakMatch:
-        comp = 'weak-match'
-      else:
-        comp = 'no-match'
-    
-    resList.append([gene, obspred, fc, 'icgc:' + typeICGC, infoIggy + ':' + comp])
-    if args.suffix:
-      resList[-1].append(geneType)
+  resList = compare(f, args.obspredFiles[0] if len(args.obspredFiles) > 0 else 'the standard input')
 finally:
   f.close()
+if resList is None:
+  exit(1)
 
-outputWriter = csv.writer(sys.stdout, delimiter='\t', quoting=csv.QUOTE_NONE)
-for row in resList:
-  outputWriter.writerow(row)
-
+iggypost.writeResult(resList, sys.stdout)
@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+#coding=utf-8
+
+# General post-processing on the output of Iggy
+# ---------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+
+###
+# General post-processing on the output of Iggy
+###
+# Same purpose, arguments and result as post-processing-iggy.sh, in a single process
+# (see ../../lib/iggypost.py):
+#   - Extract the observations and predictions from the output file
+#   - Format in CSV (Cytoscape-compatible)
+#   - Compare the results with the original ICGC data
+#   - Remove missing genes from observations (genes that were not in the graph)
+#
+# Usage:
+#   python3 post-processing-iggy.py [--gen] <obs-file> <sif-file> <ICGC-file>
+#                                   <down-threshold> <up-threshold> [iggy-output]
+#
+# Example:
+#   iggy input/name-ssm-reg.sif input/updownreg.obs --show_predictions --autoinputs | python3 ../post-processing-iggy.py input/updownreg.obs input/name-ssm-reg.sif ../icgc.csv -2.0 2.0 > result/obspred-name-ssm-reg-2.0.tsv
+#
+# Complete help:
+#   python3 post-processing-iggy.py --help
+###
+
+import os
+import sys
+import argparse
+
+# Shared Python library of the pipeline (supmat/lib)
+sys.path.insert(0, '{}/../../lib'.format(os.path.dirname(os.path.abspath(__file__))))
+import sifgraph
+import iggypost
+
+
+
+# [Argparse] Command line parsing options
+parser = argparse.ArgumentParser(
+  add_help = False,
+  description = 'General post-processing on the output of Iggy',
+  epilog = """OBSFILE and SIFFILE are the observations and the network given to Iggy.
+    ICGCFILE should be a tab-delimited CSV file containing in its first two columns
+    the gene names and their fold-change values.
+    If IGGYOUTPUT is omitted, the output of Iggy is read from the standard input.""")
+
+parser.add_argument('obsFileName', metavar = 'OBSFILE', type = str,
+  help = 'The observations file given to Iggy')
+parser.add_argument('sifFileName', metavar = 'SIFFILE', type = str,
+  help = 'The SIF file given to Iggy')
+parser.add_argument('dataFileName', metavar = 'ICGCFILE', type = str,
+  help = 'The CSV file containing (ICGC) expression data')
+parser.add_argument('downT', metavar = 'DOWN', type = float,
+  help = 'The threshold to consider a down-regulation')
+parser.add_argument('upT', metavar = 'UP', type = float,
+  help = 'The threshold to consider an up-regulation')
+parser.add_argument('iggyFileName', metavar = 'IGGYOUTPUT', type = str, nargs = '?',
+  help = 'The output of Iggy (read from standard input if omitted)')
+parser.add_argument('--gen',
+  dest = 'suffix', action = 'store_true',
+  help = 'Remove _gen and _prot suffixes (adds a type column)')
+parser.add_argument('-h', '--help',
+  action = 'help',
+  help = 'Print this help message')
+
+args = parser.parse_args()
+
+
+
+dataFC = iggypost.loadICGC(args.dataFileName)
+nodes = sifgraph.load(args.sifFileName, cache = True).ids
+with open(args.obsFileName, 'r') as obsFile:
+  obsLines = obsFile.readlines()
+
+f = sys.stdin if args.iggyFileName is None else open(args.iggyFileName, 'r')
+try:
+  iggypost.writeResult(iggypost.postProcess(f, obsLines, nodes, dataFC, args.downT, args.upT, args.suffix),
+    sys.stdout)
+except ValueError as e:
+  print(e, file = sys.stderr)
+  exit(1)
+finally:
+  f.close()
@@ -6,6 +6,10 @@ export LC_ALL=C
 # This file is part of the Supplementary Material of the submission entitled:
 # A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
 # Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+
+# Stop at the first failing command, so that pipe.py records the step as failed
+set -e
+
 # Install Iggy with:
 #   $ pip install --user iggy==1.4.1
 # Then specify the path to iggy.py in the following line:
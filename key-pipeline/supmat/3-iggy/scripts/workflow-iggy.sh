@@ -61,22 +61,27 @@ then
 fi
 
 # Check presence of scripts
+# (post-processing-iggy.py does in a single process the same as post-processing-iggy.sh)
 BASEDIR="$(dirname $0)"
-POST_PROCESSING_IGGY="$BASEDIR/post-processing-iggy.sh"
+POST_PROCESSING_IGGY="$BASEDIR/post-processing-iggy.py"
 if [ ! -f $POST_PROCESSING_IGGY ]
 then
   echo "Error: script $POST_PROCESSING_IGGY was not found but is required"
   exit 1
-else
-  eval "sh $POST_PROCESSING_IGGY --check"
-  if [ ! $? -eq 0 ]
-  then
-    exit 1
-  fi
 fi
 
 # Workflow
-$IGGY_COMMAND $SIF_FILE $OBS_FILE --show_predictions --autoinputs |\
+# (the exit status of Iggy, hidden by the pipe, is kept in IGGY_STATUS)
+IGGY_STATUS="$(mktemp)"
+{ $IGGY_COMMAND $SIF_FILE $OBS_FILE --show_predictions --autoinputs || echo $? > "$IGGY_STATUS"; } |\
 tee $OUTPUT_IGGY |\
-sh $POST_PROCESSING_IGGY $SUFFIX $OBS_FILE $SIF_FILE $ICGC_FILE $DOWN_THRESHOLD $UP_THRESHOLD
+python3 $POST_PROCESSING_IGGY $SUFFIX $OBS_FILE $SIF_FILE $ICGC_FILE $DOWN_THRESHOLD $UP_THRESHOLD
+STATUS=$?
+if [ -s "$IGGY_STATUS" ]
+then
+  echo "Error: Iggy failed (exit status $(cat "$IGGY_STATUS"))" >&2
+  STATUS=1
+fi
+rm -f "$IGGY_STATUS"
+exit $STATUS
 
@@ -9,6 +9,9 @@
 import os
 import math
 import csv
+import hashlib
+import collections
+import statistics
 
 
 
@@ -20,6 +23,7 @@ values = None   # The range of sampling values
 decimalPart = None    # Do the sampling values have a decimal part?
 numExp = None   # Number of experiments for each sampling
 expValues = None    # The range of experiment values
+numRuns = None    # Actual number of runs of each sampling value (adaptive number of runs), or None
 prefix = None   # Prefix of the sampling folders
 
 
@@ -49,20 +53,63 @@ def makeExpValues():
 
 
 
+def expValuesOf(n):
+  """Range of the experiment values of a sampling value (its actual runs if their number is adaptive)"""
+  if numRuns is None:
+    return expValues
+  return range(1, numRuns[values.index(n)] + 1, 1)
+
+
+
 def writeInfo(outDir):
-  """Create and fill the info file in the main folder"""
-  with open('{}/prp-info.csv'.format(outDir), 'w') as infoFile:
-    infoFile.write('{}\t{}\t{}\t{}\t{}'.format(prefix, start, stop, step, numExp))
+  """Create and fill the info file in the main folder
+  (with a second line for the actual numbers of runs if they are adaptive)"""
+  info = '{}\t{}\t{}\t{}\t{}'.format(prefix, start, stop, step, numExp)
+  if numRuns is not None:
+    info += '\n{}\n'.format('\t'.join(str(r) for r in numRuns))
+  writeFileAtomic('{}/prp-info.csv'.format(outDir), [info])
+
+def writeInputs(outDir, inputs):
+  """Write the inputs of the graph (nodes without predecessor) in the main folder"""
+  writeFileAtomic('{}/prp-inputs.txt'.format(outDir), ['{}\n'.format(gn) for gn in inputs])
+
+def loadInputs(dirName):
+  """Load the inputs of the graph stored in the main folder, or None if they were not stored"""
+  try:
+    with open('{}/prp-inputs.txt'.format(dirName), 'r') as inputsFile:
+      return [line.rstrip('\n') for line in inputsFile]
+  except FileNotFoundError:
+    return None
+
+def sameInfo(dirName):
+  """Check if the info stored in the main folder is that of the current experiment,
+  including its second line: present only if the number of runs is adaptive in both,
+  with a number of runs (at most numExp) for each sampling value"""
+  try:
+    with open('{}/prp-info.csv'.format(dirName), 'r') as infoFile:
+      dataReader = csv.reader(infoFile, delimiter='\t')
+      row = next(dataReader)
+      runsRow = next(dataReader, None)
+  except (OSError, StopIteration):
+    return False
+  if not (len(row) == 5 and row[0] == prefix and (float(row[1]), float(row[2]), float(row[3])) == (start, stop, step) \
+      and int(row[4]) == numExp):
+    return False
+  if runsRow is None or numRuns is None:
+    return runsRow is None and numRuns is None
+  return len(runsRow) == len(numRuns) and all(r.isdigit() and int(r) <= numExp for r in runsRow)
 
 def dirInfo(dirName):
   """Load sampling info stored in the main folder"""
-  global prefix, start, stop, step, numExp
+  global prefix, start, stop, step, numExp, numRuns
   with open('{}/prp-info.csv'.format(dirName), 'r') as infoFile:
     dataReader = csv.reader(infoFile, delimiter='\t')
     row = next(dataReader)
+    runsRow = next(dataReader, None)
   prefix = row[0]
   (start, stop, step) = (float(row[1]), float(row[2]), float(row[3]))
   numExp = int(row[4])
+  numRuns = None if runsRow is None else [int(r) for r in runsRow]
 
 def loadInfo(dirName):
   """Load all info and returns the values and run values ranges"""
@@ -78,6 +125,102 @@ def setInfo(argStart, argStop, argStep, argNumExp, argPrefix):
 
 
 
+# Checkpointing of a sweep (see pickrandom-percentage.py --continue):
+# - prp-plan.tsv: the sampling plan, i.e. the seed of the random sampling
+#   and the hashes of the input files, so that a resumed sweep picks the same observations
+# - prp-done.tsv: the manifest of the completed runs (run name + status ok/failed, or surplus
+#   for a removed run computed after the adaptive number of runs of its sampling),
+#   rewritten atomically after each run
+# Each run is computed in a temporary folder NNN.tmp, renamed into NNN once complete.
+
+def writeFileAtomic(fileName, lines):
+  """Write the lines of a file in a temporary file, then rename it into place"""
+  tmpFileName = '{}.tmp'.format(fileName)
+  with open(tmpFileName, 'w') as tmpFile:
+    tmpFile.writelines(lines)
+    tmpFile.flush()
+    os.fsync(tmpFile.fileno())
+  os.replace(tmpFileName, fileName)
+
+def hashFile(fileName):
+  """SHA-256 hash of the content of a file"""
+  h = hashlib.sha256()
+  with open(fileName, 'rb') as f:
+    for chunk in iter(lambda: f.read(1 << 20), b''):
+      h.update(chunk)
+  return h.hexdigest()
+
+def makePlan(seed, inputs):
+  """Create the sampling plan of a sweep, given the seed and the input files (dict name: file name)"""
+  plan = collections.OrderedDict([('seed', str(seed))])
+  for name in inputs:
+    plan[name] = hashFile(inputs[name])
+  return plan
+
+def samePlan(plan, otherPlan):
+  """Check if two sampling plans have the same input files (whatever their seeds)"""
+  return plan.keys() == otherPlan.keys() and all(plan[name] == otherPlan[name] for name in plan if name != 'seed')
+
+def writePlan(outDir, plan):
+  """Write the sampling plan in the main folder"""
+  writeFileAtomic('{}/prp-plan.tsv'.format(outDir), ['{}\t{}\n'.format(name, plan[name]) for name in plan])
+
+def loadPlan(dirName):
+  """Load the sampling plan stored in the main folder, or None if it was not stored"""
+  try:
+    with open('{}/prp-plan.tsv'.format(dirName), 'r') as planFile:
+      return collections.OrderedDict(line.rstrip('\n').split('\t', 1) for line in planFile)
+  except FileNotFoundError:
+    return None
+
+def writeManifest(outDir, done):
+  """Write the manifest of the completed runs (dict run name: status) in the main folder"""
+  writeFileAtomic('{}/prp-done.tsv'.format(outDir), ['{}\t{}\n'.format(runName, done[runName]) for runName in done])
+
+def loadManifest(dirName):
+  """Load the manifest of the completed runs (dict run name: status), empty if it was not stored"""
+  done = collections.OrderedDict()
+  try:
+    with open('{}/prp-done.tsv'.format(dirName), 'r') as manifestFile:
+      for line in manifestFile:
+        runName, _, status = line.rstrip('\n').partition('\t')
+        done[runName] = status
+  except FileNotFoundError:
+    pass
+  return done
+
+def isCompleteRun(totCurDir):
+  """Check if the folder of a run contains its result or a NORESULT file"""
+  return os.path.isfile('{}/result-0.0.tsv'.format(totCurDir)) or os.path.isfile('{}/NORESULT'.format(totCurDir))
+
+def tempDir(totCurDir):
+  """Compute the temporary folder of a run"""
+  return '{}.tmp'.format(totCurDir)
+
+
+
+# Adaptive number of runs (see pickrandom-percentage.py --tolerance):
+# the runs of a sampling value stop as soon as the 95% confidence intervals of the means
+# of their scores and numbers of predictions are narrow enough
+
+# Quantiles 0.975 of Student's t-distribution for 1 to 30 degrees of freedom (normal quantile above)
+T_QUANTILES = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+  2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+  2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+def confidenceHalfWidth(xs):
+  """Half-width of the 95% confidence interval of the mean of a sample (at least 2 values)"""
+  t = T_QUANTILES[len(xs) - 2] if len(xs) - 1 <= len(T_QUANTILES) else 1.960
+  return t * statistics.stdev(xs) / math.sqrt(len(xs))
+
+def isPrecise(xs, tolerance):
+  """Check if the 95% confidence interval of the mean of a sample is within ±tolerance × mean"""
+  if len(xs) < 2:
+    return False
+  return confidenceHalfWidth(xs) <= tolerance * abs(statistics.mean(xs))
+
+
+
 def nextDir(n, argPrevDir):
   """Compute the name of the next sampling directory"""
   global prefix, decimalPart
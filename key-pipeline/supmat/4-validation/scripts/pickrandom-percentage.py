@@ -12,39 +12,70 @@
 # Help:
 #   python pickrandom-percentage.py --help
 #
-# Bash scripts required:
-# - construct-inputs.sh
-#   - extract-inputs.sh
+# Iggy is called directly, and its output is post-processed in this process
+# as by workflow-iggy.sh (see ../../lib/iggypost.py)
+#
+# The runs are computed by an executor (see runexecutors.py), --jobs at once:
+# the calls to Iggy are run by a scheduler (see ../../lib/runscheduler.py) and post-processed
+# on a pool of --jobs worker processes (or in this process with --jobs 1);
+# with --run-timeout, a call still running after TIMEOUT seconds is killed with its solver,
+# and called again at most --retries times; a run whose last call timed out is marked
+# with a NORESULT file as the other failed runs, and listed at the end of the computation.
+#
+# The sweep is checkpointed (see percentage_random_pick.py): each run is computed
+# in a temporary folder renamed into place once complete and recorded in OUTDIR/prp-done.tsv,
+# and the observations are picked with the seed stored in OUTDIR/prp-plan.tsv.
+# An interrupted sweep can thus be resumed with --continue (or --resume):
+# only the missing or half-written runs are computed again, with the same observations.
+#
+# With --tolerance, the number of runs of each sampling is adaptive: the runs stop at the first
+# k ≥ --min-runs (k ≤ NBR) such that the 95% confidence intervals of the mean score (see scorematrix.py)
+# and of the mean number of predictions of the first k runs are within ±TOL × mean.
+# The runs are computed by batches of --batch-size runs (by default --jobs);
+# k does not depend on the batches, and is recorded for each sampling in OUTDIR/prp-info.csv;
+# the runs computed after the k-th one in the same batch are removed (marked as surplus in OUTDIR/prp-done.tsv).
+#
+# When run by a traced pipeline (pipe.py --trace), each run and each command are recorded
+# in the trace (see ../../lib/pipetrace.py).
+#
+# With --spool DIR, the runs are distributed to workers, possibly on other hosts sharing
+# the file system (f.i. an NFS mount), through the spool folder DIR (see spool.py):
+# this process (the coordinator) prepares the runs in OUTDIR as usual and submits one job per run,
+# and the workers, started with the same arguments and --worker, claim the jobs, compute the runs
+# in their own folders OUTDIR/.../NNN.<worker>.tmp, and report them in the spool;
+# the coordinator then moves each run into place as with a local computation (checkpoint, --store, etc.).
+# A job whose worker stopped renewing its lease for --lease-timeout seconds is submitted again.
+# Example (the workers are started after the coordinator, here 2 hosts of 4 workers;
+# with --tolerance, the coordinator would submit the runs by batches of 8 with --batch-size 8):
+#   python pickrandom-percentage.py SIF DATA UP DOWN 10 95 5 100 out --spool spool &
+#   host1$ python pickrandom-percentage.py SIF DATA UP DOWN 10 95 5 100 out --spool spool --worker -j 4
+#   host2$ python pickrandom-percentage.py SIF DATA UP DOWN 10 95 5 100 out --spool spool --worker -j 4
 ###
 
 
 
 import os
-import subprocess
+import sys
 import random
+import time
+import shutil
+import asyncio
 import argparse
+import functools
+import collections
 import percentage_random_pick as prp
+import resultstore
+import runexecutors
+import scorematrix
+import spool
 import util
 
-
-
-# DEBUG
-# Fake shell call + error code handling
-#def shellCall(c, grep = None):
-#  print(c)
-
-# Shell call + error code handling
-# Arguments:
-#   c : command to be executed by the shell (str)
-#   grep : consider exit code 1 as not an error (bool; default = try to infer from c)
-def shellCall(c, grep = None):
-  if grep is None:
-    erGrep = c[0:4] == 'grep'
-  else:
-    erGrep = grep
-  retValue = subprocess.call(c, shell = True)
-  if ((not erGrep) and (retValue > 0)) or (erGrep and (retValue > 1)):
-    raise Exception('Something went wrong with command:\n$ {}'.format(c))
+# Shared Python library of the pipeline (supmat/lib)
+sys.path.insert(0, '{}/../../lib'.format(os.path.dirname(os.path.abspath(__file__))))
+import sifgraph
+import iggypost
+import pipetrace
+import runscheduler
 
 
 
@@ -86,21 +117,99 @@ parser.add_argument('-c', '--iggy-command', dest = 'iggyCommand',
   help = 'Specify a command to call Iggy (default: iggy)')
 parser.add_argument('--continue', dest = 'newDir', action = 'store_false',
   help = 'Don\'t create OUTDIR; useful to carry on a started computation')
+parser.add_argument('--resume', dest = 'resume', action = 'store_true',
+  help = 'Carry on the computation in OUTDIR if it has the same parameters and inputs, otherwise start it over')
+parser.add_argument('-j', '--jobs', dest = 'jobs',
+  metavar = 'N', type = int, action = 'store', default = 1,
+  help = 'Compute N runs at once, in parallel processes (default: 1); with --spool, N runs at once on each worker (the coordinator computes none)')
+parser.add_argument('--batch-size', dest = 'batchSize',
+  metavar = 'B', type = int, action = 'store', default = None,
+  help = 'Compute the runs of a sampling by batches of B runs with --tolerance (default: N, or 1 with --spool; f.i. the total number of runs computed at once by the workers)')
+parser.add_argument('--tolerance', dest = 'tolerance',
+  metavar = 'TOL', type = float, action = 'store', default = None,
+  help = 'Adaptive number of runs: stop the runs of a sampling once the 95%% confidence intervals of the mean score and number of predictions are within ±TOL × mean (NBR is then the maximum number of runs)')
+parser.add_argument('--min-runs', dest = 'minRuns',
+  metavar = 'MIN', type = int, action = 'store', default = 5,
+  help = 'Minimum number of runs of a sampling with --tolerance (default: 5)')
+parser.add_argument('--score-matrix', dest = 'matFileName',
+  metavar = 'MATFILE', type = str, action = 'store', default = '{}/m2.tsv'.format(os.path.dirname(os.path.abspath(__file__))),
+  help = 'The score matrix used with --tolerance (default: m2.tsv)')
+parser.add_argument('--store', dest = 'store', action = 'store_true',
+  help = 'Record the runs in the result store OUTDIR/{} instead of keeping their directories'.format(resultstore.STORE_FILE_NAME))
+parser.add_argument('--spool', dest = 'spool',
+  metavar = 'DIR', type = str, action = 'store', default = None,
+  help = 'Distribute the runs to workers (started with --worker) through the spool folder DIR, shared by their hosts')
+parser.add_argument('--worker', dest = 'worker', action = 'store_true',
+  help = 'Run as a worker: compute the runs of the jobs of the spool of a coordinator started with the same arguments')
+parser.add_argument('--lease-timeout', dest = 'leaseTimeout',
+  metavar = 'SEC', type = float, action = 'store', default = 120,
+  help = 'Submit again the job of a worker which did not renew its lease for SEC seconds (default: 120)')
+parser.add_argument('--run-timeout', dest = 'runTimeout',
+  metavar = 'TIMEOUT', type = float, action = 'store', default = None,
+  help = 'Kill the call to Iggy of a run after TIMEOUT seconds (default: no timeout)')
+parser.add_argument('--retries', dest = 'retries',
+  metavar = 'N', type = int, action = 'store', default = 1,
+  help = 'Call Iggy again at most N times for a run whose call timed out or was killed (default: 1)')
 parser.add_argument('-h', '--help', action = 'help',
   help = 'Print this help message')
 
 args = parser.parse_args()
 
+if args.jobs < 1:
+  print('Arguments error: Option --jobs requires a positive number', file = sys.stderr)
+  exit(1)
+if args.batchSize is not None and args.batchSize < 1:
+  print('Arguments error: Option --batch-size requires a positive number', file = sys.stderr)
+  exit(1)
+if args.tolerance is not None and args.tolerance <= 0:
+  print('Arguments error: Option --tolerance requires a positive number', file = sys.stderr)
+  exit(1)
+if args.tolerance is not None and not 2 <= args.minRuns <= args.numExp:
+  print('Arguments error: Option --min-runs requires a number between 2 and NBR', file = sys.stderr)
+  exit(1)
+if args.worker and args.spool is None:
+  print('Arguments error: Option --worker requires option --spool', file = sys.stderr)
+  exit(1)
+if args.leaseTimeout <= 0:
+  print('Arguments error: Option --lease-timeout requires a positive number', file = sys.stderr)
+  exit(1)
+if args.runTimeout is not None and args.runTimeout <= 0:
+  print('Arguments error: Option --run-timeout requires a positive number', file = sys.stderr)
+  exit(1)
+if args.retries < 0:
+  print('Arguments error: Option --retries requires a non-negative number', file = sys.stderr)
+  exit(1)
+
+
 
+# Trace of the pipeline run (pipe.py --trace), in which the runs and the commands are recorded
+trace = pipetrace.Trace.fromEnvironment()
 
 # Iggy's directory (where all the scripts are) and command
 iggyDir = args.scriptsPath
 iggyCommand = args.iggyCommand
 
+# Scheduler of the calls to Iggy
+scheduler = runscheduler.RunScheduler(args.jobs, args.runTimeout, args.retries, trace)
+
+# Number of runs of a batch of the adaptive number of runs (--tolerance)
+batchSize = args.batchSize
+if batchSize is None:
+  batchSize = args.jobs if args.spool is None else 1
+
+# Spool of the jobs of the workers (--spool), emptied by the coordinator when it starts
+jobSpool = None
+if args.spool is not None:
+  jobSpool = spool.Spool(args.spool)
+  if not args.worker:
+    jobSpool.clear()
+
 # Set info and create range of sampling values
 prp.setInfo(args.cvStart, args.cvStop, args.cvStep, args.numExp, 'prp')
 values = prp.makeValues()
 expValues = prp.makeExpValues()
+if args.tolerance is not None:
+  prp.numRuns = [0] * len(values)
 
 
 
@@ -111,10 +220,43 @@ curDir = None    # Directory for current percentage (n)
 curExpDir = None    # Directory for current experiment
 totCurDir = None   # Complete current directory (outDir + curDir + curExpDir)
 
-# Create directory
+# Sampling plan: the seed of the random sampling is kept with the hashes of the inputs
+inputFiles = collections.OrderedDict([('sif', args.sifFileName), ('data', args.dataFileName),
+  ('up', args.upFileName), ('down', args.downFileName)])
+plan = prp.makePlan(random.getrandbits(32), inputFiles)
+
+# Worker: wait for the coordinator to start the computation, then check it as with --continue
+if args.worker:
+  while prp.loadPlan(outDir) is None:
+    time.sleep(spool.POLL_INTERVAL)
+  args.newDir = False
+# Resume a started computation with the same parameters and inputs, or start it over
+elif args.resume:
+  oldPlan = prp.loadPlan(outDir)
+  args.newDir = not (prp.sameInfo(outDir) and oldPlan is not None and prp.samePlan(plan, oldPlan))
+  if args.newDir and os.path.isdir(outDir):
+    print('Starting over the computation in {} (different parameters or inputs)'.format(outDir))
+    shutil.rmtree(outDir)
+
+# Create directory, or check that the started computation is the same
 if args.newDir:
   os.makedirs(outDir)
   prp.writeInfo(outDir)
+  prp.writePlan(outDir, plan)
+else:
+  if not prp.sameInfo(outDir):
+    print('Arguments error: {} was started with other sampling parameters'.format(outDir), file = sys.stderr)
+    exit(1)
+  oldPlan = prp.loadPlan(outDir)
+  if oldPlan is None:
+    # Computation started without a sampling plan: the missing runs use a new seed
+    prp.writePlan(outDir, plan)
+  elif not prp.samePlan(plan, oldPlan):
+    print('Arguments error: {} was started with other input files'.format(outDir), file = sys.stderr)
+    exit(1)
+  else:
+    plan = oldPlan
+rng = random.Random(int(plan['seed']))
 
 
 
@@ -124,40 +266,204 @@ geneNames = util.loadGeneNames([args.upFileName, args.downFileName])
 # Need to handle the _gen suffix?
 genFlag = '--gen' if geneNames[0][0][-4:] == '_gen' else ''
 
+# Graph and ICGC data, loaded once for the whole sweep
+# (the graph through its binary cache file, shared with the other processes loading it)
+graph = sifgraph.load(args.sifFileName, cache = True)
+dataFC = iggypost.loadICGC(args.dataFileName)
+
+# Inputs of the graph (nodes without predecessor), computed once for the whole sweep
+# and stored next to prp-info.csv (replaces a call to construct-inputs.sh for each run)
+# (the workers use the observations written by the coordinator, inputs included)
+inputs = None if args.newDir else prp.loadInputs(outDir)
+if inputs is None and not args.worker:
+  inputs = graph.sources()
+  prp.writeInputs(outDir, inputs)
+
+
+
+# Name of a run in the trace
+def traceName(totCurDir):
+  return os.path.splitext(os.path.relpath(totCurDir, outDir))[0]
+
+# Run an experiment whose observations have already been picked in folder totCurDir,
+# with Iggy called by the scheduler, and post-process it with the executor
+# (pool of processes, or None for a thread of this process)
+# Returns None on success, or the error message; a failed run is marked with a NORESULT file
+async def scheduleExperiment(totCurDir, executor):
+  start = pipetrace.now()
+  command = '{} "{}" "{}/obs-withinputs.obs" --show_predictions --autoinputs > "{}/iggy-output.out"'.format(
+    iggyCommand, args.sifFileName, totCurDir, totCurDir)
+  try:
+    if await scheduler.call(command) != 0:
+      raise Exception('Something went wrong with command:\n$ {}'.format(command))
+    await asyncio.get_running_loop().run_in_executor(executor, postProcessExperiment, totCurDir)
+    error = None
+  except Exception as e:
+    error = runexecutors.noResult(totCurDir, e)
+  if trace is not None:
+    trace.complete(traceName(totCurDir), 'run', start, {'status': 'ok' if error is None else 'failed'})
+  return error
+
+# Run an experiment of a job of the spool (worker) with the scheduler
+def runExperiment(totCurDir):
+  return scheduler.runAll([functools.partial(scheduleExperiment, totCurDir, None)])[0]
+
+# Post-process the output of Iggy and compare to the ICGC data (as workflow-iggy.sh with thresholds 0 0)
+def postProcessExperiment(totCurDir):
+  with open('{}/obs-withinputs.obs'.format(totCurDir), 'r') as obsFile:
+    obsLines = obsFile.readlines()
+  with open('{}/iggy-output.out'.format(totCurDir), 'r') as iggyFile, \
+      open('{}/result-0.0.tsv'.format(totCurDir), 'w') as resultFile:
+    iggypost.writeResult(iggypost.postProcess(iggyFile, obsLines, graph.ids, dataFC, 0, 0, genFlag != ''),
+      resultFile)
+
+# Prepare an experiment: clean its folders (if half-written) and write its observations
+# in its temporary folder
+def prepareRun(totCurDir, selectedGenes):
+  tmpCurDir = prp.tempDir(totCurDir)
+  for d in [tmpCurDir, totCurDir]:
+    if os.path.isdir(d):
+      shutil.rmtree(d)
+  os.makedirs(tmpCurDir)
+  # Write current observations
+  obsLines = ['{} = {}\n'.format(gn, '+' if upDown == 0 else '-')
+    for upDown in [0, 1] for gn in selectedGenes[upDown]]
+  with open('{}/obs-noinputs.obs'.format(tmpCurDir), 'w') as obsFile:
+    obsFile.writelines(obsLines)
+  # Construct inputs: append the inputs of the graph to the observations
+  with open('{}/obs-withinputs.obs'.format(tmpCurDir), 'w') as obsFile:
+    obsFile.writelines(obsLines)
+    obsFile.writelines('{} = input\n'.format(gn) for gn in inputs)
+
+# Score (with the score matrix) and number of predictions of a finished experiment of the sweep,
+# or None if it failed
+def runStats(sweep, totCurDir):
+  runName = sweep.runName(totCurDir)
+  if not sweep.results.hasProperResult(runName):
+    return None
+  return scorematrix.scoreRows(args.matFileName, sweep.results.loadResult(runName))
+
+# Run the experiments of a sampling (list of (folder, observations)) of the sweep with the executor
+# by batches of --batch-size runs (at least --min-runs runs in the first one), until the first k runs
+# (k ≥ --min-runs) have precise enough scores and numbers of predictions;
+# returns k (the runs after the k-th one computed in the same batch are removed)
+def runAdaptive(sweep, executor, runs):
+  scores = []   # Scores of the proper runs among the first ones
+  numPreds = []   # Numbers of predictions of the proper runs among the first ones
+  numRuns = 0
+  precise = False
+  while numRuns < len(runs) and not precise:
+    batch = runs[numRuns:numRuns + min(len(runs) - numRuns, max(batchSize, args.minRuns - numRuns))]
+    todo = []
+    for totCurDir, selectedGenes in batch:
+      if sweep.isDone(totCurDir):
+        print('  -- {} done'.format(totCurDir))
+      else:
+        prepareRun(totCurDir, selectedGenes)
+        todo.append(totCurDir)
+    executor.run(todo)
+    for totCurDir, _ in batch:
+      if precise:
+        sweep.discardRun(totCurDir)
+        continue
+      numRuns += 1
+      stats = runStats(sweep, totCurDir)
+      if stats is not None:
+        scores.append(stats[0])
+        numPreds.append(stats[1])
+      precise = numRuns >= args.minRuns and prp.isPrecise(scores, args.tolerance) \
+        and prp.isPrecise(numPreds, args.tolerance)
+  if len(scores) > 0:
+    print('  {} run(s): mean score = {:.4f}, mean #pred = {:.1f}'.format(numRuns,
+      sum(scores) / len(scores), sum(numPreds) / len(numPreds)))
+  return numRuns
+
+# Worker of the spool: the coordinator picks the observations and records the runs
+if args.worker:
+  print('Worker of spool {} on {}'.format(args.spool, outDir))
+  sys.stdout.flush()
+  runexecutors.SpoolWorker(jobSpool, outDir, runExperiment, args.leaseTimeout).run(args.jobs)
+  exit(0)
+
+# State of the sweep: completed runs (manifest and result store) and failed runs
+sweep = runexecutors.Sweep(outDir,
+  resultstore.StoreResults(resultstore.storeFileName(outDir)) if args.store else None)
+if len(sweep.done) > 0:
+  print('Resuming the computation: {} run(s) already done'.format(len(sweep.done)))
+
+# Executor of the runs, created once for the sweep (and its pool of workers, if any, before the runs)
+if jobSpool is not None:
+  executor = runexecutors.SpoolExecutor(sweep, jobSpool, args.leaseTimeout)
+else:
+  executor = runexecutors.SchedulerExecutor(sweep, scheduler, scheduleExperiment)
+pendingRuns = []  # Folders of the experiments left to the executor
+
 
 
 # For each percentage value...
 # n = current percentage; k = current sample sizes (n% of all up- and down-regulated genes)
-for n in values:
+for j, n in enumerate(values):
   k = [round(n / 100.0 * len(geneNames[upDown])) for upDown in [0, 1]]
   curDir = prp.nextDir(n, curDir)
   print(curDir)
-  os.makedirs('{}/{}'.format(outDir, curDir))
-  # For each expriment...
+  os.makedirs('{}/{}'.format(outDir, curDir), exist_ok = True)
+  # Pick the observations of each experiment
+  # (always in this process and in this order, so that the random sampling does not depend on --jobs,
+  # and for all runs, so that a resumed or adaptive computation picks the same observations)
+  runs = []   # List of (complete directory, selected genes)
   for i in expValues:
-    curExpDir = prp.nextExpDir(i)
-    totCurDir = prp.totalDir(outDir, curDir, curExpDir)    # Complete directory
-    print('  -- {}'.format(curExpDir), end='')
-    os.makedirs(totCurDir)
-    # Pick and write current observations
-    selectedGenes = [random.sample(geneNames[upDown], k[upDown]) for upDown in [0, 1]]
-    with open('{}/obs-noinputs.obs'.format(totCurDir), 'w') as obsFile:
-      for upDown in [0, 1]:
-        for gn in selectedGenes[upDown]:
-          obsFile.write('{} = {}\n'.format(gn, '+' if upDown == 0 else '-'))
-  
-    # Construct inputs
-    shellCall('sh {}/construct-inputs.sh "{}" "{}/obs-noinputs.obs" > "{}/obs-withinputs.obs"'.format(iggyDir, args.sifFileName, totCurDir, totCurDir))
-    # Call Iggy
-#    os.makedirs(totCurDir)
-    shellCall('sh {}/workflow-iggy.sh {} --iggy-command "{}" "{}/obs-withinputs.obs" "{}" "{}" 0 0 "{}/iggy-output.out" > "{}/result-0.0.tsv"'.format(iggyDir, genFlag, iggyCommand, totCurDir, args.sifFileName, args.dataFileName, totCurDir, totCurDir))
-  
-    # End of current run
-    print()
+    totCurDir = prp.totalDir(outDir, curDir, prp.nextExpDir(i))
+    runs.append((totCurDir, [rng.sample(geneNames[upDown], k[upDown]) for upDown in [0, 1]]))
+
+  # Adaptive number of runs: record it in the info file
+  if args.tolerance is not None:
+    prp.numRuns[j] = runAdaptive(sweep, executor, runs)
+    prp.writeInfo(outDir)
+    continue
+
+  # For each expriment: prepare it, unless already done
+  for totCurDir, selectedGenes in runs:
+    if sweep.isDone(totCurDir):
+      print('  -- {} done'.format(os.path.basename(totCurDir)))
+      continue
+    prepareRun(totCurDir, selectedGenes)
+    pendingRuns.append(totCurDir)
   
   # End of current sampling (n%)
 
+# Run the pending experiments
+if len(pendingRuns) > 0:
+  if jobSpool is not None:
+    print('Running {} experiments on the workers of spool {}...'.format(len(pendingRuns), args.spool))
+  else:
+    print('Running {} experiments, {} at once...'.format(len(pendingRuns), args.jobs))
+  sys.stdout.flush()
+  executor.run(pendingRuns)
+executor.close()
+sweep.close()
+
 # End of the world
 
-print('Done.')
+# With the result store, the sampling folders are now empty
+if args.store:
+  curDir = None
+  for n in values:
+    curDir = prp.nextDir(n, curDir)
+    if os.path.isdir('{}/{}'.format(outDir, curDir)) and len(os.listdir('{}/{}'.format(outDir, curDir))) == 0:
+      os.rmdir('{}/{}'.format(outDir, curDir))
+
+# Report failed runs (marked with a NORESULT file, ignored by the statistics scripts)
+failedRuns = sweep.failedRuns
+if len(failedRuns) > 0:
+  print('{} run(s) failed:'.format(len(failedRuns)), file = sys.stderr)
+  for totCurDir, error in sorted(failedRuns):
+    print('  {}: {}'.format(totCurDir, error), file = sys.stderr)
 
+# Report the runs whose call to Iggy timed out (--run-timeout)
+timedOutRuns = sorted(totCurDir for totCurDir, error in failedRuns if error.startswith(runscheduler.TIMEOUT_MESSAGE))
+if len(timedOutRuns) > 0:
+  print('{} of them timed out (see options --run-timeout and --retries):'.format(len(timedOutRuns)), file = sys.stderr)
+  for totCurDir in timedOutRuns:
+    print('  {}'.format(totCurDir), file = sys.stderr)
+
+print('Done.')
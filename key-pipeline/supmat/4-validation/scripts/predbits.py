@@ -0,0 +1,149 @@
+# Library for the bit-packed predictions of the random pick cross-validation
+# --------------------------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+###
+# Library for the bit-packed predictions of the random pick cross-validation
+###
+# The predictions of the runs are stored as one bit matrix (gene × run) for each prediction type:
+#   bits[k, g, r // 8] & (0x80 >> r % 8) is set if gene g has the prediction of type k in run r
+# (8 runs per byte, in the order of np.packbits). Gene IDs are the node IDs of the filtered
+# SIF graph (see ../../lib/sifgraph.py), followed by the predicted genes missing from the graph, if any.
+# For 10,000 genes and 2,000 runs, a matrix takes 2.5 MB (15 MB for the 6 prediction types).
+#
+# The queries select a set of runs with a bit mask (runMask) and count the runs of each gene
+# with a popcount of the bytes (by a lookup table, numpy 1.16 having no vectorized popcount):
+# - counts(): number of runs with each prediction type, for each gene
+# - agreement(): most frequent prediction type of each gene, and its frequency in the runs
+#   (f.i. the genes which keep the same sign in at least 95% of the runs)
+# - overlaps(): Jaccard index of the consensus predictions (pairs gene, prediction type
+#   made in at least a given fraction of the runs) of several sets of runs, such as the samplings
+#
+# Typical usage:
+#   bits = predbits.PredictionBits(graph.names, predbits.PRED_TYPES, len(runNames))
+#   for r, runName in enumerate(runNames):
+#     bits.addRun(r, results.loadResult(runName))
+#   pred, freq = bits.agreement()
+#   bits.save('output/prp-predictions.npz')
+###
+
+
+
+import os
+import numpy as np
+import resultstore
+
+
+
+# Prediction types of Iggy
+PRED_TYPES = ['+', '-', '0', 'NOT+', 'NOT-', 'CHANGE']
+
+# Number of bits set in each byte
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype = np.uint8)
+
+
+
+def popcount(a, axis = -1):
+  """Number of bits set in an array of bytes, summed along axis (all axes if None)"""
+  return POPCOUNT[a].sum(axis = axis, dtype = np.int64)
+
+class PredictionBits:
+  """Predictions of a set of runs, as one bit matrix (gene × run) for each prediction type"""
+
+  def __init__(self, geneNames, predTypes, numRuns, bits = None):
+    self.names = list(geneNames)    # Gene ID: gene name
+    self.ids = dict(zip(self.names, range(len(self.names))))    # Gene name: gene ID
+    self.predTypes = list(predTypes)    # Type ID: prediction type
+    self.typeIndex = {t: k for k, t in enumerate(self.predTypes)}    # Prediction type: type ID
+    self.numRuns = numRuns
+    if bits is None:
+      bits = np.zeros((len(self.predTypes), len(self.names), (numRuns + 7) // 8), dtype = np.uint8)
+    self.storage = bits   # Matrices with room for the genes added later (see addGenes)
+    self.bits = bits   # Matrices of the genes (view on storage)
+
+  def nbytes(self):
+    return self.bits.nbytes
+
+  def addGenes(self, names):
+    """Add the new genes among names after the others (only the genes missing from the graph);
+    the matrices are resized at most once, their room for new genes growing geometrically"""
+    newNames = [name for name in dict.fromkeys(names) if name not in self.ids]
+    if len(newNames) == 0:
+      return
+    for name in newNames:
+      self.ids[name] = len(self.names)
+      self.names.append(name)
+    if len(self.names) > self.storage.shape[1]:
+      storage = np.zeros((self.storage.shape[0], max(len(self.names), 2 * self.storage.shape[1]), self.storage.shape[2]),
+        dtype = np.uint8)
+      storage[:, :self.bits.shape[1]] = self.bits
+      self.storage = storage
+    self.bits = self.storage[:, :len(self.names)]
+
+  def addRun(self, r, rows):
+    """Record the predictions of run r, given the prediction rows [gene, 'pred:xxx', ...] of its result
+    (the prediction types which are not in predTypes are ignored)"""
+    rows = [row for row in rows if row[1][0:5] == 'pred:' and row[1][5:] in self.typeIndex]
+    self.addGenes(row[0] for row in rows)
+    pairs = [(self.typeIndex[row[1][5:]], self.ids[row[0]]) for row in rows]
+    if len(pairs) > 0:
+      k, g = np.array(pairs, dtype = np.int64).T
+      self.bits[k, g, r // 8] |= np.uint8(0x80 >> r % 8)
+
+  def runMask(self, runs = None):
+    """Bit mask of a set of runs (iterable of run indices, all the runs if None)"""
+    selected = np.zeros(self.bits.shape[2] * 8, dtype = bool)
+    if runs is None:
+      selected[:self.numRuns] = True
+    else:
+      selected[list(runs)] = True
+    return np.packbits(selected)
+
+  def counts(self, runs = None):
+    """Number of runs of each prediction type (rows) for each gene (columns), among the runs selected"""
+    return popcount(self.bits & self.runMask(runs))
+
+  def agreement(self, runs = None):
+    """Most frequent prediction type (ID) of each gene, and its frequency in the runs selected
+    (0 for the genes never predicted)"""
+    mask = self.runMask(runs)
+    c = popcount(self.bits & mask)
+    dominant = c.argmax(axis = 0)
+    return dominant, c[dominant, np.arange(c.shape[1])] / max(popcount(mask, None), 1)
+
+  def consensus(self, runs = None, minFraction = .5):
+    """Bit matrix (prediction type × gene, 8 genes per byte) of the predictions made
+    in at least minFraction of the runs selected"""
+    mask = self.runMask(runs)
+    numRuns = popcount(mask, None)
+    made = popcount(self.bits & mask) >= minFraction * numRuns if numRuns > 0 else np.zeros(self.bits.shape[:2], dtype = bool)
+    return np.packbits(made, axis = -1)
+
+  def overlaps(self, runSets, minFraction = .5):
+    """Jaccard indices (matrix) of the consensus predictions of each pair of sets of runs
+    (1 if both are empty: two empty sets are identical)"""
+    c = np.array([self.consensus(runs, minFraction) for runs in runSets])
+    res = np.ones((len(c), len(c)))
+    for i in range(len(c)):
+      inter = popcount(c[i] & c, axis = (1, 2))
+      union = popcount(c[i] | c, axis = (1, 2))
+      nonEmpty = union > 0
+      res[i, nonEmpty] = inter[nonEmpty] / union[nonEmpty]
+    return res
+
+  def save(self, fileName):
+    """Write the matrices in a NumPy .npz file"""
+    tmpFileName = fileName + '.tmp.npz'
+    np.savez(tmpFileName,
+      bits = self.bits,
+      geneNames = resultstore.packStrings(self.names),
+      predTypes = resultstore.packStrings(self.predTypes),
+      numRuns = np.array(self.numRuns, dtype = np.int64))
+    os.replace(tmpFileName, fileName)
+
+def load(fileName):
+  """Load the matrices written by PredictionBits.save"""
+  with np.load(fileName, allow_pickle = False) as data:
+    return PredictionBits(resultstore.unpackStrings(data['geneNames']), resultstore.unpackStrings(data['predTypes']),
+      int(data['numRuns']), data['bits'])
@@ -0,0 +1,305 @@
+# Library for storing the results of the random pick cross-validation
+# --------------------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+###
+# Library for storing the results of the random pick cross-validation
+###
+# The results of a cross-validation can be read from two backends, with the same interface:
+# - DirResults: the directory tree outDir/prpNNN/NNN/ (result-0.0.tsv, NORESULT, etc.);
+#   the predictions parsed from the result-0.0.tsv files are kept in a parse cache
+#   outDir/prp-parse-cache.npz, keyed by run, file size and modification time,
+#   so that only new or changed runs are parsed again by the next stats-*.py scripts
+# - StoreResults: a single SQLite file outDir/prp-results.db, which records for each run:
+#     its status (and error message), its sampled observations (gene ID + label)
+#     and its predictions (gene ID + label, in the order of result-0.0.tsv);
+#   gene names, fold-changes and labels are stored once in their own tables.
+# openResults(dirName) returns the store if it exists, and the directory tree otherwise.
+# Runs are identified by their relative directory name (f.i. 'prp010/1').
+#
+# Typical usage:
+#   results = resultstore.openResults('output')
+#   if results.hasProperResult('prp010/1'):
+#     rows = results.loadResult('prp010/1')   # [gene, 'pred:xxx', fold-change] rows
+#   results.close()   # Writes the parse cache if needed
+###
+
+
+
+import os
+import sqlite3
+import numpy as np
+import util
+
+
+
+# Name of the store in the main folder
+STORE_FILE_NAME = 'prp-results.db'
+
+# Name of the parse cache of the directory tree in the main folder
+CACHE_FILE_NAME = 'prp-parse-cache.npz'
+
+# Status of the runs
+STATUS_OK = 0
+STATUS_NORESULT = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+  id INTEGER PRIMARY KEY,
+  name TEXT NOT NULL UNIQUE,
+  status INTEGER NOT NULL,
+  message TEXT);
+CREATE TABLE IF NOT EXISTS genes (
+  id INTEGER PRIMARY KEY,
+  name TEXT NOT NULL UNIQUE,
+  fc TEXT);
+CREATE TABLE IF NOT EXISTS labels (
+  id INTEGER PRIMARY KEY,
+  label TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS observations (
+  run INTEGER NOT NULL,
+  gene INTEGER NOT NULL,
+  label INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS predictions (
+  run INTEGER NOT NULL,
+  gene INTEGER NOT NULL,
+  label INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS scores (
+  run INTEGER NOT NULL,
+  matrix TEXT NOT NULL,
+  score REAL NOT NULL,
+  PRIMARY KEY (run, matrix));
+CREATE INDEX IF NOT EXISTS observationsRun ON observations (run);
+CREATE INDEX IF NOT EXISTS predictionsRun ON predictions (run);
+"""
+
+
+
+def storeFileName(dirName):
+  """Name of the store of a main folder"""
+  return '{}/{}'.format(util.removeLastSlash(dirName), STORE_FILE_NAME)
+
+def openResults(dirName):
+  """Open the results of a main folder: its store if it exists, otherwise its directory tree"""
+  if os.path.isfile(storeFileName(dirName)):
+    return StoreResults(storeFileName(dirName))
+  return DirResults(dirName)
+
+
+
+class DirResults:
+  """Results read from the directory tree of a main folder"""
+
+  def __init__(self, dirName, cache = True):
+    self.dirName = util.removeLastSlash(dirName)
+    self.cache = ParseCache('{}/{}'.format(self.dirName, CACHE_FILE_NAME)) if cache else None
+
+  def hasProperResult(self, runName):
+    return util.hasProperResult('{}/{}'.format(self.dirName, runName))
+
+  def loadResult(self, runName):
+    """Prediction rows [gene, 'pred:xxx', fold-change] of result-0.0.tsv (without header)"""
+    fileName = '{}/{}/result-0.0.tsv'.format(self.dirName, runName)
+    if self.cache is None:
+      return [row for row in util.loadCSVWithHeader(fileName) if row[1][0:5] == 'pred:']
+    stat = os.stat(fileName)
+    rows = self.cache.get(runName, stat.st_size, stat.st_mtime_ns)
+    if rows is None:
+      rows = [row[0:3] for row in util.loadCSVWithHeader(fileName) if row[1][0:5] == 'pred:']
+      self.cache.put(runName, stat.st_size, stat.st_mtime_ns, rows)
+    return rows
+
+  def writeScore(self, runName, matName, score):
+    with open('{}/{}/score-{}.txt'.format(self.dirName, runName, matName), 'w') as matFile:
+      matFile.write(str(score))
+
+  def close(self):
+    if self.cache is not None:
+      self.cache.write()
+
+
+
+def packStrings(strings):
+  """Pack a list of strings (without line return) into an array of bytes"""
+  return np.frombuffer(''.join(s + '\n' for s in strings).encode('utf-8'), dtype = np.uint8)
+
+def unpackStrings(array):
+  """Unpack a list of strings packed by packStrings"""
+  return array.tobytes().decode('utf-8').split('\n')[:-1]
+
+def intern(index, values, value):
+  """ID of a value in the list values (indexed by the dict index), added if new"""
+  if value not in index:
+    index[value] = len(values)
+    values.append(value)
+  return index[value]
+
+class ParseCache:
+  """Parsed predictions of the runs, stored as arrays of gene and label IDs in a NumPy .npz file"""
+
+  def __init__(self, fileName):
+    self.fileName = fileName
+    self.runs = {}    # Run name: (file size, file modification time, gene IDs, label IDs)
+    self.genes = []   # Gene ID: (gene name, fold-change)
+    self.labels = []  # Label ID: label (+, -, NOT+, etc.)
+    self.modified = False
+    try:
+      with np.load(fileName, allow_pickle = False) as data:
+        geneIds, labelIds, offsets = data['geneIds'], data['labelIds'], data['offsets']
+        for r, (runName, size, mtime) in enumerate(zip(unpackStrings(data['runNames']),
+            data['sizes'].tolist(), data['mtimes'].tolist())):
+          self.runs[runName] = (size, mtime, geneIds[offsets[r]:offsets[r + 1]],
+            labelIds[offsets[r]:offsets[r + 1]])
+        self.genes = list(zip(unpackStrings(data['geneNames']), unpackStrings(data['geneFCs'])))
+        self.labels = unpackStrings(data['labels'])
+    except (OSError, KeyError, ValueError):
+      # No cache yet (or unreadable cache): start from scratch
+      self.runs = {}
+      self.genes = []
+      self.labels = []
+    self.geneIndex = {g: i for i, g in enumerate(self.genes)}
+    self.labelIndex = {l: i for i, l in enumerate(self.labels)}
+
+  def get(self, runName, size, mtime):
+    """Prediction rows of a run, or None if not cached or if the file changed"""
+    if runName not in self.runs:
+      return None
+    cachedSize, cachedMtime, geneIds, labelIds = self.runs[runName]
+    if (cachedSize, cachedMtime) != (size, mtime):
+      return None
+    genes, labels = self.genes, self.labels
+    return [[genes[g][0], 'pred:' + labels[l], genes[g][1]] for g, l in zip(geneIds.tolist(), labelIds.tolist())]
+
+  def put(self, runName, size, mtime, rows):
+    """Cache the prediction rows [gene, 'pred:xxx', fold-change] of a run"""
+    geneIds = [intern(self.geneIndex, self.genes, (row[0], row[2])) for row in rows]
+    labelIds = [intern(self.labelIndex, self.labels, row[1][5:]) for row in rows]
+    self.runs[runName] = (size, mtime, np.array(geneIds, dtype = np.int32), np.array(labelIds, dtype = np.int16))
+    self.modified = True
+
+  def write(self):
+    """Write the cache file if it changed"""
+    if not self.modified:
+      return
+    runNames = list(self.runs)
+    entries = [self.runs[r] for r in runNames]
+    offsets = np.zeros(len(entries) + 1, dtype = np.int64)
+    np.cumsum(np.array([len(e[2]) for e in entries], dtype = np.int64), out = offsets[1:])
+    tmpFileName = self.fileName + '.tmp.npz'
+    np.savez(tmpFileName,
+      runNames = packStrings(runNames),
+      sizes = np.array([e[0] for e in entries], dtype = np.int64),
+      mtimes = np.array([e[1] for e in entries], dtype = np.int64),
+      offsets = offsets,
+      geneIds = np.concatenate([np.zeros(0, dtype = np.int32)] + [e[2] for e in entries]),
+      labelIds = np.concatenate([np.zeros(0, dtype = np.int16)] + [e[3] for e in entries]),
+      geneNames = packStrings([g[0] for g in self.genes]),
+      geneFCs = packStrings([g[1] for g in self.genes]),
+      labels = packStrings(self.labels))
+    os.replace(tmpFileName, self.fileName)
+    self.modified = False
+
+
+
+class StoreResults:
+  """Results read from (and written to) an SQLite store"""
+
+  def __init__(self, fileName):
+    self.db = sqlite3.connect(fileName)
+    self.db.executescript(SCHEMA)
+    self.geneIds = {name: (i, fc) for i, name, fc in self.db.execute('SELECT id, name, fc FROM genes')}
+    self.labelIds = {label: i for i, label in self.db.execute('SELECT id, label FROM labels')}
+    self.labels = {i: label for label, i in self.labelIds.items()}
+
+  def runId(self, runName):
+    row = self.db.execute('SELECT id, status FROM runs WHERE name = ?', (runName,)).fetchone()
+    return (None, None) if row is None else row
+
+  def hasRun(self, runName):
+    return self.runId(runName)[0] is not None
+
+  def hasProperResult(self, runName):
+    return self.runId(runName)[1] == STATUS_OK
+
+  def loadResult(self, runName):
+    """Prediction rows [gene, 'pred:xxx', fold-change] of a run, in the order of result-0.0.tsv"""
+    return [[name, 'pred:' + self.labels[label], fc] for name, label, fc in self.db.execute(
+      'SELECT genes.name, predictions.label, genes.fc FROM predictions JOIN genes ON genes.id = predictions.gene '
+      'WHERE predictions.run = (SELECT id FROM runs WHERE name = ?) ORDER BY predictions.rowid', (runName,))]
+
+  def loadObservations(self, runName):
+    """Sampled observations (gene, label) of a run"""
+    return [(name, self.labels[label]) for name, label in self.db.execute(
+      'SELECT genes.name, observations.label FROM observations JOIN genes ON genes.id = observations.gene '
+      'WHERE observations.run = (SELECT id FROM runs WHERE name = ?) ORDER BY observations.rowid', (runName,))]
+
+  def writeScore(self, runName, matName, score):
+    self.db.execute('INSERT OR REPLACE INTO scores VALUES ((SELECT id FROM runs WHERE name = ?), ?, ?)',
+      (runName, matName, score))
+    self.db.commit()
+
+  def geneId(self, name, fc = None):
+    """ID of a gene, added if new (its fold-change is recorded as soon as it is known)"""
+    if name not in self.geneIds:
+      i = self.db.execute('INSERT INTO genes (name, fc) VALUES (?, ?)', (name, fc)).lastrowid
+      self.geneIds[name] = (i, fc)
+    elif fc is not None and self.geneIds[name][1] is None:
+      i = self.geneIds[name][0]
+      self.db.execute('UPDATE genes SET fc = ? WHERE id = ?', (fc, i))
+      self.geneIds[name] = (i, fc)
+    return self.geneIds[name][0]
+
+  def labelId(self, label):
+    """ID of a label (+, -, NOT+, etc.), added if new"""
+    if label not in self.labelIds:
+      i = self.db.execute('INSERT INTO labels (label) VALUES (?)', (label,)).lastrowid
+      self.labelIds[label] = i
+      self.labels[i] = label
+    return self.labelIds[label]
+
+  def deleteRun(self, runName):
+    """Delete the record of a run, if any (not committed)"""
+    oldId = self.runId(runName)[0]
+    if oldId is not None:
+      for table in ['observations', 'predictions', 'scores']:
+        self.db.execute('DELETE FROM {} WHERE run = ?'.format(table), (oldId,))
+      self.db.execute('DELETE FROM runs WHERE id = ?', (oldId,))
+
+  def removeRun(self, runName):
+    """Remove the record of a run, if any"""
+    self.deleteRun(runName)
+    self.db.commit()
+
+  def addRun(self, runName, observations, rows, message = None):
+    """Record a run (replacing any previous record) given its observations (gene, label),
+    the rows of its result-0.0.tsv (without header) or the message of its failure"""
+    self.deleteRun(runName)
+    status = STATUS_OK if message is None else STATUS_NORESULT
+    runId = self.db.execute('INSERT INTO runs (name, status, message) VALUES (?, ?, ?)',
+      (runName, status, message)).lastrowid
+    self.db.executemany('INSERT INTO observations VALUES (?, ?, ?)',
+      [(runId, self.geneId(gene), self.labelId(label)) for gene, label in observations])
+    if message is None:
+      self.db.executemany('INSERT INTO predictions VALUES (?, ?, ?)',
+        [(runId, self.geneId(row[0], row[2]), self.labelId(row[1][5:])) for row in rows
+          if row[1][0:5] == 'pred:'])
+    self.db.commit()
+
+  def addRunDir(self, runName, runDir):
+    """Record a run from its directory"""
+    observations = []
+    with open('{}/obs-noinputs.obs'.format(runDir), 'r') as obsFile:
+      for line in obsFile:
+        gene, _, label = line.rstrip('\n').partition(' = ')
+        if gene != '':
+          observations.append((gene, label))
+    if util.hasProperResult(runDir):
+      self.addRun(runName, observations, util.loadCSVWithHeader('{}/result-0.0.tsv'.format(runDir)))
+    else:
+      with open('{}/NORESULT'.format(runDir), 'r') as noResultFile:
+        message = noResultFile.read().rstrip('\n')
+      self.addRun(runName, observations, [], message if message != '' else 'no result')
+
+  def close(self):
+    self.db.close()
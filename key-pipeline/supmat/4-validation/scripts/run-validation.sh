@@ -18,6 +18,22 @@ START_SAMPLING=$3    # Sampling start percentage (f.i. 10)
 STOP_SAMPLING=$4     # Sampling stop percentage (f.i. 95)
 STEP_SAMPLING=$5      # Sampling percentage step (f.i. 5)
 NUMBER_RUNS=$6      # Number of runs for each sampling (f.i. 100)
+JOBS=${7:-1}        # Number of runs computed in parallel (f.i. the number of cores)
+STORE=""            # Record the runs in a result store (if the 8th argument is "store")
+if [ "$8" = "store" ]; then
+  STORE="--store"
+fi
+RESUME="--resume"    # Resume an interrupted computation with the same parameters (unless the 9th argument is "new")
+ADAPTIVE=""         # Adaptive number of runs, NUMBER_RUNS being the maximum (if the 10th argument is a tolerance, f.i. 0.05)
+if [ -n "${10}" ]; then
+  ADAPTIVE="--tolerance ${10}"
+fi
+UP_THRESHOLD=${11:-2}      # Thresholds of the observations (see ../../1-graph-extraction/scripts/build-observations.py)
+DOWN_THRESHOLD=${12:--0.5}
+PADJ_THRESHOLD=${13:-5}
+
+# Stop at the first failing command, so that pipe.py records the step as failed
+set -e
 
 # If needed, specify your Iggy command here:
 IGGY="$CONDA_PREFIX/bin/iggy.py"
@@ -26,15 +42,16 @@ IGGY="$CONDA_PREFIX/bin/iggy.py"
 
 # Compute all runs for all samplings
 #OUTDIR="prp-${START_SAMPLING}-${STOP_SAMPLING}-${STEP_SAMPLING}-${NUMBER_RUNS}/"
-if [  -d ./supmat/4-validation/output ]; then
- rm -r ./supmat/4-validation/output;
-fi
 OUTDIR="./supmat/4-validation/output"
+if [ "$9" = "new" ] && [ -d "$OUTDIR" ]; then
+ rm -r "$OUTDIR";
+fi
 
 #construct all the positive nodes on a file, and all negative nodes in another
-sh ./supmat/4-validation/scripts/construct_trueup_truedown.sh ./supmat/2-pathrider/data/out-filtered.sif ./supmat/2-pathrider/data/updown-noinputs_gen2.obs
-#time python ./supmat/4-validation/scripts/pickrandom-percentage.py --scripts-path ./supmat/3-iggy/scripts/ --iggy-command "$IGGY" ./supmat/2-graph-extraction/data/graph.sif ./supmat/1-diff-analysis/data/GSEA_EMThigh_vs_EMTlow_diffexp.csv ./supmat/4-validation/data/name-true-up_gen.csv ./supmat/4-validation/data/name-true-down_gen.csv $START_SAMPLING $STOP_SAMPLING $STEP_SAMPLING $NUMBER_RUNS "$OUTDIR"
-time python3 ./supmat/4-validation/scripts/pickrandom-percentage.py --scripts-path ./supmat/3-iggy/scripts/ --iggy-command "$IGGY" ./supmat/2-pathrider/data/out-filtered.sif $2 ./supmat/4-validation/data/name-true-up_gen.csv ./supmat/4-validation/data/name-true-down_gen.csv $START_SAMPLING $STOP_SAMPLING $STEP_SAMPLING $NUMBER_RUNS "$OUTDIR"
+#sh ./supmat/4-validation/scripts/construct_trueup_truedown.sh ./supmat/2-pathrider/data/out-filtered.sif ./supmat/2-pathrider/data/updown-noinputs_gen2.obs
+python3 ./supmat/1-graph-extraction/scripts/build-observations.py $2 --up "$UP_THRESHOLD" --down "$DOWN_THRESHOLD" --log-padj "$PADJ_THRESHOLD" --sif ./supmat/2-pathrider/data/out-filtered.sif --true-up ./supmat/4-validation/data/name-true-up_gen.csv --true-down ./supmat/4-validation/data/name-true-down_gen.csv || exit 1
+#time python ./supmat/4-validation/scripts/pickrandom-percentage.py --scripts-path ./supmat/3-iggy/scripts/ --iggy-command "$IGGY" ./supmat/2-graph-extraction/data/graph.sif ./supmat/1-diff-analysis/data/GSEA_EMThigh_vs_EMTlow_diffexp.csv ./supmat/4-validation/data/name-true-up_gen.csv ./supmat/4-validation/data/name-true-down_gen.csv $START_SAMPLING $STOP_SAMPLING $STEP_SAMPLING $NUMBER_RUNS "$OUTDIR" --jobs $JOBS $STORE
+time python3 ./supmat/4-validation/scripts/pickrandom-percentage.py --scripts-path ./supmat/3-iggy/scripts/ --iggy-command "$IGGY" ./supmat/2-pathrider/data/out-filtered.sif $2 ./supmat/4-validation/data/name-true-up_gen.csv ./supmat/4-validation/data/name-true-down_gen.csv $START_SAMPLING $STOP_SAMPLING $STEP_SAMPLING $NUMBER_RUNS "$OUTDIR" --jobs $JOBS $STORE $RESUME $ADAPTIVE
 
 #mkdir "$OUTDIR/plots"
 
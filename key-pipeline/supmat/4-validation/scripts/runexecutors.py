@@ -0,0 +1,285 @@
+# Library for the execution of the runs of the random pick cross-validation
+# -------------------------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+###
+# Library for the execution of the runs of the random pick cross-validation
+###
+# The runs of a sweep are prepared by pickrandom-percentage.py in their temporary folders NNN.tmp
+# (see percentage_random_pick.py), then computed and finished by one of the executors,
+# which all have a method run(totCurDirs) (computing the runs and finishing them in the sweep)
+# and a method close():
+# - SchedulerExecutor: the calls to Iggy are run by the scheduler (see ../../lib/runscheduler.py),
+#   --jobs at once, and post-processed on a pool of --jobs worker processes
+# - SpoolExecutor: on the workers of a spool folder (--spool, see spool.py),
+#   themselves run by SpoolWorker (--worker)
+# The computation of a run in a folder is given by the script: a coroutine function
+# schedule(workDir, executor) for SchedulerExecutor, or a function compute(workDir) for SpoolWorker,
+# returning None on success or the error message (the failed runs being marked with a NORESULT file).
+# The pools of worker processes use the fork context: the workers inherit the state of the script
+# (parsed arguments, graph, ICGC data...) at the creation of the executor.
+#
+# The state of the sweep (class Sweep) is passed to the executors: the manifest of the completed runs
+# (checkpoint, see percentage_random_pick.py), the result store (--store) and the failed runs.
+#
+# Typical usage:
+#   sweep = runexecutors.Sweep(outDir, store)
+#   executor = runexecutors.SchedulerExecutor(sweep, runscheduler.RunScheduler(4), scheduleExperiment)
+#   executor.run([totCurDir for totCurDir in totCurDirs if not sweep.isDone(totCurDir)])
+#   executor.close()
+#   sweep.close()
+###
+
+
+
+import os
+import sys
+import time
+import shutil
+import functools
+import threading
+import collections
+import multiprocessing
+import concurrent.futures
+import percentage_random_pick as prp
+import resultstore
+import spool
+import util
+
+
+
+def noResult(totCurDir, error):
+  """Mark a failed run with a NORESULT file containing the error; return the error message"""
+  with open('{}/NORESULT'.format(totCurDir), 'w') as noResultFile:
+    noResultFile.write('{}\n'.format(error))
+  return str(error)
+
+class Sweep:
+  """Completed runs of a sweep in folder outDir (manifest and result store, or None), and its failed runs"""
+
+  def __init__(self, outDir, store = None):
+    self.outDir = outDir
+    self.store = store
+    self.results = store if store is not None else resultstore.DirResults(outDir, cache = False)
+    self.done = prp.loadManifest(outDir)   # Completed runs (run name: status)
+    self.failedRuns = []   # List of (folder, error message) of the failed runs
+
+  def runName(self, totCurDir):
+    return os.path.relpath(totCurDir, self.outDir)
+
+  def recordRun(self, totCurDir):
+    """Record a finished run in the result store (if any) and remove its folder"""
+    if self.store is not None:
+      self.store.addRunDir(self.runName(totCurDir), totCurDir)
+      shutil.rmtree(totCurDir)
+
+  def finishRun(self, totCurDir, error):
+    """Finish a run computed in its temporary folder: rename the folder into place,
+    record the run and add it to the manifest"""
+    os.rename(prp.tempDir(totCurDir), totCurDir)
+    self.recordRun(totCurDir)
+    self.done[self.runName(totCurDir)] = 'ok' if error is None else 'failed'
+    prp.writeManifest(self.outDir, self.done)
+    if error is not None:
+      self.failedRuns.append((totCurDir, error))
+    print('  -- {}{}'.format(totCurDir, '' if error is None else ' FAILED'))
+    sys.stdout.flush()
+
+  def discardRun(self, totCurDir):
+    """Remove a finished run which is not part of the results (computed after the adaptive number
+    of runs of its sampling), and mark it as surplus in the manifest so that it is not computed again"""
+    if self.done.get(self.runName(totCurDir)) == 'surplus':
+      return
+    if self.store is not None:
+      self.store.removeRun(self.runName(totCurDir))
+    elif os.path.isdir(totCurDir):
+      shutil.rmtree(totCurDir)
+    self.done[self.runName(totCurDir)] = 'surplus'
+    prp.writeManifest(self.outDir, self.done)
+    self.failedRuns = [(d, error) for d, error in self.failedRuns if d != totCurDir]
+    print('  -- {} removed (surplus)'.format(totCurDir))
+    sys.stdout.flush()
+
+  def isDone(self, totCurDir):
+    """Check if a run was completed by a previous computation; a run completed
+    but missing from the manifest (interrupted just before its update) is added to it"""
+    runName = self.runName(totCurDir)
+    if runName in self.done:
+      return True
+    if self.store is not None and self.store.hasRun(runName):
+      self.done[runName] = 'ok' if self.store.hasProperResult(runName) else 'failed'
+      if os.path.isdir(totCurDir):
+        shutil.rmtree(totCurDir)
+    elif prp.isCompleteRun(totCurDir):
+      self.done[runName] = 'ok' if util.hasProperResult(totCurDir) else 'failed'
+      self.recordRun(totCurDir)
+    else:
+      return False
+    prp.writeManifest(self.outDir, self.done)
+    return True
+
+  def close(self):
+    if self.store is not None:
+      self.store.close()
+
+
+
+# Barrier on which the workers of a new pool wait for each other (inherited by the workers)
+poolStarted = None
+
+def waitPoolStarted():
+  poolStarted.wait()
+
+def makePool(jobs):
+  """Pool of jobs worker processes (fork context), all started (forked) at once by jobs which wait
+  for each other, so that they are not forked later in an event loop or with other threads"""
+  global poolStarted
+  context = multiprocessing.get_context('fork')
+  poolStarted = context.Barrier(jobs)
+  pool = concurrent.futures.ProcessPoolExecutor(max_workers = jobs, mp_context = context)
+  for future in [pool.submit(waitPoolStarted) for _ in range(jobs)]:
+    future.result()
+  return pool
+
+class SchedulerExecutor:
+  """Compute the runs with the coroutines schedule(workDir, executor) run by the scheduler (jobs at once,
+  in its event loop), their post-processing being run by executor: a pool of jobs worker processes
+  if jobs > 1, otherwise None (a thread of this process)"""
+
+  def __init__(self, sweep, scheduler, schedule):
+    self.sweep = sweep
+    self.scheduler = scheduler
+    self.schedule = schedule
+    self.pool = makePool(scheduler.jobs) if scheduler.jobs > 1 else None
+
+  def run(self, totCurDirs):
+    def finish(index, error):
+      self.sweep.finishRun(totCurDirs[index], error)
+    self.scheduler.runAll([functools.partial(self.schedule, prp.tempDir(totCurDir), self.pool)
+      for totCurDir in totCurDirs], finish)
+
+  def close(self):
+    if self.pool is not None:
+      self.pool.shutdown()
+    self.scheduler.close()
+
+
+
+def attemptDir(totCurDir, worker):
+  """Folder in which a worker of the spool computes a run"""
+  return '{}.{}.tmp'.format(totCurDir, worker)
+
+class SpoolExecutor:
+  """Compute the runs on the workers of a spool (coordinator), which submits the jobs of a worker
+  whose lease is older than leaseTimeout seconds again"""
+
+  def __init__(self, sweep, jobSpool, leaseTimeout):
+    self.sweep = sweep
+    self.jobSpool = jobSpool
+    self.leaseTimeout = leaseTimeout
+
+  def run(self, totCurDirs):
+    """Compute the runs (the first result of each run is kept; a run whose lease was lost
+    too many times is marked as failed)"""
+    outDir = self.sweep.outDir
+    waiting = collections.OrderedDict((self.sweep.runName(totCurDir), totCurDir) for totCurDir in totCurDirs)
+    discarded = set()   # Folders of the attempts of stale leases, removed
+    for runName in waiting:
+      self.jobSpool.submit(runName)
+    while len(waiting) > 0:
+      for runName, attempt, error in self.jobSpool.collect():
+        attempt = '{}/{}'.format(outDir, attempt)
+        if runName not in waiting or attempt in discarded:
+          # Late result of a run already finished, or of a stale lease
+          shutil.rmtree(attempt, ignore_errors = True)
+          continue
+        totCurDir = waiting.pop(runName)
+        self.jobSpool.cancel(runName)
+        if prp.isCompleteRun(attempt):
+          shutil.rmtree(prp.tempDir(totCurDir))
+          os.rename(attempt, prp.tempDir(totCurDir))
+        else:
+          shutil.rmtree(attempt, ignore_errors = True)
+          error = noResult(prp.tempDir(totCurDir), 'Worker failure: {}'.format(error))
+        self.sweep.finishRun(totCurDir, error)
+      for runName, worker, leases in self.jobSpool.requeueStale(self.leaseTimeout):
+        totCurDir = waiting.get(runName, '{}/{}'.format(outDir, runName))
+        discarded.add(attemptDir(totCurDir, worker))
+        shutil.rmtree(attemptDir(totCurDir, worker), ignore_errors = True)
+        if runName not in waiting:
+          self.jobSpool.cancel(runName)
+        elif leases >= spool.MAX_LEASES:
+          self.jobSpool.cancel(runName)
+          del waiting[runName]
+          error = noResult(prp.tempDir(totCurDir),
+            'Worker failure: lease lost {} times (last worker: {})'.format(leases, worker))
+          self.sweep.finishRun(totCurDir, error)
+        else:
+          print('  -- {}: lease of worker {} lost, submitted again'.format(totCurDir, worker))
+      if len(waiting) > 0:
+        time.sleep(spool.POLL_INTERVAL)
+
+  def close(self):
+    """Tell the workers of the spool to stop"""
+    self.jobSpool.setFinished(True)
+
+class SpoolWorker:
+  """Worker of a spool: claim the jobs of the runs of the sweep in folder outDir and compute them
+  with compute(workDir), renewing the lease of each job every leaseTimeout / 4 seconds"""
+
+  def __init__(self, jobSpool, outDir, compute, leaseTimeout):
+    self.jobSpool = jobSpool
+    self.outDir = outDir
+    self.compute = compute
+    self.leaseTimeout = leaseTimeout
+
+  def keepLease(self, claim, stop):
+    """Renew the lease of a job claimed by this worker until stop is set (or the lease is lost)"""
+    while not stop.wait(self.leaseTimeout / 4):
+      if not self.jobSpool.heartbeat(claim):
+        return
+
+  def work(self):
+    """Claim the jobs and compute their runs until the coordinator is finished"""
+    worker = spool.workerName()
+    while True:
+      claim = self.jobSpool.claim(worker)
+      if claim is None:
+        if self.jobSpool.isFinished():
+          return
+        time.sleep(spool.POLL_INTERVAL)
+        continue
+      totCurDir = '{}/{}'.format(self.outDir, claim.runName)
+      workDir = attemptDir(totCurDir, worker)
+      stop = threading.Event()
+      heartbeat = threading.Thread(target = self.keepLease, args = (claim, stop), daemon = True)
+      heartbeat.start()
+      try:
+        if os.path.isdir(workDir):
+          shutil.rmtree(workDir)
+        os.makedirs(workDir)
+        for obsFileName in ['obs-noinputs.obs', 'obs-withinputs.obs']:
+          shutil.copy('{}/{}'.format(prp.tempDir(totCurDir), obsFileName), workDir)
+        error = self.compute(workDir)
+      except OSError as e:
+        # The run was prepared again or finished meanwhile (stale lease), or the file system failed
+        error = str(e)
+      finally:
+        stop.set()
+        heartbeat.join()
+      self.jobSpool.complete(claim, os.path.relpath(workDir, self.outDir), error)
+      print('  -- {}{}'.format(totCurDir, '' if error is None else ' FAILED'))
+      sys.stdout.flush()
+
+  def run(self, jobs):
+    """Work in this process, or in jobs worker processes (fork context)"""
+    if jobs == 1:
+      self.work()
+      return
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target = self.work) for _ in range(jobs)]
+    for process in processes:
+      process.start()
+    for process in processes:
+      process.join()
@@ -16,115 +16,167 @@
 #     or: 3 values: 1 prediction type (+, -, 0, etc.), keyword 'cpy' or 'inv', and
 #           another existing prediction type (+, -, 0, etc.)
 #           => store identical or inverted values of first prediction
+#
+# Scoring:
+#   A matrix file is loaded into a ScoreMatrix object, which also compiles it into a dense
+#   lookup table (prediction code × segment); several matrices can be used in the same process.
+#   The predictions of a run are parsed only once (parsePredictions), whatever the number
+#   of matrices, into prediction types and gene IDs (genes with their fold-changes, see geneIds).
+#   Each matrix computes the segment of the fold-change of a gene once, in its array of segments
+#   by gene ID, and the score for a matrix is a gather-and-sum on its table (see scorePredictions).
+#
+# Typical usage:
+#   matrices = [scorematrix.ScoreMatrix(f) for f in ['m2.tsv', 'm3.tsv']]
+#   preds, genes, numPred = scorematrix.parsePredictions(rows)
+#   scores = [m.scorePredictions(preds, genes) for m in matrices]
 ###
 
 
 
 import csv
-import bisect
-
-
-
-# Empty matrix
-scoreMatValues = None   # [List of bound values]
-scoreMat = None   # Prediction type: [List of score values for each bound]
-
-def checkMatrix():
-  """Sanity check of the matrix and its bound values"""
-  if scoreMatValues is None or scoreMat is None:
-    raise ValueError('Matrix has not been loaded')
-  if len(scoreMatValues) == 0:
-    raise ValueError('scoreMatValues must contain values')
-  if scoreMatValues != sorted(scoreMatValues):
-    raise ValueError('scoreMatValues is not sorted')
-  if len(scoreMatValues) != len(set(scoreMatValues)):
-    raise ValueError('scoreMatValues has duplicates')
-  if len(scoreMat) == 0:
-    raise ValueError('Matrix must contain values')
-  for r in scoreMat:
-    if len(scoreMat[r]) != len(scoreMatValues) + 1:
-      raise ValueError('Row {} of matrix has length {}, but length {} was expected'.format(r, len(scoreMat[r]), len(scoreMatValues) + 1))
+import numpy as np
+
+
+
+# Genes found in the predictions, with their fold-changes: (gene name, fold-change) → gene ID
+geneIds = {}
+geneFCs = []   # Gene ID: fold-change (float)
+
+
+
+class ScoreMatrix:
+  """Score matrix loaded from a file"""
 
-def loadMatrix(f):
-  """Load the matrix from file name f"""
-  # Global variables
-  global scoreMatValues
-  global scoreMat
-  scoreMat = {}
   # Keywords
   specialKeyWords = {
     'cpy': lambda l: l[:],
     'inv': lambda l: l[::-1] }
-  
-  # Open file
-  with open(f, 'r') as fdata:
-    dataReader = csv.reader(fdata, delimiter='\t')
-    # First line: bouds
-    row = next(dataReader)
-    while row[0] == '': row.pop(0)
-    scoreMatValues = list(map(float, row))
-    # Next lines: prediction scores
-    for row in dataReader:
-      if len(row) > 0:
-        # If special keyword...
-        if row[1] in specialKeyWords.keys():
-          scoreMat[row[0]] = specialKeyWords[row[1]](scoreMat[row[2]])
-        # Without special keyword...
-        else:
-          scoreMat[row[0]] = list(map(float, row[1:]))
-  checkMatrix()
-
-def loadData(f):
-  """Load prediction results + ICGC data from an ObsPred file named f"""
-  genes = {}    # Gene name: (Gene prediction, Gene fold-change)
-  with open(f, 'r') as fdata:
-    dataReader = csv.reader(fdata, delimiter='\t')
-    # Ignore first line
-    next(dataReader)
-    # Read (name, prediction, fold-change)
-    for row in dataReader:
-      (curName, curPred, curFC) = row[0:3]
-      if curPred[0:5] == 'pred:' and curFC != 'not-found':
-        genes[curName] = (curPred[5:], float(curFC))
-  return genes
-
-def findSegment(x):
-  """Find segment of elemnt x in scoreMatValues"""
-  if x > scoreMatValues[-1]:
-    return len(scoreMatValues)
-  else:
-    return bisect.bisect_left(scoreMatValues, x)
-
-def computeScore(genes):
-  """Compute score of a given genes dictionary"""
-  score = 0
-  nbr = 0
-  for g in genes:
-    curIdx = findSegment(genes[g][1])
-    curPred = genes[g][0]
-    if curPred in scoreMat:
-      score += scoreMat[curPred][curIdx]
-      nbr += 1
-  return score, nbr
+
+  def __init__(self, f):
+    """Load the matrix from file name f"""
+    self.fileName = f
+    self.values = None   # [List of bound values]
+    self.mat = {}   # Prediction type: [List of score values for each bound]
+    # Open file
+    with open(f, 'r') as fdata:
+      dataReader = csv.reader(fdata, delimiter='\t')
+      # First line: bouds
+      row = next(dataReader)
+      while row[0] == '': row.pop(0)
+      self.values = list(map(float, row))
+      # Next lines: prediction scores
+      for row in dataReader:
+        if len(row) > 0:
+          # If special keyword...
+          if row[1] in self.specialKeyWords.keys():
+            self.mat[row[0]] = self.specialKeyWords[row[1]](self.mat[row[2]])
+          # Without special keyword...
+          else:
+            self.mat[row[0]] = list(map(float, row[1:]))
+    self.check()
+    # Lookup table: prediction code × segment
+    self.predCodes = {p: c for c, p in enumerate(self.mat)}   # Prediction type: code (row of table)
+    self.table = np.array([self.mat[p] for p in self.mat], dtype = np.float64)
+    self.bounds = np.array(self.values, dtype = np.float64)
+    self.geneSegments = np.zeros(0, dtype = np.int64)   # Gene ID: segment of its fold-change
+
+  def check(self):
+    """Sanity check of the matrix and its bound values"""
+    if len(self.values) == 0:
+      raise ValueError('ScoreMatrix.values must contain values')
+    if self.values != sorted(self.values):
+      raise ValueError('ScoreMatrix.values is not sorted')
+    if len(self.values) != len(set(self.values)):
+      raise ValueError('ScoreMatrix.values has duplicates')
+    if len(self.mat) == 0:
+      raise ValueError('Matrix must contain values')
+    for r in self.mat:
+      if len(self.mat[r]) != len(self.values) + 1:
+        raise ValueError('Row {} of matrix has length {}, but length {} was expected'.format(r, len(self.mat[r]), len(self.values) + 1))
+
+  def segments(self, genes):
+    """Segments of the fold-changes of an array of gene IDs, computed once for each gene"""
+    if len(self.geneSegments) < len(geneFCs):
+      fcs = np.array(geneFCs[len(self.geneSegments):], dtype = np.float64)
+      segs = np.searchsorted(self.bounds, fcs, 'left')
+      # NaN values are in the first segment
+      segs[np.isnan(fcs)] = 0
+      self.geneSegments = np.concatenate([self.geneSegments, segs])
+    return self.geneSegments[genes]
+
+  def scorePredictions(self, preds, genes, normalize = True):
+    """Score (normalized on the number of scored predictions if normalize) of the predictions
+    returned by parsePredictions; the predictions absent from the matrix are not scored"""
+    codes = np.array([self.predCodes.get(p, -1) for p in preds], dtype = np.int64)
+    scored = codes >= 0
+    if not scored.any():
+      return 0
+    # Sequential sum (from 0, in the order of the genes in the results), as the former loop over the genes,
+    # so that the scores written by stats-matrixscore.py are bit-identical to those of the previous versions
+    # (np.sum adds pairwise, and math.fsum rounds once: both may change the last bits)
+    s = sum(self.table[codes[scored], self.segments(genes[scored])].tolist())
+    return s / np.count_nonzero(scored) if normalize else s
+
+  def scoreRows(self, rows, normalize = True):
+    """Score (normalized if normalize) and number of predictions
+    of the rows of an ObsPred file (without header), parsed once"""
+    preds, fcs, numPred = parsePredictions(rows)
+    return self.scorePredictions(preds, fcs, normalize), numPred
+
+  def scoreFile(self, fPred, normalize = True):
+    """Same as scoreRows on the file fPred"""
+    with open(fPred, 'r') as fdata:
+      dataReader = csv.reader(fdata, delimiter='\t')
+      # Ignore first line
+      next(dataReader)
+      return self.scoreRows(dataReader, normalize)
+
+
+
+# Matrices already loaded, by file name
+loadedMatrices = {}
+
+def loadMatrix(f):
+  """Matrix of file name f (loaded once)"""
+  if f not in loadedMatrices:
+    loadedMatrices[f] = ScoreMatrix(f)
+  return loadedMatrices[f]
+
+def geneId(name, fc):
+  """ID of a gene with its fold-change (as written in the results), added to geneIds if new"""
+  if (name, fc) not in geneIds:
+    geneIds[(name, fc)] = len(geneFCs)
+    geneFCs.append(float(fc))
+  return geneIds[(name, fc)]
+
+def parsePredictions(rows):
+  """Parse the rows of an ObsPred file (without header) into the list of prediction types
+  and the array of gene IDs (see geneId) of the predictions found in the ICGC data (the last one of each gene),
+  and count the predictions"""
+  genes = {}    # Gene name: (Gene prediction, Gene ID)
+  numPred = 0
+  for row in rows:
+    (curName, curPred, curFC) = row[0:3]
+    if curPred[0:5] == 'pred:':
+      numPred += 1
+      if curFC != 'not-found':
+        genes[curName] = (curPred[5:], geneId(curName, curFC))
+  return [g[0] for g in genes.values()], np.array([g[1] for g in genes.values()], dtype = np.int64), numPred
+
+def scoreRows(fMat, rows, normalize = True):
+  """Score (as score, or score_nn if not normalize) and number of predictions
+  of the rows of an ObsPred file (without header), parsed once"""
+  return loadMatrix(fMat).scoreRows(rows, normalize)
+
+def scoreFile(fMat, fPred, normalize = True):
+  """Same as scoreRows on the file fPred"""
+  return loadMatrix(fMat).scoreFile(fPred, normalize)
 
 def score(fMat, fPred):
   """General score function on files fMat (matrix) and fPred (Iggy predictions and ICGC data)"""
-  if scoreMat is None:
-    loadMatrix(fMat)
-  s, l = computeScore(loadData(fPred))
-  return s / l if l != 0 else 0
+  return scoreFile(fMat, fPred)[0]
 
 def score_nn(fMat, fPred):
   """General score function on files fMat (matrix) and fPred (Iggy predictions and ICGC data),
   without normalization"""
-  if scoreMat is None:
-    loadMatrix(fMat)
-  return computeScore(loadData(fPred))[0]
-
-## DEBUG
-#def printMatrix():
-#  """Print matrix"""
-#  print(scoreMatValues)
-#  for k in scoreMat:
-#    print('{:>6}: {}'.format(k, scoreMat[k]))
-
+  return scoreFile(fMat, fPred, False)[0]
@@ -0,0 +1,202 @@
+# Library for distributing the runs of the random pick cross-validation through a spool folder
+# ---------------------------------------------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+###
+# Library for distributing the runs of the random pick cross-validation through a spool folder
+###
+# The spool is a folder shared by a coordinator and workers (f.i. on an NFS mount),
+# without any network service; all the operations are renames of files in the spool:
+#   pending/<job>.job              jobs waiting for a worker (one per run, f.i. prp010-1.job)
+#   claimed/<job>.job.<worker>     jobs claimed by a worker (lease); the worker touches this file
+#                                  periodically (heartbeat)
+#   done/<job>.<worker>.json       results of the workers (run, folder of the attempt, error)
+#   clock                          file touched to read the time of the file server
+#   finished                       written by the coordinator once all the runs are done
+# A worker claims a job by renaming it from pending/ to claimed/: only one worker can succeed.
+# A lease whose file has not been touched for longer than the lease timeout is stale
+# (worker killed, host down, etc.): the coordinator renames it back to pending/.
+# The ages of the leases are measured with the clock of the file server (modification times set
+# by os.utime without explicit times, and by writing the clock file), so that the clocks of the hosts
+# do not need to be synchronized.
+# Runs are identified by their relative directory name (f.i. 'prp010/1').
+#
+# Typical usage:
+#   s = spool.Spool('spool')
+#   s.submit('prp010/1')                 # Coordinator
+#   claim = s.claim('host-1234')         # Worker
+#   s.complete(claim, 'prp010/1.host-1234.tmp', None)
+#   for runName, attemptDir, error in s.collect(): ...   # Coordinator
+#   for runName, worker, leases in s.requeueStale(120): ...   # Coordinator
+###
+
+
+
+import os
+import json
+import socket
+
+
+
+# Sub-folders of the spool
+PENDING = 'pending'
+CLAIMED = 'claimed'
+DONE = 'done'
+
+# Extension of the job files
+JOB_EXTENSION = '.job'
+
+# Marker written by the coordinator once all the runs are done
+FINISHED = 'finished'
+
+# Number of stale leases after which a run is considered as failed
+MAX_LEASES = 3
+
+# Interval between two polls of the spool (in seconds)
+POLL_INTERVAL = 1
+
+
+
+def workerName():
+  """Identifier of a worker: host name and process ID"""
+  return '{}-{}'.format(socket.gethostname().split('.')[0], os.getpid())
+
+def jobName(runName):
+  """Name of the job file of a run"""
+  return runName.replace('/', '-') + JOB_EXTENSION
+
+class Claim:
+  """Job claimed by a worker"""
+
+  def __init__(self, fileName, runName, worker):
+    self.fileName = fileName
+    self.runName = runName
+    self.worker = worker
+
+class Spool:
+  """Spool folder shared by a coordinator and workers"""
+
+  def __init__(self, dirName):
+    self.dirName = dirName
+    self.leases = {}  # Run name: number of stale leases (coordinator)
+    for d in [PENDING, CLAIMED, DONE]:
+      os.makedirs(self.path(d), exist_ok = True)
+
+  def path(self, *names):
+    return os.path.join(self.dirName, *names)
+
+  def now(self):
+    """Current time of the file server of the spool"""
+    with open(self.path('clock'), 'w'):
+      pass
+    return os.stat(self.path('clock')).st_mtime
+
+  def clear(self):
+    """Remove all the jobs, leases and results (new computation)"""
+    for d in [PENDING, CLAIMED, DONE]:
+      for fileName in os.listdir(self.path(d)):
+        os.remove(self.path(d, fileName))
+    self.setFinished(False)
+
+  def setFinished(self, finished):
+    """Write (or remove) the marker telling the workers that all the runs are done"""
+    if finished:
+      with open(self.path(FINISHED), 'w'):
+        pass
+    elif os.path.exists(self.path(FINISHED)):
+      os.remove(self.path(FINISHED))
+
+  def isFinished(self):
+    return os.path.exists(self.path(FINISHED))
+
+  # Coordinator
+
+  def submit(self, runName):
+    """Add the job of a run (written aside, then renamed)"""
+    job = jobName(runName)
+    tmpFileName = self.path(PENDING, '.{}.tmp'.format(job))
+    with open(tmpFileName, 'w') as jobFile:
+      json.dump({'run': runName}, jobFile)
+    os.replace(tmpFileName, self.path(PENDING, job))
+
+  def cancel(self, runName):
+    """Remove the job of a run, if still pending"""
+    try:
+      os.remove(self.path(PENDING, jobName(runName)))
+    except FileNotFoundError:
+      pass
+
+  def collect(self):
+    """Remove and return the results of the workers, as (run name, attempt folder, error) tuples"""
+    results = []
+    for fileName in sorted(os.listdir(self.path(DONE))):
+      if not fileName.endswith('.json'):
+        continue
+      with open(self.path(DONE, fileName), 'r') as doneFile:
+        result = json.load(doneFile)
+      os.remove(self.path(DONE, fileName))
+      results.append((result['run'], result['attempt'], result['error']))
+    return results
+
+  def requeueStale(self, timeout):
+    """Put back the jobs whose lease is older than timeout seconds; return the list of
+    (run name, worker, number of stale leases of the run) of these jobs"""
+    requeued = []
+    now = self.now()
+    for fileName in os.listdir(self.path(CLAIMED)):
+      try:
+        if now - os.stat(self.path(CLAIMED, fileName)).st_mtime <= timeout:
+          continue
+        with open(self.path(CLAIMED, fileName), 'r') as jobFile:
+          runName = json.load(jobFile)['run']
+        job = jobName(runName)
+        os.rename(self.path(CLAIMED, fileName), self.path(PENDING, job))
+      except (FileNotFoundError, ValueError):
+        # Lease released or renamed meanwhile
+        continue
+      self.leases[runName] = self.leases.get(runName, 0) + 1
+      requeued.append((runName, fileName[len(job) + 1:], self.leases[runName]))
+    return requeued
+
+  # Worker
+
+  def claim(self, worker):
+    """Claim a pending job for the worker; None if there is none"""
+    for job in sorted(os.listdir(self.path(PENDING))):
+      if not job.endswith(JOB_EXTENSION) or job.startswith('.'):
+        continue
+      claimFileName = self.path(CLAIMED, '{}.{}'.format(job, worker))
+      try:
+        os.rename(self.path(PENDING, job), claimFileName)
+      except FileNotFoundError:
+        # Claimed by another worker (or, on NFS, renamed by a retransmitted request of this one)
+        if not os.path.exists(claimFileName):
+          continue
+      try:
+        os.utime(claimFileName)
+        with open(claimFileName, 'r') as jobFile:
+          return Claim(claimFileName, json.load(jobFile)['run'], worker)
+      except FileNotFoundError:
+        # Already considered as stale
+        continue
+    return None
+
+  def heartbeat(self, claim):
+    """Renew the lease of a claimed job; return False if the lease was lost (job requeued)"""
+    try:
+      os.utime(claim.fileName)
+      return True
+    except FileNotFoundError:
+      return False
+
+  def complete(self, claim, attemptDir, error):
+    """Record the result of a claimed job (folder of the attempt, error message or None) and release it"""
+    doneFileName = self.path(DONE, '{}.{}.json'.format(jobName(claim.runName)[:-len(JOB_EXTENSION)], claim.worker))
+    with open(doneFileName + '.tmp', 'w') as doneFile:
+      json.dump({'run': claim.runName, 'attempt': attemptDir, 'error': error, 'worker': claim.worker}, doneFile)
+    os.replace(doneFileName + '.tmp', doneFileName)
+    try:
+      os.remove(claim.fileName)
+    except FileNotFoundError:
+      pass
@@ -15,6 +15,13 @@
 #
 # Example:
 #   python stats-matrixscore.py prp-10-95-5-100/ m2.tsv --detail-scores --complete-pred "result.tsv" --export-plot --verbose
+#   python stats-matrixscore.py prp-10-95-5-100/ m2.tsv m3.tsv m4.tsv --complete-pred "result.tsv" --export-plot
+#
+# Several matrices are scored in a single pass over the runs (see scorematrix.py),
+# with a score file (score-<matrix>.txt) and a plot (<matrix>-mean-boxplot.html) for each matrix.
+# With --summary, the scores of each sampling are written in a summary table (see ../../lib/plotsummary.py),
+# from which ../../5-plots/scripts/render-plots.py draws the boxplot without reading the runs again
+# (with several matrices, one table SUMFILE-<matrix>.tsv for each matrix).
 ###
 
 
@@ -27,8 +34,13 @@ import argparse
 import scorematrix
 import statistics
 import percentage_random_pick as prp
+import resultstore
 import util
 
+# Shared Python library of the pipeline (supmat/lib)
+sys.path.insert(0, '{}/../../lib'.format(os.path.dirname(os.path.abspath(__file__))))
+import plotsummary
+
 
 
 # [Argparse] Command line parsing options
@@ -36,13 +48,13 @@ parser = argparse.ArgumentParser(
   add_help = False,
   description = """Compute matrix scores on random pick cross-validation results.""",
   epilog = """The program takes a result folder of the random pick cross-validation script
-    and computes independent scores based on a given score matrix,
+    and computes independent scores based on one or several given score matrices,
     and then computes global mean and deviation for each sampling.""")
 
 parser.add_argument('dirName', metavar = 'DIRNAME', type = str,
   help = 'The directory containing the result of the cross-validation computation')
-parser.add_argument('matFileName', metavar = 'MATFILE', type = str,
-  help = 'The file containing the score matrix')
+parser.add_argument('matFileNames', metavar = 'MATFILE', type = str, nargs = '+',
+  help = 'The files containing the score matrices')
 
 parser.add_argument('--detail-scores', dest = 'detailScores', action = 'store_true',
   help = 'Print the score of each individual run')
@@ -61,6 +73,10 @@ parser.add_argument('-pdf', '--pdf', dest = 'imagePDF', action = 'store_true',
 parser.add_argument('-d', '--dest-plot', dest = 'destPlotName',
   metavar = 'DESTPLOT', type = str, action = 'store', default = '',
   help = 'The destination of the plot files (HTML, JPG, PDF) relative to DIRNAME')
+parser.add_argument('-s', '--summary', dest = 'summaryFileName',
+  metavar = 'SUMFILE', type = str, action = 'store', default = None,
+  help = 'Write the scores of each sampling in the summary table SUMFILE (relative to DIRNAME), for render-plots.py '
+    + '(SUMFILE-<matrix>.tsv for each matrix if several MATFILE)')
 
 parser.add_argument('-m', '--plot-mean-pred', dest = 'plotPred', action = 'store_true',
   help = 'Add mean number of predictions to the plot')
@@ -78,8 +94,8 @@ args = parser.parse_args()
 if args.plot is False and args.image is True:
   print('Arguments error: Options --export-image requires --export-plot', file = sys.stderr)
   exit()
-if args.plot is False and args.predFileName is not None:
-  print('Arguments error: Options --complete-pred requires --export-plot', file = sys.stderr)
+if args.plot is False and args.summaryFileName is None and args.predFileName is not None:
+  print('Arguments error: Options --complete-pred requires --export-plot or --summary', file = sys.stderr)
   exit()
 if args.plot is False and args.plotPred is True:
   print('Arguments error: Options --plot-mean-pred requires --export-plot', file = sys.stderr)
@@ -99,25 +115,23 @@ destPlotName = args.destPlotName    # Output directory for plots
 if destPlotName != '' and destPlotName[0] != '/': destPlotName = '/' + destPlotName
 curDir = None    # Directory for current percentage (n)
 curExpDir = None    # Directory for current experiment
-totCurDir = None   # Complete current directory (dirName + curDir + curExpDir)
+runName = None   # Current run (curDir + curExpDir)
 
-# Matrix name
-matName = os.path.splitext(os.path.basename(args.matFileName))[0]
-
-# Score function
-f_score = scorematrix.score_nn if args.noNormalization else scorematrix.score
+# Matrices, and their names
+matrices = [scorematrix.ScoreMatrix(f) for f in args.matFileNames]
+matNames = [os.path.splitext(os.path.basename(f))[0] for f in args.matFileNames]
+if len(set(matNames)) != len(matNames):
+  print('Arguments error: Several matrices have the same name', file = sys.stderr)
+  exit(1)
 
 # Load info
 values, expValues = prp.loadInfo(dirName)
 
-# Initialize empty plot and data
-if args.plot or args.imagePDF:
-  import plotly.offline as pl
-  import plotly.graph_objs as go
-  plotData = []
-  predMeanList = []
-  predMaxList = []
-  predMinList = []
+# Results of the runs (from the result store if any, otherwise from the directory tree)
+results = resultstore.openResults(dirName)
+
+# Summary of each sampling for each matrix (rows of the summary tables, also used for the plots)
+summaryRows = {matName: [] for matName in matNames}
 
 
 
@@ -129,145 +143,83 @@ if args.verbose:
 for n in values:
 #  prevDir = curDir    # Previous directory name
 #  totPrevDir = totCurDir    # Previous total directory
-  scoresList = []   # List of score matrix scores
+  scoresLists = {matName: [] for matName in matNames}   # Lists of score matrix scores
   numPredList = []  # List of prediction numbers
   curDir = prp.nextDir(n, curDir)
   if args.verbose or args.detailScores:
-    print(curDir, end = '\n' if args.detailScores else ': ')
+    print(curDir, end = '\n' if args.detailScores or len(matrices) > 1 else ': ')
   # For each expriment...
-  for i in expValues:
+  for i in prp.expValuesOf(n):
     curExpDir = prp.nextExpDir(i)
-    totCurDir = prp.totalDir(dirName, curDir, curExpDir)    # Complete current directory
-    if util.hasProperResult(totCurDir):
-      # Compute score
-      score = f_score(args.matFileName, '{}/result-0.0.tsv'.format(totCurDir))
-      scoresList.append(score)
-      # Compute number of predictions
-      dataRes = util.loadCSV('{}/result-0.0.tsv'.format(totCurDir), skip = 1)
-      numPred = len([row for row in dataRes if row[1][0:5] == 'pred:'])
+    runName = '{}/{}'.format(curDir, curExpDir)    # Current run
+    if results.hasProperResult(runName):
+      # Compute the score for each matrix and the number of predictions (in a single parse)
+      preds, genes, numPred = scorematrix.parsePredictions(results.loadResult(runName))
       numPredList.append(numPred)
-      with open('{}/score-{}.txt'.format(totCurDir, matName), 'w') as matFile:
-        matFile.write(str(score))
+      scores = [m.scorePredictions(preds, genes, not args.noNormalization) for m in matrices]
+      for matName, score in zip(matNames, scores):
+        scoresLists[matName].append(score)
+        results.writeScore(runName, matName, score)
       if args.detailScores:
-        print('  -- {}: score = {}'.format(curExpDir, score))
+        if len(matrices) == 1:
+          print('  -- {}: score = {}'.format(curExpDir, scores[0]))
+        else:
+          print('  -- {}: {}'.format(curExpDir, ', '.join('score({}) = {}'.format(matName, score)
+            for matName, score in zip(matNames, scores))))
   
   # End of current sampling (n%)
-  if args.verbose:
-    print('mean = {:.4f}, SD = {:.4f}, mean #pred = {}'.format(statistics.mean(scoresList),
-      statistics.pstdev(scoresList), statistics.mean(numPredList)))
-  
-  # Create current box and data for the plot
-  if args.plot or args.imagePDF:
-    predMeanList.append(statistics.mean(numPredList))
-    predMaxList.append(max(numPredList))
-    predMinList.append(min(numPredList))
-    plotData.append(go.Box(
-      name = ('{:0.0f}%' if not prp.decimalPart else '{:0.4f}%').format(n),
-      x = [n] * len(scoresList),
-      y = scoresList[:],
-      boxpoints = 'outliers' if args.imagePDF else 'all',
-#      jitter = 0.3,
-      pointpos = 0 if args.imagePDF else -1.8
-#      boxmean='sd'
-    ))
+  for matName in matNames:
+    scoresList = scoresLists[matName]
+    if args.verbose:
+      print('{}mean = {:.4f}, SD = {:.4f}, mean #pred = {}'.format('  {}: '.format(matName) if len(matrices) > 1 else '',
+        statistics.mean(scoresList), statistics.pstdev(scoresList), statistics.mean(numPredList)))
+    
+    # Summary of the current sampling, for the plot
+    if args.plot or args.imagePDF or args.summaryFileName is not None:
+      summaryRows[matName].append({'kind': 'sampling', 'sampling': n,
+        'label': ('{:0.0f}%' if not prp.decimalPart else '{:0.4f}%').format(n), 'runs': len(scoresList),
+        'score_mean': statistics.mean(scoresList), 'score_sd': statistics.pstdev(scoresList),
+        'pred_mean': statistics.mean(numPredList), 'pred_min': min(numPredList), 'pred_max': max(numPredList),
+        'scores': scoresList})
 
 # End of the world
-
-# Show box plots of scores and line plots of number of predictions
-if args.plot or args.imagePDF:
-  plotFileName = '{}{}/{}-mean-boxplot{}'.format(dirName, destPlotName, matName, '-nn' if args.noNormalization else '')
-  if args.verbose:
-    print('Build plot ({})...'.format(plotFileName))
-  plotValues = values[:]
-  # Add last point at 100% sampling
-  if args.predFileName is not None:
-    plotValues += [100]
-    totPred = len([row for row in util.loadCSVWithHeader(args.predFileName)
-        if row[1][0:5] == 'pred:'])
-    predMeanList.append(totPred)
-    predMaxList.append(totPred)
-    predMinList.append(totPred)
-    plotData.append(go.Scatter(
-      name = ('{:0.0f}' if not prp.decimalPart else '{:0.4f}').format(100),
-      x = [100],
-      y = [f_score(args.matFileName, args.predFileName)],
-#      boxpoints = 'outliers' if args.imagePDF else 'all',
-#      jitter = 0.3,
-#      pointpos = -1.8
-#      boxmean='sd'
-    ))
-  # Add number of predictions (min, max, mean)
-  if args.plotPred or args.plotMMMPred:
-    # Mean
-    plotData.append(go.Scatter(
-      x = plotValues,
-      y = predMeanList,
-      yaxis = 'y2',
-      mode = 'lines+markers',
-      line = dict(
-        color = 'blue'
-      ),
-      name = 'Mean # pred'
-    ))
-  if args.plotMMMPred:
-    # Max
-    plotData.append(go.Scatter(
-      x = plotValues,
-      y = predMaxList,
-      yaxis = 'y2',
-      mode = 'lines+markers',
-      line = dict(
-        color = 'green'
-      ),
-      name = 'Max # pred'
-    ))
-    # Min
-    plotData.append(go.Scatter(
-      x = plotValues,
-      y = predMinList,
-      yaxis = 'y2',
-      mode = 'lines+markers',
-      line = dict(
-        color = 'red'
-      ),
-      name = 'Min # pred'
-    ))
-  # Layout
-  plotLayout = go.Layout(
-    title = 'Boxplot of the precision scores for each sampling',
-    showlegend = False,
-    xaxis = dict(
-      title = 'Sampling (%)',
-    ),
-    yaxis = dict(
-#      range = [0, 1],
-      title = 'Score'
-    )
-  )
-  if args.plotMMMPred:
-    plotLayout['title'] += '& mean, min and max number of predictions'
-  elif args.plotPred:
-    plotLayout['title'] += '& mean number of predictions'
-  if args.plotPred or args.plotMMMPred:
-    plotLayout['yaxis2'] = dict(
-      autorange = True,
-      overlaying = 'y',
-      side = 'right',
-      rangemode = "tozero", # "nonnegative",
-      title = 'Number of predictions'
-    )
-  # Build plot
-  plotFig = go.Figure(data = plotData, layout = plotLayout)
-  if args.imagePDF:
-    import plotly.io
-    plotly.io.write_image(plotFig, plotFileName + '.pdf')
-  if args.plot:
-    if not args.image:
-      pl.plot(plotFig, filename = plotFileName + '.html', show_link = False)
-    else:
-      pl.offline.plot(plotFig, filename = plotFileName + '_img.html', show_link = False,
-        image = 'png', image_width = 1600, image_height = 1200, image_filename = plotFileName)
-      pl.plot(plotFig, filename = plotFileName + '.html', show_link = False, auto_open = False)
+results.close()
+
+# Add last point at 100% sampling
+if args.predFileName is not None:
+  preds, genes, totPred = scorematrix.parsePredictions(util.loadCSVWithHeader(args.predFileName))
+  for matrix, matName in zip(matrices, matNames):
+    totScore = matrix.scorePredictions(preds, genes, not args.noNormalization)
+    summaryRows[matName].append({'kind': 'complete', 'sampling': 100,
+      'label': ('{:0.0f}' if not prp.decimalPart else '{:0.4f}').format(100), 'runs': 1,
+      'score_mean': totScore, 'score_sd': 0, 'pred_mean': totPred, 'pred_min': totPred, 'pred_max': totPred,
+      'scores': [totScore]})
+
+for matName in matNames:
+  # Write the summary table
+  if args.summaryFileName is not None:
+    summaryFileName = '{}/{}'.format(dirName, args.summaryFileName)
+    if len(matrices) > 1:
+      summaryFileName = '{}-{}{}'.format(os.path.splitext(summaryFileName)[0], matName, os.path.splitext(summaryFileName)[1])
+    if args.verbose:
+      print('Write summary table ({})...'.format(summaryFileName))
+    plotsummary.writeTable(summaryFileName, plotsummary.SCORE_COLUMNS, summaryRows[matName])
+
+  # Show box plots of scores and line plots of number of predictions
+  if args.plot or args.imagePDF:
+    plotFileName = '{}{}/{}-mean-boxplot{}'.format(dirName, destPlotName, matName, '-nn' if args.noNormalization else '')
+    if args.verbose:
+      print('Build plot ({})...'.format(plotFileName))
+    plotFig = plotsummary.scoreFigure(summaryRows[matName], 'mmm' if args.plotMMMPred else 'mean' if args.plotPred else None,
+      args.imagePDF)
+    if args.imagePDF:
+      plotsummary.writeImage(plotFig, plotFileName + '.pdf')
+    if args.plot:
+      if not args.image:
+        plotsummary.writeHTML(plotFig, plotFileName + '.html', autoOpen = True)
+      else:
+        plotsummary.writeHTML(plotFig, plotFileName + '_img.html', autoOpen = True, imageFileName = plotFileName)
+        plotsummary.writeHTML(plotFig, plotFileName + '.html')
 
 if args.verbose:
   print('Done.')
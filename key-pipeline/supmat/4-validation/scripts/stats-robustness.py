@@ -15,6 +15,10 @@
 #
 # Example:
 #   python stats-robustness.py prp-10-95-5-100/ out.tsv --complete-pred "result.tsv" --brief-weak --sum-all --verbose -ncp -100
+#
+# With --summary, the statistics of the plot of each sampling are written in a summary table
+# (see ../../lib/plotsummary.py), from which ../../5-plots/scripts/render-plots.py draws the plot
+# without reading the runs again.
 ###
 
 
@@ -22,10 +26,16 @@
 import os
 import sys
 import argparse
-import statistics
+import bisect
+import numpy as np
 import percentage_random_pick as prp
+import resultstore
 import util
 
+# Shared Python library of the pipeline (supmat/lib)
+sys.path.insert(0, '{}/../../lib'.format(os.path.dirname(os.path.abspath(__file__))))
+import plotsummary
+
 
 
 # [Argparse] Command line parsing options
@@ -75,6 +85,9 @@ parser.add_argument('-pdf', '--pdf', dest = 'imagePDF', action = 'store_true',
 parser.add_argument('-d', '--dest-plot', dest = 'destPlotName',
   metavar = 'DESTPLOT', type = str, action = 'store', default = '',
   help = 'The destination of the plot files (HTML, JPG, PDF) relative to DIRNAME')
+parser.add_argument('-s', '--summary', dest = 'summaryFileName',
+  metavar = 'SUMFILE', type = str, action = 'store', default = None,
+  help = 'Write the statistics of the non-cumulative plot for each sampling in the summary table SUMFILE (relative to DIRNAME), for render-plots.py; requires --complete-pred')
 
 parser.add_argument('-v', '--verbose', dest = 'verbose', action = 'store_true',
   help = 'Print computation steps information on the standard output')
@@ -105,6 +118,9 @@ if args.finalPoint is True and (args.exportCPlot is False and args.exportNCPlot
 if args.imagePDF is True and (args.exportCPlot is False and args.exportNCPlot is False):
   print('Arguments error: Option --pdf requires --cumulative-plot or --noncumulative-plot', file = sys.stderr)
   exit()
+if args.summaryFileName is not None and args.predFileName is None:
+  print('Arguments error: Option --summary requires --complete-pred', file = sys.stderr)
+  exit()
 
 
 
@@ -117,12 +133,15 @@ destPlotName = args.destPlotName    # Output directory for plots
 if destPlotName != '' and destPlotName[0] != '/': destPlotName = '/' + destPlotName
 curDir = None    # Directory for current percentage (n)
 curExpDir = None    # Directory for current experiment
-totCurDir = None   # Complete current directory (dirName + curDir + curExpDir)
+runName = None   # Current run (curDir + curExpDir)
 
 # Load info
 values, expValues = prp.loadInfo(dirName)
 values.sort()
 
+# Results of the runs (from the result store if any, otherwise from the directory tree)
+results = resultstore.openResults(dirName)
+
 sumFrom = None
 if args.sumFrom is not None:
   sumFrom = args.sumFrom
@@ -132,9 +151,7 @@ elif args.sumAll:
 
 
 # Initializing
-# geneStats structure: n% values dictionary / gene dictionary / predType index dictionary / count int
-geneStats = {}
-geneStatsList = []
+# Prediction types: list of (types in the results, displayed name)
 if not args.briefWeak:
   geneStatsPredTypes = [
     (['+'], '+'),
@@ -149,51 +166,65 @@ else:
     (['-'], '−'),
     (['0'], '0'),
     (['NOT+', 'NOT-', 'CHANGE'], 'weak')]
-  if args.goodWeak:
-    weakPredTypes = {
-      'NOT+': ['+', '0'],
-      'NOT-': ['-', '0'],
-      'CHANGE': ['+', '-']}
+weakPredTypes = {}
+if args.briefWeak and args.goodWeak:
+  weakPredTypes = {
+    'NOT+': ['+', '0'],
+    'NOT-': ['-', '0'],
+    'CHANGE': ['+', '-']}
 geneStatsPredTypesFlat = sum(list(zip(*geneStatsPredTypes))[0], [])
-trueNumExp = {}   # True number of experiments for each sampling (excludes failes ones)
-cumulativeTrueNumExp = {}   # Idem with descending accumulation on values of sumFrom
+predTypeIndex = {t: k for k, t in enumerate(geneStatsPredTypesFlat)}   # Type in the results: index
+# groupMatrix[k, c] = 1 if the type of index k is displayed in column c
+groupMatrix = np.zeros((len(geneStatsPredTypesFlat), len(geneStatsPredTypes)), dtype = np.int64)
+for c, p in enumerate(geneStatsPredTypes):
+  for t in p[0]:
+    groupMatrix[predTypeIndex[t], c] = 1
 
 # Find corresponding index in the list of sought predictions
 def findPredIndex(pred):
   return next(i for i, v in enumerate(geneStatsPredTypes) if pred in v[0])
 
+def isGood(pred, completePred):
+  """Is a prediction good compared to the complete prediction"""
+  if pred in weakPredTypes:
+    return completePred in weakPredTypes[pred]
+  return pred == completePred
+
+def columnMin(a):
+  return a.min(axis = 0).tolist()
+
+def columnMax(a):
+  return a.max(axis = 0).tolist()
+
+def columnMean(a):
+  """Mean of each column (as statistics.mean on integers)"""
+  return [x / a.shape[0] for x in a.sum(axis = 0).tolist()]
+
+def columnMedian(a):
+  """Median of each column (as statistics.median)"""
+  a = np.sort(a, axis = 0)
+  m = a.shape[0] // 2
+  return a[m].tolist() if a.shape[0] % 2 == 1 else ((a[m - 1] + a[m]) / 2).tolist()
+
+def reverseCumSum(a):
+  """Sums a[..., k:] along the last axis, for each k from 0 to the length of this axis (included)"""
+  res = np.zeros(a.shape[:-1] + (a.shape[-1] + 1,), dtype = a.dtype)
+  res[..., :-1] = np.cumsum(a[..., ::-1], axis = -1)[..., ::-1]
+  return res
+
 
 
 # If required, load the complete predictions file (i.e. 100% sampling)
+completeGenePred = {}   # Dict of final predictions (100% sampling)
 if args.predFileName is not None or args.exportNCPlot:
   if args.verbose:
     print('Load complete predictions file ({})...'.format(args.predFileName))
-  # Dict of final predictions (100% sampling)
-  completeGenePred = {}
-  # (Non-)cumulative statistics: number of good/bad predictions starting from each sampling value
-  if args.exportNCPlot:
-    # nonCumulativeGeneStats structure: nn dict / gene dict / 'good' int, 'bad' int
-    nonCumulativeGeneStats = {}
-  if args.predFileName is not None:
-    # cumulativeGeneStats structure: gene dict / nn dict / 'good' int, 'bad' int
-    cumulativeGeneStats = {}
   for row in util.loadCSVWithHeader(args.predFileName):
     curGene = row[0]
     curPred = row[1]
     curPredType = curPred[5:]
     if curPred[:5] == 'pred:' and curPredType in geneStatsPredTypesFlat:
-#      cumulativeGeneStats[curGene] = {'pred': curPredType}
       completeGenePred[curGene] = curPredType
-      if sumFrom is not None:
-        cumulativeGeneStats[curGene] = {}
-        for nn in sumFrom:
-          cumulativeGeneStats[curGene][nn] = {'good': 0, 'bad': 0}
-
-if args.exportNCPlot:
-  for n in values:
-    nonCumulativeGeneStats[n] = {}
-    for curGene in completeGenePred:
-      nonCumulativeGeneStats[n][curGene] = {'good': 0, 'bad': 0}
 
 
 
@@ -201,57 +232,56 @@ if args.exportNCPlot:
 if args.verbose:
   print('Gather data on all runs...')
 
+# Predictions are gathered as flat indices in the gene × sampling × prediction type tensor
+geneIndex = {}   # Gene name: index (in order of first prediction)
+predIndices = []
+trueNumExp = np.zeros(len(values), dtype = np.int64)   # True number of experiments for each sampling (excludes failes ones)
+numTypes = len(geneStatsPredTypesFlat)
+
 # For each percentage value... n = current percentage
-for n in values:
-  trueNumExp[n] = 0
+for j, n in enumerate(values):
   curDir = prp.nextDir(n, curDir)
   if args.verbose:
     print('  {}'.format(curDir))
   # For each expriment...
-  for i in expValues:
+  for i in prp.expValuesOf(n):
     curExpDir = prp.nextExpDir(i)
-    totCurDir = prp.totalDir(dirName, curDir, curExpDir)    # Complete current directory
+    runName = '{}/{}'.format(curDir, curExpDir)    # Current run
     # Gather predictions
-    if n not in geneStats:
-      geneStats[n] = {}
-    if util.hasProperResult(totCurDir):
-      trueNumExp[n] += 1
-      for row in util.loadCSVWithHeader('{}/result-0.0.tsv'.format(totCurDir)):
-        curGene = row[0]
+    if results.hasProperResult(runName):
+      trueNumExp[j] += 1
+      for row in results.loadResult(runName):
         curPred = row[1]
-        curPredType = curPred[5:]
-        if curPred[:5] == 'pred:' and curPredType in geneStatsPredTypesFlat:
-          # Find index in geneStatsPredTypes
-          curPredIndex = findPredIndex(curPredType)
-          # Add gene to geneStats[n]
-          if curGene not in geneStats[n]:
-            geneStats[n][curGene] = {}
-            # Add gene to geneStatsList
-            if curGene not in geneStatsList:
-              geneStatsList.append(curGene)
-          # Add prediction to geneStats[n][curGene]
-          if curPredIndex not in geneStats[n][curGene]:
-            geneStats[n][curGene][curPredIndex] = 0
-          geneStats[n][curGene][curPredIndex] += 1
-          # If current gene is in final predictions
-          if curGene in completeGenePred:
-            goodBad = curPredType == completeGenePred[curGene]
-            if args.goodWeak and curPredType in weakPredTypes:
-              goodBad = completeGenePred[curGene] in weakPredTypes[curPredType]
-            # Non-cumulative statistics to compare with complete predictions
-            if args.exportNCPlot:
-              nonCumulativeGeneStats[n][curGene]['good' if goodBad else 'bad'] += 1
-            # Cumulative statistics to compare with complete predictions
-            if sumFrom is not None:
-              for nn in sumFrom:
-                if n >= nn:
-                  cumulativeGeneStats[curGene][nn]['good' if goodBad else 'bad'] += 1
+        if curPred[:5] == 'pred:' and curPred[5:] in predTypeIndex:
+          g = geneIndex.setdefault(row[0], len(geneIndex))
+          predIndices.append((g * len(values) + j) * numTypes + predTypeIndex[curPred[5:]])
   # End of current sampling (n%)
-
-# Compute cumulative true number of experiments (with proper results)
+results.close()
+
+# Count tensor: geneCounts[g, j, k] = number of predictions of type k for gene g at sampling j
+geneStatsList = list(geneIndex)
+geneCounts = np.bincount(np.array(predIndices, dtype = np.int64),
+  minlength = len(geneStatsList) * len(values) * numTypes).reshape(len(geneStatsList), len(values), numTypes)
+# Counts per displayed prediction type
+geneStats = geneCounts.dot(groupMatrix)
+
+# Number of good/bad predictions for each gene and sampling, compared to the complete predictions
+# (an extra last row of zeros stands for the genes that are never predicted)
+goodMatrix = np.zeros((len(geneStatsList) + 1, numTypes), dtype = np.int64)
+for curGene, completePred in completeGenePred.items():
+  if curGene in geneIndex:
+    goodMatrix[geneIndex[curGene]] = [isGood(t, completePred) for t in geneStatsPredTypesFlat]
+goodStats = np.zeros((len(geneStatsList) + 1, len(values)), dtype = np.int64)
+badStats = np.zeros((len(geneStatsList) + 1, len(values)), dtype = np.int64)
+goodStats[:-1] = (geneCounts * goodMatrix[:-1, np.newaxis, :]).sum(axis = 2)
+badStats[:-1] = geneCounts.sum(axis = 2) - goodStats[:-1]
+
+# Cumulative statistics: sums on the samplings n ≥ nn, for each nn of sumFrom
 if sumFrom is not None:
-  cumulativeTrueNumExp = {n: sum([trueNumExp[nn] for nn in trueNumExp if nn >= n]) for n in sumFrom}
-#cumulativeTrueNumExpValues = {n: sum([trueNumExp[nn] for nn in trueNumExp if nn >= n]) for n in values}
+  sumFromIndex = [bisect.bisect_left(values, nn) for nn in sumFrom]
+  cumulativeGoodStats = reverseCumSum(goodStats)[:, sumFromIndex].tolist()
+  cumulativeBadStats = reverseCumSum(badStats)[:, sumFromIndex].tolist()
+  cumulativeTrueNumExp = reverseCumSum(trueNumExp)[sumFromIndex].tolist()
 
 
 
@@ -263,65 +293,82 @@ if args.verbose:
 
 with open(totalOutFileName, 'w') as statsFile:
   # First head line
-  curLine = 'sampling (%)'
+  curLine = ['sampling (%)']
   for n in values:
-    curLine += '\t{}'.format(n) + ('\t' * (len(geneStatsPredTypes) - 1))
+    curLine += [str(n)] + [''] * (len(geneStatsPredTypes) - 1)
   if args.predFileName is not None:
-    curLine += '\tfinal (100)'
+    curLine += ['final (100)']
     if sumFrom is not None:
       for nn in sumFrom:
-        curLine += '\t\tsum ≥ {}%\t\t'.format(nn)
-  statsFile.write(curLine + '\n')
+        curLine += ['', 'sum ≥ {}%'.format(nn), '', '']
+  statsFile.write('\t'.join(curLine) + '\n')
   # Second head line
-  curLine = ''
-  for p in geneStatsPredTypes:
-    curLine += '\t' + p[1]
-  curLine *= len(values)
-  curLine = 'prediction' + curLine
+  curLine = ['prediction'] + [p[1] for p in geneStatsPredTypes] * len(values)
   if args.predFileName is not None:
-    curLine += '\tprediction'
+    curLine += ['prediction']
     if sumFrom is not None:
       for nn in sumFrom:
-        curLine += '\t\tgood\tbad\tmissing'
-  statsFile.write(curLine + '\n')
+        curLine += ['', 'good', 'bad', 'missing']
+  statsFile.write('\t'.join(curLine) + '\n')
   # Content
-  for curGene in geneStatsList:
-    curLine = curGene
-    for n in values:
-      if curGene not in geneStats[n]:
-        curLine += '\t' * len(geneStatsPredTypes)
-      else:
-        for curPredIndex, curPred in enumerate(geneStatsPredTypes):
-          curLine += '\t'
-          if curPredIndex in geneStats[n][curGene]:
-            curLine += str(geneStats[n][curGene][curPredIndex])
+  for g, (curGene, curCounts) in enumerate(zip(geneStatsList, geneStats.reshape(len(geneStatsList), -1).tolist())):
+    curLine = [curGene] + [str(c) if c != 0 else '' for c in curCounts]
     # If the complete predictions file is provided: add the final predictions
     if args.predFileName is not None:
-      curLine += '\t'
-      if curGene in completeGenePred:
+      if curGene not in completeGenePred:
+        curLine += ['']
+      else:
         c = findPredIndex(completeGenePred[curGene])
-        curLine += geneStatsPredTypes[c][1]
+        curLine += [geneStatsPredTypes[c][1]]
         if len(geneStatsPredTypes[c][0]) > 1:
-          curLine += ' ({})'.format(completeGenePred[curGene])
+          curLine[-1] += ' ({})'.format(completeGenePred[curGene])
         # If cumulative statistics are required
         if sumFrom is not None:
-          for nn in sumFrom:
-            curGood = cumulativeGeneStats[curGene][nn]['good']
-            curBad = cumulativeGeneStats[curGene][nn]['bad']
-            curTot = cumulativeTrueNumExp[nn]
+          for curGood, curBad, curTot in zip(cumulativeGoodStats[g], cumulativeBadStats[g], cumulativeTrueNumExp):
             curMissing = curTot - (curGood + curBad)
-#            curMissing = ((prp.numExp * len([nnn for nnn in values if nnn >= nn])) -
-#              (cumulativeGeneStats[curGene][nn]['good'] + cumulativeGeneStats[curGene][nn]['bad']))
-#            curTot = curGood + curBad + curMissing
             if not args.detailSum:
-              curLine += '\t' + ('\t{}' * 3).format(curGood / curTot,
-                curBad / curTot, curMissing / curTot)
+              curLine += ['', str(curGood / curTot), str(curBad / curTot), str(curMissing / curTot)]
             else:
-              curLine += '\t' + ('\t{} ({}/{})' * 3).format(curGood / curTot, curGood, curTot,
-                curBad / curTot, curBad, curTot, curMissing / curTot, curMissing, curTot)
-    statsFile.write(curLine + '\n')
-
+              curLine += [''] + ['{} ({}/{})'.format(x / curTot, x, curTot) for x in [curGood, curBad, curMissing]]
+    statsFile.write('\t'.join(curLine) + '\n')
+
+
+
+# Statistics of the plot: min, max, mean and median (computed for each sampling, i.e. column) of the percentages
+# of good, bad and missing predictions of the genes
+functionsList = [(columnMin, 'Min'), (columnMax, 'Max'), (columnMean, 'Mean'), (columnMedian, 'Median')]
+plotData = {}   # 'good','bad','missing' dict / function dict / float list
+for k in plotsummary.ROBUSTNESS_KEYS:
+  plotData[k[0]] = {}
+  for f in functionsList:
+    plotData[k[0]][f[1]] = []
+# TODO: Fix the cumulative version
+# Gather data for non-cumulative plot, on the genes of the complete predictions
+# (the genes never predicted in the runs take the last row of zeros)
+if args.exportNCPlot or args.summaryFileName is not None:
+  completeRows = [geneIndex.get(curGene, len(geneStatsList)) for curGene in completeGenePred]
+  plotStats = {}  # 'good','bad','missing' dict / gene × sampling int array
+  plotStats['good'] = goodStats[completeRows]
+  plotStats['bad'] = badStats[completeRows]
+  plotStats['missing'] = trueNumExp - (plotStats['good'] + plotStats['bad'])
+  for k in plotsummary.ROBUSTNESS_KEYS:
+    for f in functionsList:
+      plotData[k[0]][f[1]] = [x / totExpLeft * 100
+        for x, totExpLeft in zip(f[0](plotStats[k[0]]), trueNumExp.tolist())]
 
+# Write the summary table
+if args.summaryFileName is not None:
+  summaryFileName = '{}/{}'.format(dirName, args.summaryFileName)
+  if args.verbose:
+    print('Write summary table ({})...'.format(summaryFileName))
+  summaryRows = []
+  for j, n in enumerate(values):
+    row = {'sampling': n, 'runs': trueNumExp[j]}
+    for k in plotsummary.ROBUSTNESS_KEYS:
+      for f in functionsList:
+        row['{}_{}'.format(k[0], f[1].lower())] = plotData[k[0]][f[1]][j]
+    summaryRows.append(row)
+  plotsummary.writeTable(summaryFileName, plotsummary.ROBUSTNESS_COLUMNS, summaryRows)
 
 # Build the plot
 if args.exportCPlot or args.exportNCPlot:
@@ -329,85 +376,15 @@ if args.exportCPlot or args.exportNCPlot:
   plotValues = values if args.exportNCPlot else sumFrom
   if args.verbose:
     print('Build plot ({}.html)...'.format(plotFileName))
-  import plotly.offline as pl
-  import plotly.graph_objs as go
-  # List of values to consider (number of good, bad and missing predictions)
-  keysList = [('good', (0, 1, 0)), ('bad', (1, 0, 0)), ('missing', (0, 0, 1))]
-  # Fonctions to plot (min, max, mean and median)
-  functionsList = [   # (function, name, brightness, opacity, fill type, marker)
-    (min, 'Min', 0.33, .3, 'none', 'circle-open'),
-    (max, 'Max', 1.0, .3, 'tonexty', 'circle-open'),
-    (statistics.mean, 'Mean', 0.66, 1, 'none', 'square'),
-    (statistics.median, 'Median', 0.66, 1, 'tonexty', 'diamond')]
-  plotStats = {}  # 'good','bad','missing' dict / int list
-  plotData = {}   # 'good','bad','missing' dict / function dict / int list
-  for k in keysList:
-    plotData[k[0]] = {}
-    for f in functionsList:
-      plotData[k[0]][f[1]] = []
-  # TODO: Fix the cumulative version
-  # Gather data for (non-)cumulative plot
-  if args.exportNCPlot:
-    for nn in plotValues:
-      if args.exportNCPlot:
-        curN = nonCumulativeGeneStats[nn]
-        totExpLeft = trueNumExp[nn]
-        plotStats['good'] = [g['good'] for g in curN.values()]
-        plotStats['bad'] = [g['bad'] for g in curN.values()]
-      elif args.exportCPlot:
-        curN = [g[nn] for g in cumulativeGeneStats.values()]
-        totExpLeft = cumulativeTrueNumExp[nn]
-        plotStats['good'] = [g['good'] for g in curN]
-        plotStats['bad'] = [g['bad'] for g in curN]
-      plotStats['missing'] = [totExpLeft -
-        (numGood + numBad) for numGood, numBad in zip(plotStats['good'], plotStats['bad'])]
-      for k in keysList:
-        for f in functionsList:
-          plotData[k[0]][f[1]].append(f[0](plotStats[k[0]]) / totExpLeft * 100)
-  # Add final abscissa point
-  plotValues.append(100)
-  # Build plots
-  allPlots = []
-  for k in keysList:
-    for f in functionsList:
-      # Add final ordinates point
-      if args.finalPoint:
-        plotData[k[0]][f[1]].append(100 if k[0] == 'good' else 0)
-      allPlots.append(go.Scatter(
-        x = plotValues,
-        y = plotData[k[0]][f[1]],
-        mode = 'lines+markers',
-        fill = f[4],
-        fillcolor = 'rgba({}, {}, {}, {})'.format(*[c * f[2] * 255 for c in k[1]], .1),
-        line = dict(
-          color = 'rgba({}, {}, {}, {})'.format(*[c * f[2] * 255 for c in k[1]], f[3])
-        ),
-        marker = dict(
-          symbol = f[5]
-        ),
-        name = '{} {}'.format(f[1], k[0])
-      ))
-  plotLayout = go.Layout(
-    title = '{}volution of max, min, mean and median of{}good, bad and missing predictions compared to 100% sampling'.format('E' if args.exportNCPlot else 'Cumulative e', '<br />' if args.imagePDF else ' '),
-    showlegend = True,
-    xaxis = dict(
-      title = 'Sampling (%)'
-    ),
-    yaxis = dict(
-      title = 'Number of good/bad/missing predictions (%)'
-    )
-  )
-  plotFig = go.Figure(data = allPlots, layout = plotLayout)
+  plotFig = plotsummary.robustnessFigure(plotValues, plotData, args.finalPoint, args.exportCPlot, args.imagePDF)
   if args.imagePDF:
-    import plotly.io
-    plotly.io.write_image(plotFig, plotFileName + '.pdf')
+    plotsummary.writeImage(plotFig, plotFileName + '.pdf')
   else:
     if not args.image:
-      pl.plot(plotFig, filename = plotFileName + '.html', show_link = False)
+      plotsummary.writeHTML(plotFig, plotFileName + '.html', autoOpen = True)
     else:
-      pl.offline.plot(plotFig, filename = plotFileName + '_img.html', show_link = False,
-        image = 'png', image_width = 1600, image_height = 1200, image_filename = plotFileName)
-      pl.plot(plotFig, filename = plotFileName + '.html', show_link = False, auto_open = False)
+      plotsummary.writeHTML(plotFig, plotFileName + '_img.html', autoOpen = True, imageFileName = plotFileName)
+      plotsummary.writeHTML(plotFig, plotFileName + '.html')
 
 
 
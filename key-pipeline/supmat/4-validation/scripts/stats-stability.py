@@ -0,0 +1,177 @@
+#!/bin/python3
+#coding=utf-8
+
+# Compute prediction stability statistics on the result of the random pick cross-validation
+# -----------------------------------------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+
+###
+# Compute prediction stability statistics on the result of the random pick cross-validation
+###
+# Help:
+#   python stats-stability.py --help
+#
+# Example:
+#   python stats-stability.py prp-10-95-5-100/ stability.tsv --jaccard jaccard.tsv --min-agreement 0.95 --verbose
+#
+# The predictions of all the runs are gathered in bit matrices (gene × run, one for each prediction type,
+# see predbits.py), on which the statistics are computed with popcounts:
+# - OUTFILE: for each predicted gene, its most frequent prediction and its frequency for each sampling
+#   and for all the runs, and whether it keeps the same sign (+ or -) in at least --min-agreement of the runs
+# - JACFILE (with --jaccard): Jaccard index of the consensus predictions (made in at least
+#   --consensus of the runs) of each pair of samplings
+###
+
+
+
+import os
+import sys
+import argparse
+import numpy as np
+import percentage_random_pick as prp
+import resultstore
+import predbits
+import util
+
+# Shared Python library of the pipeline (supmat/lib)
+sys.path.insert(0, '{}/../../lib'.format(os.path.dirname(os.path.abspath(__file__))))
+import sifgraph
+
+
+
+# [Argparse] Command line parsing options
+parser = argparse.ArgumentParser(
+  add_help = False,
+  description = """Compute prediction stability statistics on the result of the random pick cross-validation.""",
+  epilog = """The program takes a result folder of the random pick cross-validation script
+    and computes, for each gene, the agreement of its predictions across the runs,
+    and the overlap of the predictions of the samplings.
+    The folder must contain a file named 'prp-info.csv' that contains the information
+    about the cross-validation.""")
+
+parser.add_argument('dirName', metavar = 'DIRNAME', type = str,
+  help = 'The directory containing the result of the cross-validation computation')
+parser.add_argument('outFileName', metavar = 'OUTFILE', type = str,
+  help = 'The file to write the statistics of the genes to (relative to DIRNAME)')
+
+parser.add_argument('--sif', dest = 'sifFileName',
+  metavar = 'SIFFILE', type = str, action = 'store',
+  default = '{}/../../2-pathrider/data/out-filtered.sif'.format(os.path.dirname(os.path.abspath(__file__))),
+  help = 'The filtered graph whose node IDs are used as gene IDs (default: out-filtered.sif of step 2)')
+parser.add_argument('--min-agreement', dest = 'minAgreement',
+  metavar = 'FRAC', type = float, action = 'store', default = .95,
+  help = 'Fraction of the runs in which a stable gene keeps the same sign (default: 0.95)')
+parser.add_argument('--jaccard', dest = 'jaccardFileName',
+  metavar = 'JACFILE', type = str, action = 'store', default = None,
+  help = 'Write the Jaccard indices of the consensus predictions of each pair of samplings in JACFILE (relative to DIRNAME)')
+parser.add_argument('--consensus', dest = 'consensus',
+  metavar = 'FRAC', type = float, action = 'store', default = .5,
+  help = 'Fraction of the runs of a sampling in which a consensus prediction is made (default: 0.5)')
+parser.add_argument('--save-bits', dest = 'bitsFileName',
+  metavar = 'NPZFILE', type = str, action = 'store', default = None,
+  help = 'Also write the bit matrices of the predictions in NPZFILE (relative to DIRNAME, see predbits.py)')
+
+parser.add_argument('-v', '--verbose', dest = 'verbose', action = 'store_true',
+  help = 'Print computation steps information on the standard output')
+
+parser.add_argument('-h', '--help', action = 'help',
+  help = 'Print this help message')
+
+args = parser.parse_args()
+
+if not 0 < args.minAgreement <= 1 or not 0 < args.consensus <= 1:
+  print('Arguments error: Options --min-agreement and --consensus require a number in ]0, 1]', file = sys.stderr)
+  exit()
+
+
+
+if args.verbose:
+  print('Begin.')
+
+dirName = util.removeLastSlash(args.dirName)
+curDir = None    # Directory for current percentage (n)
+
+# Load info
+values, expValues = prp.loadInfo(dirName)
+
+# Results of the runs (from the result store if any, otherwise from the directory tree)
+results = resultstore.openResults(dirName)
+
+# Proper runs of each sampling
+runNames = []
+samplingRuns = []   # Sampling index: list of run indices
+for n in values:
+  curDir = prp.nextDir(n, curDir)
+  samplingRuns.append([])
+  for i in prp.expValuesOf(n):
+    runName = '{}/{}'.format(curDir, prp.nextExpDir(i))
+    if results.hasProperResult(runName):
+      samplingRuns[-1].append(len(runNames))
+      runNames.append(runName)
+
+# Gather the predictions in bit matrices, with the node IDs of the graph as gene IDs
+if args.verbose:
+  print('Gather data on {} runs...'.format(len(runNames)))
+graph = sifgraph.load(args.sifFileName, cache = True)
+bits = predbits.PredictionBits(graph.names, predbits.PRED_TYPES, len(runNames))
+for r, runName in enumerate(runNames):
+  bits.addRun(r, results.loadResult(runName))
+results.close()
+if args.verbose:
+  print('Bit matrices: {} genes ({} missing from the graph) × {} runs × {} prediction types, {:.1f} MB'.format(
+    len(bits.names), len(bits.names) - graph.numNodes(), len(runNames), len(bits.predTypes), bits.nbytes() / 1e6))
+if args.bitsFileName is not None:
+  bits.save('{}/{}'.format(dirName, args.bitsFileName))
+
+# Most frequent prediction of each gene, for each sampling and for all the runs
+agreements = [bits.agreement(runs) for runs in samplingRuns] + [bits.agreement()]
+predicted = np.flatnonzero(bits.counts().sum(axis = 0) > 0)
+sameSign = np.isin(agreements[-1][0], [bits.typeIndex['+'], bits.typeIndex['-']]) & (agreements[-1][1] >= args.minAgreement)
+
+
+
+# Write the statistics of the genes
+totalOutFileName = '{}/{}'.format(dirName, args.outFileName)
+
+if args.verbose:
+  print('Write results in output file ({})...'.format(totalOutFileName))
+
+with open(totalOutFileName, 'w') as statsFile:
+  # First head line
+  curLine = ['sampling (%)']
+  for n in values:
+    curLine += [str(n), '']
+  curLine += ['all runs', '', '']
+  statsFile.write('\t'.join(curLine) + '\n')
+  # Second head line
+  curLine = ['gene'] + ['prediction', 'frequency'] * (len(values) + 1) + ['same sign ≥ {}'.format(args.minAgreement)]
+  statsFile.write('\t'.join(curLine) + '\n')
+  # Content
+  for g in predicted.tolist():
+    curLine = [bits.names[g]]
+    for dominant, frequency in agreements:
+      curLine += [bits.predTypes[dominant[g]], str(frequency[g])] if frequency[g] > 0 else ['', '']
+    curLine += ['yes' if sameSign[g] else '']
+    statsFile.write('\t'.join(curLine) + '\n')
+
+if args.verbose:
+  print('{} of {} predicted genes keep the same sign in at least {}% of the runs'.format(
+    np.count_nonzero(sameSign), len(predicted), args.minAgreement * 100))
+
+# Write the Jaccard indices of the samplings
+if args.jaccardFileName is not None:
+  jaccardFileName = '{}/{}'.format(dirName, args.jaccardFileName)
+  if args.verbose:
+    print('Write Jaccard indices ({})...'.format(jaccardFileName))
+  jaccard = bits.overlaps(samplingRuns, args.consensus)
+  with open(jaccardFileName, 'w') as jaccardFile:
+    jaccardFile.write('\t'.join(['sampling (%)'] + [str(n) for n in values]) + '\n')
+    for n, curJaccard in zip(values, jaccard.tolist()):
+      jaccardFile.write('\t'.join([str(n)] + ['{:.4f}'.format(x) for x in curJaccard]) + '\n')
+
+
+
+if args.verbose:
+  print('Done.')
@@ -0,0 +1,90 @@
+#!/bin/python3
+#coding=utf-8
+
+# Import the results of the random pick cross-validation into a result store
+# --------------------------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+
+###
+# Import the results of the random pick cross-validation into a result store
+###
+# Help:
+#   python store-results.py --help
+#
+# Example:
+#   python store-results.py prp-10-95-5-100/ --remove
+###
+
+
+
+import os
+import sys
+import shutil
+import argparse
+import percentage_random_pick as prp
+import resultstore
+import util
+
+
+
+# [Argparse] Command line parsing options
+parser = argparse.ArgumentParser(
+  add_help = False,
+  description = """Import the results of the random pick cross-validation into a result store.""",
+  epilog = """The program takes a result folder of the random pick cross-validation script
+    and records all its runs (observations, predictions and status)
+    in the result store DIRNAME/{}, which is then read by the stats-*.py scripts
+    instead of the directory tree.""".format(resultstore.STORE_FILE_NAME))
+
+parser.add_argument('dirName', metavar = 'DIRNAME', type = str,
+  help = 'The directory containing the result of the cross-validation computation')
+parser.add_argument('--remove', dest = 'remove', action = 'store_true',
+  help = 'Remove the directories of the runs once imported')
+parser.add_argument('-v', '--verbose', dest = 'verbose', action = 'store_true',
+  help = 'Print computation steps information on the standard output')
+parser.add_argument('-h', '--help', action = 'help',
+  help = 'Print this help message')
+
+args = parser.parse_args()
+
+
+
+dirName = util.removeLastSlash(args.dirName)
+curDir = None    # Directory for current percentage (n)
+
+# Load info
+values, expValues = prp.loadInfo(dirName)
+
+store = resultstore.StoreResults(resultstore.storeFileName(dirName))
+numRuns = 0
+missingRuns = []
+
+# For each percentage value...
+for n in values:
+  curDir = prp.nextDir(n, curDir)
+  if args.verbose:
+    print(curDir)
+  # For each expriment...
+  for i in prp.expValuesOf(n):
+    curExpDir = prp.nextExpDir(i)
+    runName = '{}/{}'.format(curDir, curExpDir)
+    totCurDir = prp.totalDir(dirName, curDir, curExpDir)
+    if not os.path.isfile('{}/obs-noinputs.obs'.format(totCurDir)):
+      if not store.hasRun(runName):
+        missingRuns.append(runName)
+      continue
+    store.addRunDir(runName, totCurDir)
+    numRuns += 1
+    if args.remove:
+      shutil.rmtree(totCurDir)
+  if args.remove and os.path.isdir('{}/{}'.format(dirName, curDir)) and len(os.listdir('{}/{}'.format(dirName, curDir))) == 0:
+    os.rmdir('{}/{}'.format(dirName, curDir))
+
+store.close()
+
+if len(missingRuns) > 0:
+  print('Warning: {} run(s) not found: {}'.format(len(missingRuns), ', '.join(missingRuns)), file = sys.stderr)
+if args.verbose:
+  print('{} run(s) imported into {}'.format(numRuns, resultstore.storeFileName(dirName)))
@@ -0,0 +1,98 @@
+#!/bin/python3
+#coding=utf-8
+
+# Draw the plots of the cross-validation from the summary tables of the statistics scripts
+# ----------------------------------------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+
+###
+# Draw the plots of the cross-validation from the summary tables of the statistics scripts
+###
+# Help:
+#   python render-plots.py --help
+#
+# The summary tables are written by stats-matrixscore.py and stats-robustness.py with --summary
+# (see ../../lib/plotsummary.py): they contain the statistics of each sampling, so that all the plots
+# are drawn in a single process without reading the runs of the cross-validation again.
+# The plot of SUMFILE.tsv is written in DESTDIR/SUMFILE.html; all the HTML plots of DESTDIR
+# reference the same plotly.js file (DESTDIR/plotly.min.js).
+#
+# Example:
+#   python render-plots.py ../data/m2-mean-boxplot.tsv ../data/robustness-brief-nochange.tsv -d ../plots -100
+###
+
+
+
+import os
+import sys
+import argparse
+
+# Shared Python library of the pipeline (supmat/lib)
+sys.path.insert(0, '{}/../../lib'.format(os.path.dirname(os.path.abspath(__file__))))
+import plotsummary
+
+
+
+# [Argparse] Command line parsing options
+parser = argparse.ArgumentParser(
+  add_help = False,
+  description = """Draw the plots of the cross-validation from the summary tables of the statistics scripts.""",
+  epilog = """Each SUMFILE is a summary table written by stats-matrixscore.py (boxplot of the scores)
+    or stats-robustness.py (evolution of the good, bad and missing predictions) with option --summary.""")
+
+parser.add_argument('summaryFileNames', metavar = 'SUMFILE', type = str, nargs = '+',
+  help = 'The summary tables to plot')
+parser.add_argument('-d', '--dest-plot', dest = 'destPlotName',
+  metavar = 'DESTDIR', type = str, action = 'store', default = '.',
+  help = 'The destination folder of the plot files (default: current folder)')
+
+parser.add_argument('-m', '--plot-mean-pred', dest = 'plotPred', action = 'store_true',
+  help = 'Add mean number of predictions to the boxplots')
+parser.add_argument('-mmm', '--plot-mmm-pred', dest = 'plotMMMPred', action = 'store_true',
+  help = 'Add mean, min and max number of predictions to the boxplots')
+parser.add_argument('-100', '--final-point', dest = 'finalPoint', action = 'store_true',
+  help = 'Extends the robustness curves to the final 100%% sampling')
+
+parser.add_argument('-i', '--export-image', dest = 'image', action = 'store_true',
+  help = 'Also write HTML plots (*_img.html) which download a PNG image of the plot when opened')
+parser.add_argument('-pdf', '--pdf', dest = 'imagePDF', action = 'store_true',
+  help = 'Export instead PDF images of the plots')
+
+parser.add_argument('-v', '--verbose', dest = 'verbose', action = 'store_true',
+  help = 'Print computation steps information on the standard output')
+
+parser.add_argument('-h', '--help', action = 'help',
+  help = 'Print this help message')
+
+args = parser.parse_args()
+
+
+
+os.makedirs(args.destPlotName, exist_ok = True)
+predLines = 'mmm' if args.plotMMMPred else 'mean' if args.plotPred else None
+
+for summaryFileName in args.summaryFileNames:
+  try:
+    kind, rows = plotsummary.loadTable(summaryFileName)
+  except (OSError, ValueError) as e:
+    print('Error: {}'.format(e), file = sys.stderr)
+    exit(1)
+  plotFileName = os.path.join(args.destPlotName, os.path.splitext(os.path.basename(summaryFileName))[0])
+  if args.verbose:
+    print('Build plot ({})...'.format(plotFileName))
+  if kind == 'score':
+    plotFig = plotsummary.scoreFigure(rows, predLines, args.imagePDF)
+  else:
+    plotFig = plotsummary.robustnessFigure([row['sampling'] for row in rows], plotsummary.robustnessCurves(rows),
+      args.finalPoint, False, args.imagePDF)
+  if args.imagePDF:
+    plotsummary.writeImage(plotFig, plotFileName + '.pdf')
+  else:
+    plotsummary.writeHTML(plotFig, plotFileName + '.html')
+    if args.image:
+      plotsummary.writeHTML(plotFig, plotFileName + '_img.html', imageFileName = plotFileName)
+
+if args.verbose:
+  print('Done.')
@@ -7,13 +7,21 @@
 # Hepatocellular carcinoma computational models identify key protein-complexes associated to tumor progression
 # Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
 
+# Stop at the first failing command, so that pipe.py records the step as failed
+set -e
 OUTDIR="./supmat/4-validation/output"
-rm -r ./supmat/5-plots/plots
+rm -rf ./supmat/5-plots/plots
 mkdir "./supmat/5-plots/plots"
+mkdir -p "./supmat/5-plots/data"
 
-# Compute stability stats
-python ./supmat/4-validation/scripts/stats-robustness.py "$OUTDIR" "robustness-brief-nochange.tsv" --complete-pred ./supmat/3-iggy/data/2345-result-nochange.tsv --brief-weak --sum-all --verbose -ncp -100 -d ../../5-plots/plots
+# Compute stability stats (summary table of the plot in ../../5-plots/data)
+python ./supmat/4-validation/scripts/stats-robustness.py "$OUTDIR" "robustness-brief-nochange.tsv" --complete-pred ./supmat/3-iggy/data/2345-result-nochange.tsv --brief-weak --sum-all --verbose --summary ../../5-plots/data/robustness-brief-nochange.tsv || exit 1
+#python ./supmat/4-validation/scripts/stats-robustness.py "$OUTDIR" "robustness-brief-nochange.tsv" --complete-pred ./supmat/3-iggy/data/2345-result-nochange.tsv --brief-weak --sum-all --verbose -ncp -100 -d ../../5-plots/plots
 
-# Compute robustness stats
-python ./supmat/4-validation/scripts/stats-matrixscore.py "$OUTDIR" m2.tsv --detail-scores --complete-pred ./supmat/3-iggy/data/2345-result-nochange.tsv --export-plot --dest-plot ../../5-plots/plots --verbose
+# Compute robustness stats (summary table of the plot in ../../5-plots/data)
+python ./supmat/4-validation/scripts/stats-matrixscore.py "$OUTDIR" m2.tsv --detail-scores --complete-pred ./supmat/3-iggy/data/2345-result-nochange.tsv --summary ../../5-plots/data/m2-mean-boxplot.tsv --verbose || exit 1
+#python ./supmat/4-validation/scripts/stats-matrixscore.py "$OUTDIR" m2.tsv --detail-scores --complete-pred ./supmat/3-iggy/data/2345-result-nochange.tsv --export-plot --dest-plot ../../5-plots/plots --verbose
 
+# Draw all the plots from the summary tables, with a single plotly.js file
+# (run again alone to redraw the plots without computing the statistics)
+python ./supmat/5-plots/scripts/render-plots.py ./supmat/5-plots/data/robustness-brief-nochange.tsv ./supmat/5-plots/data/m2-mean-boxplot.tsv -d ./supmat/5-plots/plots -100 --verbose
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+#coding=utf-8
+
+# Generate synthetic input data for the pipeline
+# ----------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+
+###
+# Generate synthetic input data for the pipeline (see synthetic.py)
+###
+# Help:
+#   python3 generate-data.py --help
+#
+# Example:
+#   python3 generate-data.py 10 network.sif icgc.csv blacklist.txt --seed 1
+###
+
+
+
+import argparse
+import synthetic
+
+
+
+# [Argparse] Command line parsing options
+parser = argparse.ArgumentParser(
+  add_help = False,
+  description = """Generate a synthetic network, ICGC table and blacklist.""",
+  epilog = """At scale 1, the sizes of the data are those of the example of the HCC case study
+    (network of {genes} genes and {complexes} complexes with {edges} edges, ICGC table of {icgcRows} rows,
+    blacklist of {blacklist} names); they are multiplied by SCALE.""".format(**synthetic.EXAMPLE_SIZES))
+
+parser.add_argument('scale', metavar = 'SCALE', type = float,
+  help = 'The scale of the data with respect to the example')
+parser.add_argument('sifFileName', metavar = 'SIFFILE', type = str,
+  help = 'The SIF file to write the network to')
+parser.add_argument('icgcFileName', metavar = 'ICGCFILE', type = str,
+  help = 'The TSV file to write the ICGC table to')
+parser.add_argument('blackFileName', metavar = 'BLACKLIST', type = str,
+  help = 'The file to write the blacklist to')
+parser.add_argument('--seed', dest = 'seed',
+  metavar = 'N', type = int, action = 'store', default = 0,
+  help = 'Seed of the random generator (default: 0)')
+parser.add_argument('--density', dest = 'density',
+  metavar = 'D', type = float, action = 'store', default = None,
+  help = 'Number of edges per gene or complex (default: as in the example)')
+parser.add_argument('--split', dest = 'split',
+  metavar = 'F', type = float, action = 'store', default = 1.0,
+  help = 'Fraction of the genes split into X_gen and X_prot nodes (default: 1)')
+parser.add_argument('--complexes', dest = 'complexes',
+  metavar = 'F', type = float, action = 'store', default = None,
+  help = 'Number of complexes per gene (default: as in the example)')
+parser.add_argument('--inhibitions', dest = 'inhibitions',
+  metavar = 'F', type = float, action = 'store', default = 0.15,
+  help = 'Fraction of inhibitions among the edges (default: 0.15)')
+parser.add_argument('-h', '--help', action = 'help',
+  help = 'Print this help message')
+
+args = parser.parse_args()
+
+
+
+sizes = synthetic.scaledSizes(args.scale)
+if args.complexes is not None:
+  sizes['complexes'] = int(round(args.complexes * sizes['genes']))
+if args.density is not None:
+  sizes['edges'] = int(round(args.density * (sizes['genes'] + sizes['complexes'])))
+data = synthetic.SyntheticData(sizes, seed = args.seed, split = args.split, inhibitions = args.inhibitions)
+data.write(args.sifFileName, args.icgcFileName, args.blackFileName)
+print('{} nodes, {} edges, {} ICGC rows, {} blacklisted names'.format(len(data.nodes), len(data.edges),
+  len(data.icgc), len(data.blacklist)))
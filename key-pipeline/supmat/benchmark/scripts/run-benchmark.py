@@ -0,0 +1,289 @@
+#!/usr/bin/python3
+#coding=utf-8
+
+# End-to-end benchmark of the pipeline on synthetic data
+# ------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+
+###
+# End-to-end benchmark of the pipeline on synthetic data
+###
+# For each scale, synthetic data are generated (see synthetic.py) in a working folder
+# which has the layout of key-pipeline (supmat/*/data), and the following steps are timed,
+# with the same scripts and arguments as pipe.py:
+#   - thresholds: extraction of the observations from the ICGC table (step 1)
+#   - stream: extraction of the upstream paths from the observations, and blacklist filter (step 2)
+#   - postprocessing: post-processing of the output of Iggy and comparison to the ICGC table (step 3)
+#   - cvRun: one run of the cross-validation, including Iggy (step 4)
+#   - stats: statistics on a sweep of 3 samplings × --stats-runs runs (step 5 without the plots)
+# Iggy is replaced by a deterministic stand-in (stand-in-iggy.py) unless --iggy-command is given.
+# The timings (minimum over --repeat repetitions, in seconds) are written as JSON,
+# and can be compared to those of a previous benchmark with --baseline.
+#
+# Help:
+#   python3 run-benchmark.py --help
+#
+# Example:
+#   python3 run-benchmark.py --scales 1 10 --output bench.json --baseline bench-before.json
+###
+
+
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+import synthetic
+
+# Shared Python library of the pipeline (supmat/lib)
+sys.path.insert(0, '{}/../../lib'.format(os.path.dirname(os.path.abspath(__file__))))
+import sifgraph
+import pathstream
+import sifblacklist
+
+
+
+# Folders of the scripts
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SUPMAT_DIR = os.path.normpath('{}/../..'.format(BENCH_DIR))
+
+# Timed steps, in order
+STEPS = ['thresholds', 'stream', 'postprocessing', 'cvRun', 'stats']
+
+
+
+# [Argparse] Command line parsing options
+parser = argparse.ArgumentParser(
+  add_help = False,
+  description = """End-to-end benchmark of the pipeline on synthetic data.""",
+  epilog = """At scale 1, the synthetic data have the sizes of the example of the HCC case study.
+    The result is a JSON file giving, for each scale, the sizes of the data
+    and the time of each step (in seconds, null if the step failed).
+    With --baseline, the times are compared to those of a previous result,
+    and the exit status is 1 if a step is slower than allowed by --max-slowdown.""")
+
+parser.add_argument('--scales', dest = 'scales',
+  metavar = 'SCALE', type = float, nargs = '+', default = [1, 10, 100],
+  help = 'The scales of the data with respect to the example (default: 1 10 100)')
+parser.add_argument('-o', '--output', dest = 'outFileName',
+  metavar = 'JSONFILE', type = str, action = 'store', default = 'benchmark.json',
+  help = 'The file to write the timings to (default: benchmark.json)')
+parser.add_argument('--baseline', dest = 'baseFileName',
+  metavar = 'JSONFILE', type = str, action = 'store', default = None,
+  help = 'Compare the timings to those of a previous benchmark')
+parser.add_argument('--max-slowdown', dest = 'maxSlowdown',
+  metavar = 'F', type = float, action = 'store', default = 0.2,
+  help = 'Relative slowdown with respect to the baseline above which a step is reported (default: 0.2)')
+parser.add_argument('--repeat', dest = 'repeat',
+  metavar = 'N', type = int, action = 'store', default = 1,
+  help = 'Time each step N times and keep the minimum (default: 1)')
+parser.add_argument('--stats-runs', dest = 'statsRuns',
+  metavar = 'N', type = int, action = 'store', default = 4,
+  help = 'Number of runs of each sampling of the sweep used by the stats step (default: 4)')
+parser.add_argument('--seed', dest = 'seed',
+  metavar = 'N', type = int, action = 'store', default = 0,
+  help = 'Seed of the random generator of the data (default: 0)')
+parser.add_argument('-c', '--iggy-command', dest = 'iggyCommand',
+  metavar = 'IGGY', type = str, action = 'store', default = None,
+  help = 'Specify a command to call Iggy (default: the deterministic stand-in stand-in-iggy.py)')
+parser.add_argument('--work-dir', dest = 'workDir',
+  metavar = 'DIR', type = str, action = 'store', default = None,
+  help = 'The folder where the data and results are written (default: a temporary folder, removed at the end)')
+parser.add_argument('-v', '--verbose', dest = 'verbose', action = 'store_true',
+  help = 'Print the output of the steps')
+parser.add_argument('-h', '--help', action = 'help',
+  help = 'Print this help message')
+
+args = parser.parse_args()
+
+if args.repeat < 1 or args.statsRuns < 1:
+  print('Arguments error: Options --repeat and --stats-runs require a positive number', file = sys.stderr)
+  exit(1)
+
+iggyCommand = args.iggyCommand
+if iggyCommand is None:
+  iggyCommand = '{} {}/stand-in-iggy.py'.format(sys.executable, BENCH_DIR)
+
+
+
+# Shell call in the working folder of a scale (with the environment of the pipeline scripts)
+def shellCall(c, workDir):
+  env = dict(os.environ, LC_ALL = 'C')
+  out = None if args.verbose else subprocess.DEVNULL
+  retValue = subprocess.call(c, shell = True, cwd = workDir, env = env, stdout = out)
+  if retValue != 0:
+    raise Exception('Something went wrong with command:\n$ {}'.format(c))
+
+# Benchmark of the steps at one scale, in the working folder workDir
+class ScaleBenchmark:
+
+  def __init__(self, scale, workDir):
+    self.scale = scale
+    self.workDir = workDir
+    for step in ['2-pathrider', '3-iggy', '4-validation']:
+      os.makedirs('{}/supmat/{}/data'.format(workDir, step), exist_ok = True)
+    self.sif = '{}/network.sif'.format(workDir)
+    self.icgc = '{}/icgc.csv'.format(workDir)
+    self.black = '{}/blacklist.txt'.format(workDir)
+    data = synthetic.SyntheticData(synthetic.scaledSizes(scale), seed = args.seed)
+    data.write(self.sif, self.icgc, self.black)
+    self.sizes = {'nodes': len(data.nodes), 'edges': len(data.edges), 'icgcRows': len(data.icgc),
+      'blacklist': len(data.blacklist)}
+
+  def path(self, fileName):
+    """Path of a file of the working folder"""
+    return '{}/{}'.format(self.workDir, fileName)
+
+  def script(self, fileName):
+    """Path of a script of the pipeline"""
+    return '{}/{}'.format(SUPMAT_DIR, fileName)
+
+  def thresholds(self):
+    shellCall('sh {} {}'.format(self.script('1-graph-extraction/scripts/obs_construction.sh'), self.icgc), self.workDir)
+
+  def stream(self):
+    # As pipe.py pathrider()
+    shellCall('sh {} {}'.format(self.script('2-pathrider/scripts/excluded_gen_prot.sh'), self.black), self.workDir)
+    with open(self.path('supmat/2-pathrider/pathrider_out.out'), 'w') as log:
+      edges = pathstream.stream(self.sif, self.path('supmat/2-pathrider/data/genes_name.txt'), 'up',
+        self.path('supmat/2-pathrider/data/out_pathrider.sif'),
+        blackFile = self.path('supmat/2-pathrider/data/excluded_gen_prot.txt'), log = log)
+    if edges is None:
+      raise Exception('pathrider failed, see {}'.format(self.path('supmat/2-pathrider/pathrider_out.out')))
+    sifblacklist.filterSIF(self.path('supmat/2-pathrider/data/out_pathrider.sif'),
+      self.path('supmat/2-pathrider/data/out-filtered.sif'), sifblacklist.Blacklist(sifblacklist.loadNames(self.black)))
+
+  def prepPostprocessing(self):
+    # Observations with inputs (as construct-inputs.sh) and output of Iggy
+    inputs = sifgraph.load(self.path('supmat/2-pathrider/data/out-filtered.sif')).sources()
+    with open(self.path('supmat/2-pathrider/data/updown-noinputs_gen.obs'), 'r') as obsFile:
+      obsLines = obsFile.readlines()
+    with open(self.path('supmat/3-iggy/data/2345.obs'), 'w') as obsFile:
+      obsFile.writelines(obsLines)
+      obsFile.writelines('{} = input\n'.format(gn) for gn in inputs)
+    shellCall('{} ./supmat/2-pathrider/data/out-filtered.sif ./supmat/3-iggy/data/2345.obs --show_predictions --autoinputs > ./supmat/3-iggy/data/2345.out'.format(iggyCommand),
+      self.workDir)
+
+  def postprocessing(self):
+    shellCall('python3 {} --gen ./supmat/3-iggy/data/2345.obs ./supmat/2-pathrider/data/out-filtered.sif {} 0 0 ./supmat/3-iggy/data/2345.out > ./supmat/3-iggy/data/2345-result.tsv'.format(
+      self.script('3-iggy/scripts/post-processing-iggy.py'), self.icgc), self.workDir)
+
+  def crossValidation(self, outDir, start, stop, numRuns):
+    """Run a cross-validation sweep (as run-validation.sh)"""
+    if os.path.isdir(self.path(outDir)):
+      shutil.rmtree(self.path(outDir))
+    shellCall('python3 {} --iggy-command "{}" ./supmat/2-pathrider/data/out-filtered.sif {} ./supmat/4-validation/data/name-true-up_gen.csv ./supmat/4-validation/data/name-true-down_gen.csv {} {} 5 {} {}'.format(
+      self.script('4-validation/scripts/pickrandom-percentage.py'), iggyCommand, self.icgc, start, stop, numRuns, outDir),
+      self.workDir)
+
+  def prepCvRun(self):
+    # As run-validation.sh
+    shellCall('python3 {} {} --sif ./supmat/2-pathrider/data/out-filtered.sif --true-up ./supmat/4-validation/data/name-true-up_gen.csv --true-down ./supmat/4-validation/data/name-true-down_gen.csv'.format(
+      self.script('1-graph-extraction/scripts/build-observations.py'), self.icgc), self.workDir)
+
+  def cvRun(self):
+    self.crossValidation('cv-run', 10, 10, 1)
+
+  def prepStats(self):
+    self.crossValidation('cv-stats', 10, 20, args.statsRuns)
+    # Complete predictions without CHANGE, NOT+ and NOT- (as run-iggy.sh)
+    shellCall('sh {} ./supmat/3-iggy/data/2345-result.tsv > ./supmat/3-iggy/data/2345-result-nochange.tsv'.format(
+      self.script('3-iggy/scripts/remove_change.sh')), self.workDir)
+
+  def stats(self):
+    cache = self.path('cv-stats/prp-parse-cache.npz')
+    if os.path.isfile(cache):
+      os.remove(cache)
+    shellCall('python3 {} cv-stats {}'.format(self.script('4-validation/scripts/stats-matrixscore.py'),
+      self.script('4-validation/scripts/m2.tsv')), self.workDir)
+    shellCall('python3 {} cv-stats robustness.tsv --complete-pred ./supmat/3-iggy/data/2345-result-nochange.tsv --brief-weak --sum-all'.format(
+      self.script('4-validation/scripts/stats-robustness.py')), self.workDir)
+
+  def run(self):
+    """Time the steps; returns a dict step: time (None if failed or not run)"""
+    times = {}
+    failed = False
+    for step in STEPS:
+      times[step] = None
+      if failed:
+        continue
+      try:
+        prep = getattr(self, 'prep' + step[0].upper() + step[1:], None)
+        if prep is not None:
+          prep()
+        best = None
+        for _ in range(args.repeat):
+          t = time.perf_counter()
+          getattr(self, step)()
+          t = time.perf_counter() - t
+          best = t if best is None else min(best, t)
+        times[step] = best
+      except Exception as e:
+        print('  {}: FAILED ({})'.format(step, e), file = sys.stderr)
+        failed = True
+        continue
+      print('  {}: {:.3f} s'.format(step, times[step]))
+      sys.stdout.flush()
+    return times
+
+
+
+# Compare the result to a baseline; returns the number of steps slower than allowed
+def compare(result, baseline):
+  slower = 0
+  print('{:>8}  {:<15}{:>12}{:>12}{:>8}'.format('scale', 'step', 'baseline', 'current', 'ratio'))
+  for scale in result['scales']:
+    if scale not in baseline['scales']:
+      continue
+    for step in STEPS:
+      base = baseline['scales'][scale]['steps'].get(step)
+      cur = result['scales'][scale]['steps'].get(step)
+      if base is None or cur is None:
+        continue
+      ratio = cur / base if base > 0 else float('inf')
+      flag = ''
+      if ratio > 1 + args.maxSlowdown:
+        flag = '  SLOWER'
+        slower += 1
+      print('{:>8}  {:<15}{:>12.3f}{:>12.3f}{:>8.2f}{}'.format(scale, step, base, cur, ratio, flag))
+  return slower
+
+
+
+result = {
+  'python': platform.python_version(),
+  'numpy': np.__version__,
+  'platform': platform.platform(),
+  'iggy': 'stand-in' if args.iggyCommand is None else args.iggyCommand,
+  'seed': args.seed,
+  'repeat': args.repeat,
+  'statsRuns': args.statsRuns,
+  'scales': {}}
+
+workDir = args.workDir if args.workDir is not None else tempfile.mkdtemp(prefix = 'pipeline-benchmark-')
+try:
+  for scale in args.scales:
+    scaleName = '{:g}'.format(scale)
+    print('Scale {}'.format(scaleName))
+    bench = ScaleBenchmark(scale, '{}/scale-{}'.format(workDir, scaleName))
+    print('  data: {nodes} nodes, {edges} edges, {icgcRows} ICGC rows, {blacklist} blacklisted names'.format(**bench.sizes))
+    result['scales'][scaleName] = {'sizes': bench.sizes, 'steps': bench.run()}
+    with open(args.outFileName, 'w') as outFile:
+      json.dump(result, outFile, indent = 2)
+finally:
+  if args.workDir is None:
+    shutil.rmtree(workDir)
+
+if args.baseFileName is not None:
+  with open(args.baseFileName, 'r') as baseFile:
+    baseline = json.load(baseFile)
+  if compare(result, baseline) > 0:
+    exit(1)
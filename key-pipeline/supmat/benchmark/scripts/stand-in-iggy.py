@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+#coding=utf-8
+
+# Deterministic stand-in for Iggy
+# -------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+
+###
+# Deterministic stand-in for Iggy, for the benchmarks of the pipeline without the solver
+###
+# Usage (same as iggy.py):
+#   python3 stand-in-iggy.py <sif-file> <obs-file> [--show_predictions] [--autoinputs] [...]
+#
+# The output has the format of the predictions of Iggy: for each node of the network,
+# a line gen("X") = <label>, whose label (+, -, 0, NOT+, NOT-, CHANGE or none)
+# is derived from a hash of the node name and of the observations.
+###
+
+
+
+import sys
+import zlib
+
+
+
+LABELS = ['+', '-', '0', 'NOT+', 'NOT-', 'CHANGE']
+
+if len(sys.argv) < 3:
+  print('Usage: python3 stand-in-iggy.py <sif-file> <obs-file> [options]', file = sys.stderr)
+  exit(1)
+sifFileName, obsFileName = sys.argv[1], sys.argv[2]
+
+nodes = {}    # Nodes of the network, in order of appearance
+with open(sifFileName, 'r') as sifFile:
+  for line in sifFile:
+    fields = line.rstrip('\n').split('\t')
+    if len(fields) == 3:
+      nodes.setdefault(fields[0], None)
+      nodes.setdefault(fields[2], None)
+with open(obsFileName, 'rb') as obsFile:
+  obsHash = zlib.crc32(obsFile.read())
+
+print('Reading network {} ... done.'.format(sifFileName))
+print('Reading observations {} ... done.'.format(obsFileName))
+print('\nPredictions:')
+for node in nodes:
+  c = (zlib.crc32(node.encode('utf-8')) + obsHash) % 9
+  if c < len(LABELS):
+    print('gen("{}") = {}'.format(node, LABELS[c]))
+print()
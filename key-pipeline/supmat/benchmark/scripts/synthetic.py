@@ -0,0 +1,182 @@
+# Library generating synthetic input data for the pipeline
+# --------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+###
+# Library generating synthetic input data for the pipeline
+###
+# The data mimic the example of the HCC case study (see ../../../../example), at any scale:
+# - a signed SIF network (no multi-edge) whose genes are split into X_gen and X_prot nodes
+#   (with an edge X_gen 1 X_prot), plus complexes A::B::C; the other edges link proteins,
+#   genes and complexes in the proportions of the example, with hubs among the targets
+# - an ICGC table (gene name, fold-change, adjusted p-value, volcano score) covering
+#   a part of the genes of the network and other genes
+# - a blacklist (one gene name per line) containing a part of the genes of the network and other genes
+# At scale 1, the sizes are those of the example (see EXAMPLE_SIZES).
+# All the data are drawn from a random generator seeded by the user.
+#
+# Typical usage:
+#   sizes = synthetic.scaledSizes(10)
+#   data = synthetic.SyntheticData(sizes, seed = 0)
+#   data.write('network.sif', 'icgc.csv', 'blacklist.txt')
+###
+
+
+
+import numpy as np
+
+
+
+# Sizes of the example of the HCC case study
+EXAMPLE_SIZES = {
+  'genes': 3753,        # Genes of the network (nodes X_gen and X_prot)
+  'complexes': 1355,    # Complexes of the network (nodes A::B::C)
+  'edges': 41546,       # Edges of the network
+  'icgcRows': 16282,    # Rows of the ICGC table
+  'blacklist': 4220}    # Names in the blacklist
+
+# Kinds of edges (source kind, target kind, frequency) other than X_gen -> X_prot, as in the example
+EDGE_KINDS = [
+  ('prot', 'prot', 20099),
+  ('prot', 'complex', 13542),
+  ('complex', 'gen', 1646),
+  ('prot', 'gen', 1337),
+  ('complex', 'prot', 1070),
+  ('complex', 'complex', 99)]
+
+
+
+def scaledSizes(scale):
+  """Sizes of the data at a given scale of the example"""
+  return {key: max(1, int(round(EXAMPLE_SIZES[key] * scale))) for key in EXAMPLE_SIZES}
+
+class SyntheticData:
+  """Synthetic network, ICGC table and blacklist"""
+
+  def __init__(self, sizes, seed = 0, split = 1.0, inhibitions = 0.15, hubs = 0.8,
+      icgcCoverage = 0.75, blackCoverage = 0.2):
+    """Draw the data, given their sizes (as scaledSizes) and:
+    the fraction of genes split into X_gen and X_prot nodes (the others are a single node X),
+    the fraction of inhibitions (-1) among the edges,
+    the exponent of the power law of the weights of the targets (0 for uniform targets),
+    the fractions of the genes of the network present in the ICGC table and in the blacklist"""
+    self.sizes = sizes
+    self.random = np.random.RandomState(seed)
+    self.geneNames = ['G{:07d}'.format(i) for i in range(sizes['genes'])]
+    self.makeNodes(split)
+    self.makeEdges(inhibitions, hubs)
+    self.makeICGC(icgcCoverage)
+    self.makeBlacklist(blackCoverage)
+
+  def makeNodes(self, split):
+    """Create the nodes: gene and protein nodes of the genes, and complexes of proteins"""
+    numGenes = self.sizes['genes']
+    isSplit = self.random.random_sample(numGenes) < split
+    self.nodes = []
+    self.gens = []    # Nodes of the genes
+    self.prots = []   # Nodes of the proteins
+    self.splitEdges = []  # Edges X_gen -> X_prot
+    for name, s in zip(self.geneNames, isSplit.tolist()):
+      if s:
+        self.nodes += [name + '_gen', name + '_prot']
+        self.gens.append(len(self.nodes) - 2)
+        self.prots.append(len(self.nodes) - 1)
+        self.splitEdges.append((len(self.nodes) - 2, len(self.nodes) - 1))
+      else:
+        self.nodes.append(name)
+        self.gens.append(len(self.nodes) - 1)
+        self.prots.append(len(self.nodes) - 1)
+    self.complexes = []
+    names = set()
+    while numGenes > 1 and len(self.complexes) < self.sizes['complexes']:
+      # Members drawn with replacement (a choice without replacement permutes all the genes)
+      members = set(self.random.randint(0, numGenes, self.random.randint(2, 4)).tolist())
+      name = '::'.join(self.geneNames[m] for m in sorted(members))
+      if len(members) > 1 and name not in names:
+        names.add(name)
+        self.nodes.append(name)
+        self.complexes.append(len(self.nodes) - 1)
+
+  def makeEdges(self, inhibitions, hubs):
+    """Create the edges: X_gen -> X_prot, then other edges drawn by kind, without multi-edges"""
+    pools = {'gen': np.array(self.gens), 'prot': np.array(self.prots), 'complex': np.array(self.complexes)}
+    # Weights of the targets: power law of a random rank
+    weights = {}
+    for kind in pools:
+      w = (1.0 + self.random.permutation(len(pools[kind]))) ** -hubs
+      weights[kind] = w / w.sum()
+    frequencies = np.array([f for _, _, f in EDGE_KINDS], dtype = float)
+    frequencies /= frequencies.sum()
+    numEdges = max(0, self.sizes['edges'] - len(self.splitEdges))
+    numNodes = len(self.nodes)
+    seen = set(s * numNodes + t for s, t in self.splitEdges)
+    src, tgt = [], []
+    # Draw edges until enough distinct ones (without self-loops) are found
+    while len(src) < numEdges:
+      missing = numEdges - len(src)
+      counts = self.random.multinomial(missing + missing // 10 + 1, frequencies)
+      for (srcKind, tgtKind, _), count in zip(EDGE_KINDS, counts.tolist()):
+        if len(pools[srcKind]) == 0 or len(pools[tgtKind]) == 0:
+          continue
+        s = pools[srcKind][self.random.randint(0, len(pools[srcKind]), count)]
+        t = pools[tgtKind][self.random.choice(len(pools[tgtKind]), count, p = weights[tgtKind])]
+        for a, b in zip(s.tolist(), t.tolist()):
+          if a != b and a * numNodes + b not in seen and len(src) < numEdges:
+            seen.add(a * numNodes + b)
+            src.append(a)
+            tgt.append(b)
+    order = self.random.permutation(len(self.splitEdges) + len(src))
+    allSrc = np.array([s for s, _ in self.splitEdges] + src, dtype = np.int64)[order]
+    allTgt = np.array([t for _, t in self.splitEdges] + tgt, dtype = np.int64)[order]
+    signs = np.where(self.random.random_sample(len(order)) < inhibitions, -1, 1)
+    # X_gen -> X_prot edges are activations
+    isSplitEdge = order < len(self.splitEdges)
+    signs[isSplitEdge] = 1
+    self.edges = list(zip(allSrc.tolist(), signs.tolist(), allTgt.tolist()))
+
+  def otherNames(self, count):
+    """Names of genes that are not in the network"""
+    return ['X{:07d}'.format(i) for i in range(count)]
+
+  def makeICGC(self, coverage):
+    """Create the ICGC table: some genes of the network and other genes, in random order"""
+    numRows = self.sizes['icgcRows']
+    numCovered = min(numRows, int(round(coverage * len(self.geneNames))))
+    covered = self.random.choice(len(self.geneNames), numCovered, replace = False)
+    names = [self.geneNames[g] for g in covered.tolist()] + self.otherNames(numRows - numCovered)
+    order = self.random.permutation(numRows)
+    fcs = self.random.normal(0.0, 1.5, numRows)
+    padjs = 10 ** -self.random.uniform(0.0, 8.0, numRows)
+    self.icgc = [(names[i], fcs[i], padjs[i], np.log10(padjs[i]) * abs(fcs[i])) for i in order.tolist()]
+
+  def makeBlacklist(self, coverage):
+    """Create the blacklist: some genes of the network and other genes"""
+    numNames = self.sizes['blacklist']
+    numCovered = min(numNames, int(round(coverage * len(self.geneNames))))
+    covered = self.random.choice(len(self.geneNames), numCovered, replace = False)
+    self.blacklist = sorted([self.geneNames[g] for g in covered.tolist()] + self.otherNames(numNames - numCovered))
+
+  def writeNetwork(self, fileName):
+    """Write the network as a SIF file"""
+    nodes = self.nodes
+    with open(fileName, 'w') as sifFile:
+      sifFile.writelines('{}\t{}\t{}\n'.format(nodes[s], sign, nodes[t]) for s, sign, t in self.edges)
+
+  def writeICGC(self, fileName):
+    """Write the ICGC table as a TSV file"""
+    with open(fileName, 'w') as icgcFile:
+      icgcFile.write('Genes\tLog2FC\tpadj\tvolcano\n')
+      icgcFile.writelines('{}\t{!r}\t{!r}\t{!r}\n'.format(name, float(fc), float(padj), float(volcano))
+        for name, fc, padj, volcano in self.icgc)
+
+  def writeBlacklist(self, fileName):
+    """Write the blacklist (one name per line)"""
+    with open(fileName, 'w') as blackFile:
+      blackFile.writelines('{}\n'.format(name) for name in self.blacklist)
+
+  def write(self, sifFileName, icgcFileName, blackFileName):
+    """Write the network, the ICGC table and the blacklist"""
+    self.writeNetwork(sifFileName)
+    self.writeICGC(icgcFileName)
+    self.writeBlacklist(blackFileName)
@@ -0,0 +1,238 @@
+# Post-processing of Iggy predictions and comparison to ICGC data
+# ---------------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+###
+# In-process implementation of the chain of post-processing-iggy.sh:
+#   iggy-to-cytoscape.sh | remove-missing.sh | compare-to-icgc.py
+###
+# The chain is a pipeline of generators over the lines of Iggy's output:
+# - predictions(): parse the lines gen("X") = +, dropping the trivial predictions
+#   (genes already observed); then observations(): the observations (without the inputs)
+# - presentRows(): drop the genes missing from the graph
+# - compareRows(): annotate with the ICGC data, preloaded by loadICGC()
+# sweepCounts() counts the comparisons of the genes for a whole grid of thresholds at once,
+# from their fold-changes grouped and sorted by foldChangeGroups().
+# Hash sets are used for the observed genes and the graph nodes (exact names,
+# where the shell scripts used grep --word-regexp, which mishandled names with dashes).
+# The result is identical to the output of post-processing-iggy.sh (see writeResult()).
+#
+# Typical usage:
+#   icgc = iggypost.loadICGC('icgc.csv')
+#   nodes = sifgraph.load('graph.sif').ids
+#   with open('obs.obs', 'r') as obsFile, open('iggy.out', 'r') as iggyFile:
+#     rows = iggypost.postProcess(iggyFile, obsFile.readlines(), nodes, icgc, 0, 0, True)
+#     iggypost.writeResult(rows, sys.stdout)
+###
+
+
+
+import re
+import csv
+import sys
+
+
+
+# Define what weakly matches
+WEAK_MATCH = set([
+# Predictions
+  ('-', 'NOT+'),
+  ('-', 'CHANGE'),
+  ('+', 'NOT-'),
+  ('+', 'CHANGE'),
+  ('0', 'NOT+'),
+  ('0', 'NOT-'),
+# Observations
+  ('-', 'notPlus'),
+  ('+', 'notMinus'),
+  ('0', 'notPlus'),
+  ('0', 'notMinus')
+])
+
+# Header of the observations & predictions (as printed by iggy-to-cytoscape.sh run with sh,
+# whose echo does not know the option -e)
+HEADER = ['-e gene', 'pred&obs']
+
+# Comparisons of the ICGC and Iggy change types (except not-found)
+COMPARISONS = ['match', 'weak-match', 'no-match']
+
+# Labels of observations and predictions (as in the regular expressions of iggy-to-cytoscape.sh)
+OBS_LABEL = re.compile(r' = (0|\+|-|notPlus|notMinus)')
+PRED_LABEL = re.compile(r'\t(0|\+|-|NOT\+|NOT-|CHANGE)')
+
+
+
+def loadICGC(dataFileName):
+  """Load the fold-changes of an ICGC file, indexed by gene name (the first occurrence of a gene is kept)"""
+  dataFC = {}
+  with open(dataFileName, 'r') as fdata:
+    dataReader = csv.reader(fdata, delimiter='\t')
+    # Ignore first line
+    next(dataReader)
+    for row in dataReader:
+      if row[0] not in dataFC:
+        dataFC[row[0]] = row[1]
+  return dataFC
+
+def thresholds(downT, upT):
+  """Sorted down- and up-regulation thresholds"""
+  downRegThreshold = min(downT, upT)
+  upRegThreshold = max(downT, upT)
+  if downRegThreshold == upRegThreshold and downRegThreshold != 0:
+    print('Warning: identical non-null thresholds ({})'.format(downRegThreshold), file = sys.stderr)
+  return downRegThreshold, upRegThreshold
+
+def observedGenes(obsLines):
+  """Set of the genes observed (not as inputs) in the lines of an observations file"""
+  return set(OBS_LABEL.sub('', line.rstrip('\n')) for line in obsLines)
+
+def predictions(iggyLines, observed):
+  """Lines gene<tab>pred:xxx of the predictions of Iggy, except those of the observed genes"""
+  for line in iggyLines:
+    if 'gen("' not in line:
+      continue
+    line = line.rstrip('\n').replace(' ', '').replace('gen("', '').replace('")=', '\t')
+    if line.partition('\t')[0] in observed:
+      continue
+    yield PRED_LABEL.sub(r'\tpred:\1', line)
+
+def observations(obsLines):
+  """Lines gene<tab>obs:xxx of the observations given to Iggy, except the inputs"""
+  for line in obsLines:
+    line = OBS_LABEL.sub(r'\tobs:\1', line.rstrip('\n'))
+    if ' = input' not in line:
+      yield line
+
+def presentRows(rows, nodes):
+  """Rows whose gene is a node of the graph"""
+  for row in rows:
+    if len(row) > 0 and row[0] in nodes:
+      yield row
+
+def iggyChange(obspred):
+  """Kind (obs or pred) and change type (+, -, 0, etc.) of an Iggy observation or prediction obs:/pred:xxx"""
+  if obspred[0:4] == 'obs:':
+    return 'obs', obspred[4:]
+  elif obspred[0:5] == 'pred:':
+    return 'pred', obspred[5:]
+  else:
+    raise ValueError('Error in parsing input: {}'.format(obspred))
+
+def icgcName(gene, suffix):
+  """Name of a gene in the ICGC data and type of node (None unless suffix),
+  the suffixes _gen and _prot being removed if suffix"""
+  if not suffix:
+    return gene, None
+  if gene[-4:] == '_gen':
+    return gene[:-4], 'gen'
+  elif gene[-5:] == '_prot':
+    return gene[:-5], 'prot'
+  elif '::' in gene:
+    return gene, 'complex'
+  else:
+    return gene, 'unknown'
+
+def comparison(typeICGC, typeIggy):
+  """Comparison of the ICGC and Iggy change types (match, weak-match or no-match)"""
+  if typeICGC == typeIggy:
+    return 'match'
+  elif (typeICGC, typeIggy) in WEAK_MATCH:
+    return 'weak-match'
+  else:
+    return 'no-match'
+
+def compareRows(rows, dataFC, downRegThreshold, upRegThreshold, suffix):
+  """Rows gene, obs:/pred:xxx annotated with the ICGC data: fold-change, change type and comparison,
+  and the type of node if suffix (the suffixes _gen and _prot being removed to search the ICGC data)"""
+  for row in rows:
+    gene = row[0]  # Gene name
+    obspred = row[1]  # Iggy's observation or prediction
+
+    # Iggy change type (+, -, 0, etc.)
+    infoIggy, typeIggy = iggyChange(obspred)
+
+    # Extract true gene name & type
+    trueName, geneType = icgcName(gene, suffix)
+
+    # Search for gene in ICGC data
+    if trueName not in dataFC:
+      fc = 'not-found'
+      typeICGC = 'not-found'
+      comp = 'not-found'
+    else:
+      fc = float(dataFC[trueName])  # Fold-change value
+
+      # ICGC-only change type given fold-change and thresholds
+      if fc < downRegThreshold:
+        typeICGC = '-'
+      elif fc > upRegThreshold:
+        typeICGC = '+'
+      else:
+        typeICGC = '0'
+
+      # Compare ICGC and Iggy change types in predictions or observations
+      comp = comparison(typeICGC, typeIggy)
+
+    if suffix:
+      yield [gene, obspred, fc, 'icgc:' + typeICGC, infoIggy + ':' + comp, geneType]
+    else:
+      yield [gene, obspred, fc, 'icgc:' + typeICGC, infoIggy + ':' + comp]
+
+def resultHeader(header, suffix):
+  """Header of the result, given the header of the observations & predictions"""
+  return [header[0], header[1], 'diffexp-icgc', 'obs-icgc', 'comp'] + (['type'] if suffix else [])
+
+def postProcess(iggyLines, obsLines, nodes, dataFC, downT, upT, suffix):
+  """Result rows (header included) of the comparison of Iggy's output to the ICGC data,
+  given the observations given to Iggy (list of lines) and the nodes of the graph (set or dict)"""
+  downRegThreshold, upRegThreshold = thresholds(downT, upT)
+  yield resultHeader(HEADER, suffix)
+  lines = predictions(iggyLines, observedGenes(obsLines))
+  rows = csv.reader(lines, delimiter='\t')
+  yield from compareRows(presentRows(rows, nodes), dataFC, downRegThreshold, upRegThreshold, suffix)
+  rows = csv.reader(observations(obsLines), delimiter='\t')
+  yield from compareRows(presentRows(rows, nodes), dataFC, downRegThreshold, upRegThreshold, suffix)
+
+def writeResult(resRows, f):
+  """Write the result rows in f"""
+  outputWriter = csv.writer(f, delimiter='\t', quoting=csv.QUOTE_NONE)
+  for row in resRows:
+    outputWriter.writerow(row)
+
+
+
+# Threshold sweep
+
+def foldChangeGroups(rows, dataFC, suffix):
+  """Fold-changes of the genes of the rows gene, obs:/pred:xxx found in the ICGC data,
+  as sorted arrays grouped by (obs or pred, Iggy change type); and the number of genes not found"""
+  import numpy as np
+  groups = {}
+  notFound = 0
+  for row in rows:
+    key = iggyChange(row[1])
+    trueName = icgcName(row[0], suffix)[0]
+    if trueName not in dataFC:
+      notFound += 1
+    else:
+      groups.setdefault(key, []).append(float(dataFC[trueName]))
+  return {key: np.sort(np.array(fcs)) for key, fcs in groups.items()}, notFound
+
+def sweepCounts(groups, downTs, upTs):
+  """Number of genes of each comparison (dict (obs or pred, comparison): array of counts)
+  for each pair of thresholds downTs[i] <= upTs[i], given the groups of foldChangeGroups();
+  the change types of a group are counted for all the pairs at once with a binary search"""
+  import numpy as np
+  downTs = np.asarray(downTs, dtype = float)
+  upTs = np.asarray(upTs, dtype = float)
+  counts = {(infoIggy, comp): np.zeros(len(downTs), dtype = int)
+    for infoIggy in ['pred', 'obs'] for comp in COMPARISONS}
+  for (infoIggy, typeIggy), fcs in groups.items():
+    # NaN fold-changes (sorted last) are neither down- nor up-regulations
+    valid = fcs[:len(fcs) - np.count_nonzero(np.isnan(fcs))]
+    nDown = np.searchsorted(valid, downTs, 'left')
+    nUp = len(valid) - np.searchsorted(valid, upTs, 'right')
+    for typeICGC, n in [('-', nDown), ('+', nUp), ('0', len(fcs) - nDown - nUp)]:
+      counts[(infoIggy, comparison(typeICGC, typeIggy))] += n
+  return counts
@@ -0,0 +1,156 @@
+# Upstream/downstream paths starting from some nodes of interest in a network
+# ---------------------------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+###
+# In-process implementation of the command "pathrider stream" (see 2-pathrider/scripts/pathrider)
+###
+# Same semantics and output as:
+#   pathrider stream [-blacklist <blackFile>] [-out <outFile>] <networkFile> <rootFile> <direction>
+# - the root and blacklist files contain one node per line; unknown nodes are reported and ignored
+# - the edges touching a blacklisted node are removed from the network
+# - direction 'up' keeps the edges of all paths leading to a root, 'down' the edges of all
+#   paths starting from a root
+# - the output SIF file contains these edges, in the order in which pathrider finds them
+#
+# Instead of the quadratic list scans of pathrider, the network is loaded with sifgraph
+# and explored with a multi-source breadth-first search on the CSR adjacency arrays:
+# each node is expanded (all its incoming, resp. outgoing, edges added) at most once,
+# hence a time linear in the size of the network.
+###
+
+
+
+import sys
+import numpy as np
+import sifgraph
+
+
+
+def readNodes(fileName, graph, log):
+  """Read a list of nodes (one per line), as pathrider: warn about and skip nodes not in the graph"""
+  nodes = []
+  seen = set()
+  with open(fileName, 'r') as nodeFile:
+    for line in nodeFile:
+      node = line.rstrip('\r\n').lstrip()
+      if node == '':
+        continue
+      if node not in graph:
+        print('Warning: pathrider: {}: {} not in network'.format(fileName, node), file = log)
+      elif node not in seen:
+        seen.add(node)
+        nodes.append(node)
+  if len(nodes) == 0:
+    raise ValueError('empty after reading')
+  return nodes
+
+def checkMultiEdges(graph):
+  """Raise an error if the graph contains multi-edges (or duplicated edges), as pathrider"""
+  if graph.numEdges() == 0:
+    raise ValueError('empty after reading')
+  pairs = graph.edgeSrc.astype(np.int64) * graph.numNodes() + graph.edgeTgt
+  if len(np.unique(pairs)) != len(pairs):
+    raise ValueError('multi-edges (or duplicated edges)')
+
+def streamEdges(graph, roots, direction, keep):
+  """Edges of the upstream ('up') or downstream ('down') paths starting from the roots,
+  in pathrider's order, considering only the edges e such that keep[e] is True"""
+  if direction == 'up':
+    ptr, adjEdges, ends = graph.inPtr.tolist(), graph.inEdges.tolist(), graph.edgeSrc.tolist()
+  else:
+    ptr, adjEdges, ends = graph.outPtr.tolist(), graph.outEdges.tolist(), graph.edgeTgt.tolist()
+  keep = keep.tolist()
+  # First layer: the edges entering (resp. leaving) the roots
+  expanded = set()
+  layer = []
+  for r in roots:
+    v = graph.ids[r]
+    if v not in expanded:
+      expanded.add(v)
+      layer += [e for e in adjEdges[ptr[v]:ptr[v + 1]] if keep[e]]
+  result = layer[:]
+  # Next layers: the edges entering (resp. leaving) the other end of each edge of the previous layer
+  while len(layer) > 0:
+    newLayer = []
+    for e in layer:
+      v = ends[e]
+      if v not in expanded:
+        expanded.add(v)
+        newLayer += [f for f in adjEdges[ptr[v]:ptr[v + 1]] if keep[f]]
+    result += newLayer
+    layer = newLayer
+  return result
+
+def quoteField(field):
+  """Quote a field as Go's CSV writer does (double quotes, leading space, ...)"""
+  if field == '' or not (field == '\\.' or '"' in field or '\r' in field or '\n' in field or field[0].isspace()):
+    return field
+  return '"{}"'.format(field.replace('"', '""'))
+
+def writeNetwork(fileName, graph, edges):
+  """Write some edges of the graph as a SIF file"""
+  names = graph.names
+  labels = graph.labels
+  src, tgt, lab = graph.edgeSrc, graph.edgeTgt, graph.edgeLabel
+  with open(fileName, 'w') as sifFile:
+    for e in edges:
+      sifFile.write('{}\t{}\t{}\n'.format(quoteField(names[src[e]]), quoteField(labels[lab[e]]),
+        quoteField(names[tgt[e]])))
+
+def stream(networkFile, rootFile, direction, outFile = 'out.sif', blackFile = None, log = sys.stdout, graph = None):
+  """Find the upstream/downstream paths starting from the nodes of rootFile in networkFile,
+  write them in outFile and return the list of their edge indices (None in case of error);
+  the network can be given already loaded (graph)"""
+  if direction not in ['up', 'down']:
+    print('Error: pathrider stream: {}: unknown direction, expecting one of: up, down'.format(direction), file = log)
+    return None
+  if not outFile.endswith('.sif'):
+    print('Error: pathrider stream: {}: must have the ".sif" file extension'.format(outFile), file = log)
+    return None
+  print('reading {}'.format(networkFile), file = log)
+  try:
+    if graph is None:
+      graph = sifgraph.load(networkFile)
+    checkMultiEdges(graph)
+  except (OSError, ValueError) as e:
+    print('Error: pathrider stream: {}: {}'.format(networkFile, e), file = log)
+    return None
+  print('reading {}'.format(rootFile), file = log)
+  roots, blackNodes = None, []
+  rootError, blackError = None, None
+  try:
+    roots = readNodes(rootFile, graph, log)
+  except (OSError, ValueError) as e:
+    rootError = e
+  if blackFile is not None:
+    print('reading {}'.format(blackFile), file = log)
+    try:
+      blackNodes = readNodes(blackFile, graph, log)
+    except (OSError, ValueError) as e:
+      blackError = e
+  if rootError is not None:
+    print('Error: pathrider stream: {}: {}'.format(rootFile, rootError), file = log)
+  if blackError is not None:
+    print('Error: pathrider stream: {}: {}'.format(blackFile, blackError), file = log)
+  if rootError is not None or blackError is not None:
+    return None
+  # Remove the edges touching a blacklisted node
+  keep = np.ones(graph.numEdges(), dtype = bool)
+  if blackFile is not None:
+    print('blacklisting from {}'.format(blackFile), file = log)
+    black = np.zeros(graph.numNodes(), dtype = bool)
+    black[[graph.ids[b] for b in blackNodes]] = True
+    keep = ~(black[graph.edgeSrc] | black[graph.edgeTgt])
+    if not keep.any():
+      print('Error: pathrider stream: {}: network empty after blacklisting'.format(blackFile), file = log)
+      return None
+  print('{}streaming {}'.format(direction, rootFile), file = log)
+  edges = streamEdges(graph, roots, direction, keep)
+  if len(edges) == 0:
+    print('Warning: pathrider stream: {}: no {}stream paths found'.format(rootFile, direction), file = log)
+  else:
+    print('writing {}'.format(outFile), file = log)
+    writeNetwork(outFile, graph, edges)
+  return edges
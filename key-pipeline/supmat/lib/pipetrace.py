@@ -0,0 +1,202 @@
+# Timing and memory trace of the pipeline runs
+# --------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+###
+# Trace of the steps of the pipeline and of the processes they run,
+# in the Chrome trace-event format (chrome://tracing, https://ui.perfetto.dev)
+###
+# Each traced span (a step, a run of the cross-validation...) and each traced child process
+# is a complete event ("ph": "X") of the process which ran it, with in its arguments:
+# - the exit status
+# - the CPU time (user and system, in seconds) of the process and of its children during the span,
+#   or of the child process and its descendants
+# - the peak resident set size (in kB) of the process and of the child processes run during the span,
+#   or of the child process and its descendants
+# The events are appended to the trace file, one per line, by all the processes sharing the trace:
+# the process creating the trace exports its file name in the environment variable PIPE_TRACE,
+# so that the scripts it runs (such as pickrandom-percentage.py) add their own events.
+# Until the trace is closed, the file is in the JSON Array Format (without the final "]"),
+# which the trace viewers accept; closing it rewrites it in the JSON Object Format.
+#
+# Typical usage:
+#   trace = pipetrace.Trace('trace.json')
+#   with trace.span('step', 'pipe'):
+#     status = pipetrace.system('sh script.sh', trace)
+#   trace.close()
+# and in a script run by the traced process:
+#   trace = pipetrace.Trace.fromEnvironment()
+#   returnCode = pipetrace.call(command, trace)
+###
+
+
+
+import os
+import sys
+import json
+import time
+import resource
+import threading
+import subprocess
+import contextlib
+
+
+
+# Environment variable containing the file name of the trace shared with the child processes
+TRACE_ENV = 'PIPE_TRACE'
+
+# Programs whose events are named after their script
+INTERPRETERS = ['sh', 'bash', 'python', 'python3', 'go']
+
+# Unit of ru_maxrss in kB (kB on Linux, bytes on macOS)
+RSS_UNIT = 1024 if sys.platform == 'darwin' else 1
+
+
+
+def now():
+  """Current time in microseconds (the same clock for all the processes of the trace)"""
+  return int(time.time() * 1000000)
+
+def cpuTimes(who):
+  """User and system CPU times (in seconds) and peak RSS (in kB) of resource.getrusage(who)"""
+  usage = resource.getrusage(who)
+  return usage.ru_utime, usage.ru_stime, usage.ru_maxrss // RSS_UNIT
+
+class Trace:
+  """Trace file shared by the processes of a pipeline run"""
+
+  def __init__(self, fileName, create = True):
+    """Open the trace fileName; if create, start a new trace and share it with the child processes"""
+    self.fileName = os.path.abspath(fileName)
+    self.namedPids = set()   # Processes whose name has been recorded
+    self.childRss = 0   # Peak RSS of the child processes run during the current span
+    if create:
+      with open(self.fileName, 'w') as traceFile:
+        traceFile.write('[\n')
+      os.environ[TRACE_ENV] = self.fileName
+
+  @staticmethod
+  def fromEnvironment():
+    """Trace shared by the parent process, or None if there is none"""
+    fileName = os.environ.get(TRACE_ENV, '')
+    if fileName == '':
+      return None
+    return Trace(fileName, create = False)
+
+  def write(self, event):
+    """Append an event (dict) to the trace, in a single write so that processes do not mix their events"""
+    pid = os.getpid()
+    lines = ''
+    if pid not in self.namedPids:
+      self.namedPids.add(pid)
+      lines += json.dumps({'ph': 'M', 'name': 'process_name', 'pid': pid, 'tid': 0,
+        'args': {'name': '{} ({})'.format(os.path.basename(sys.argv[0]), pid)}}) + ',\n'
+    event.update(pid = pid, tid = threading.get_ident())
+    lines += json.dumps(event, sort_keys = True) + ',\n'
+    fd = os.open(self.fileName, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+      os.write(fd, lines.encode('utf-8'))
+    finally:
+      os.close(fd)
+
+  def complete(self, name, cat, start, args):
+    """Record a complete event which started at time start"""
+    self.write({'ph': 'X', 'name': name, 'cat': cat, 'ts': start, 'dur': now() - start, 'args': args})
+
+  @contextlib.contextmanager
+  def span(self, name, cat, args = None):
+    """Trace the enclosed code; the dict yielded can receive additional arguments (such as 'status')"""
+    spanArgs = dict(args or {})
+    childRss = self.childRss
+    self.childRss = 0
+    selfBefore = cpuTimes(resource.RUSAGE_SELF)
+    childrenBefore = cpuTimes(resource.RUSAGE_CHILDREN)
+    start = now()
+    try:
+      yield spanArgs
+    except BaseException as e:
+      spanArgs.setdefault('status', 'exception: {!r}'.format(e))
+      raise
+    finally:
+      selfAfter = cpuTimes(resource.RUSAGE_SELF)
+      childrenAfter = cpuTimes(resource.RUSAGE_CHILDREN)
+      spanArgs.update(
+        cpu_user_s = round(selfAfter[0] - selfBefore[0] + childrenAfter[0] - childrenBefore[0], 6),
+        cpu_sys_s = round(selfAfter[1] - selfBefore[1] + childrenAfter[1] - childrenBefore[1], 6),
+        max_rss_kb = max(selfAfter[2], self.childRss))
+      self.complete(name, cat, start, spanArgs)
+      self.childRss = max(childRss, self.childRss)
+
+  def close(self):
+    """Rewrite the trace in the JSON Object Format, once all the processes have finished"""
+    with open(self.fileName, 'r') as traceFile:
+      content = traceFile.read().rstrip().rstrip(',')
+    if not content.endswith(']'):
+      content += '\n]'
+    events = json.loads(content)
+    tmpFileName = self.fileName + '.tmp'
+    with open(tmpFileName, 'w') as traceFile:
+      json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, traceFile, indent = 0)
+      traceFile.write('\n')
+    os.replace(tmpFileName, self.fileName)
+    if os.environ.get(TRACE_ENV) == self.fileName:
+      del os.environ[TRACE_ENV]
+
+
+
+def commandName(command):
+  """Short name of a shell command: its program, and its script if the program is an interpreter"""
+  words = [os.path.basename(w) for w in command.split()[:2]]
+  if len(words) == 0:
+    return 'sh'
+  if words[0] in INTERPRETERS and len(words) > 1 and words[1][:1] != '-':
+    return ' '.join(words)
+  return words[0]
+
+def returnCode(status):
+  """Exit code (negative if killed by a signal) of a wait status"""
+  return -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+
+def wait4(process):
+  """Wait for a process (subprocess.Popen) with wait4(), which gives the resources used by the process
+  and its descendants; return its wait status (as os.system) and its resource usage"""
+  _, status, usage = os.wait4(process.pid, 0)
+  process.returncode = returnCode(status)
+  return status, usage
+
+def recordProcess(trace, command, start, pid, status, usage, name = None, args = None):
+  """Record in the trace a child process which started at time start, with its status and resource usage"""
+  rss = usage.ru_maxrss // RSS_UNIT
+  trace.childRss = max(trace.childRss, rss)
+  if name is None:
+    name = commandName(command)
+  trace.complete(name, 'process', start, dict(args or {},
+    command = command, child_pid = pid, status = status,
+    cpu_user_s = round(usage.ru_utime, 6), cpu_sys_s = round(usage.ru_stime, 6), max_rss_kb = rss))
+
+def waitTraced(command, trace, name = None):
+  """Run a shell command and record it in the trace; return its wait status (as os.system)"""
+  start = now()
+  process = subprocess.Popen(command, shell = True)
+  status, usage = wait4(process)
+  recordProcess(trace, command, start, process.pid, process.returncode, usage, name)
+  return status
+
+def system(command, trace = None, name = None):
+  """Same as os.system(command), the command being recorded in the trace (if not None)"""
+  if trace is None:
+    return os.system(command)
+  return waitTraced(command, trace, name)
+
+def call(command, trace = None, name = None):
+  """Same as subprocess.call(command, shell = True), the command being recorded in the trace (if not None)"""
+  if trace is None:
+    return subprocess.call(command, shell = True)
+  return returnCode(waitTraced(command, trace, name))
+
+def span(trace, name, cat, args = None):
+  """Trace.span() of the trace, or a context doing nothing if the trace is None"""
+  if trace is None:
+    return contextlib.nullcontext(dict(args or {}))
+  return trace.span(name, cat, args)
@@ -0,0 +1,234 @@
+# Summary tables of the cross-validation statistics, and their plots
+# ------------------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+###
+# Summary tables of the cross-validation statistics, and their plots
+###
+# The statistics scripts (stats-matrixscore.py and stats-robustness.py, with --summary) write
+# one row per sampling in a TSV summary table, from which the plots are built without reading the runs:
+# - score table (boxplot of the scores): kind (sampling, or complete for the complete predictions),
+#   sampling, label, number of proper runs, mean and SD of the scores, mean, min and max numbers
+#   of predictions, and the scores of the runs (separated by commas)
+# - robustness table (evolution of the good, bad and missing predictions): sampling, number of proper runs,
+#   and min, max, mean and median of the percentages of good, bad and missing predictions of the genes
+# The plots written by writeHTML() reference a single plotly.js file (plotly.min.js) in their folder,
+# instead of embedding a copy of it (about 3 MB) in each HTML file.
+#
+# Typical usage:
+#   plotsummary.writeTable('m2-mean-boxplot.tsv', plotsummary.SCORE_COLUMNS, rows)
+#   kind, rows = plotsummary.loadTable('m2-mean-boxplot.tsv')
+#   plotsummary.writeHTML(plotsummary.scoreFigure(rows), 'plots/m2-mean-boxplot.html')
+###
+
+
+
+import os
+
+
+
+# Columns of the score table
+SCORE_COLUMNS = ['kind', 'sampling', 'label', 'runs', 'score_mean', 'score_sd',
+  'pred_mean', 'pred_min', 'pred_max', 'scores']
+
+# Curves of the robustness plot: (name, RGB factors) of the predictions compared to the complete ones,
+# and (name, brightness, opacity, fill type, marker) of the functions computed for each sampling
+ROBUSTNESS_KEYS = [('good', (0, 1, 0)), ('bad', (1, 0, 0)), ('missing', (0, 0, 1))]
+ROBUSTNESS_FUNCTIONS = [
+  ('Min', 0.33, .3, 'none', 'circle-open'),
+  ('Max', 1.0, .3, 'tonexty', 'circle-open'),
+  ('Mean', 0.66, 1, 'none', 'square'),
+  ('Median', 0.66, 1, 'tonexty', 'diamond')]
+
+# Columns of the robustness table
+ROBUSTNESS_COLUMNS = ['sampling', 'runs'] + ['{}_{}'.format(k[0], f[0].lower())
+  for k in ROBUSTNESS_KEYS for f in ROBUSTNESS_FUNCTIONS]
+
+# Shared plotly.js file of the HTML plots
+PLOTLYJS_FILE_NAME = 'plotly.min.js'
+
+# plotly.js files written (or found up to date) by this process
+writtenPlotlyJS = set()
+
+
+
+# Summary tables
+
+def writeTable(fileName, columns, rows):
+  """Write a summary table (rows: list of dicts whose lists are joined by commas)"""
+  def formatValue(x):
+    return ','.join(str(y) for y in x) if isinstance(x, list) else str(x)
+  with open(fileName, 'w') as tableFile:
+    tableFile.write('\t'.join(columns) + '\n')
+    for row in rows:
+      tableFile.write('\t'.join(formatValue(row[c]) for c in columns) + '\n')
+
+def loadTable(fileName):
+  """Load a summary table; return its kind ('score' or 'robustness') and its rows (dicts)"""
+  with open(fileName, 'r') as tableFile:
+    columns = tableFile.readline().rstrip('\n').split('\t')
+    if columns == SCORE_COLUMNS:
+      kind = 'score'
+    elif columns == ROBUSTNESS_COLUMNS:
+      kind = 'robustness'
+    else:
+      raise ValueError('{} is not a summary table of the statistics scripts'.format(fileName))
+    rows = []
+    for line in tableFile:
+      row = dict(zip(columns, line.rstrip('\n').split('\t')))
+      for c in columns:
+        if c == 'scores':
+          row[c] = [float(x) for x in row[c].split(',') if x != '']
+        elif c not in ['kind', 'label']:
+          row[c] = float(row[c])
+      rows.append(row)
+  return kind, rows
+
+
+
+# Figures
+
+def scoreFigure(rows, predLines = None, pdf = False):
+  """Boxplot of the scores of a score table, with the lines of the mean (predLines = 'mean')
+  or the mean, min and max (predLines = 'mmm') numbers of predictions"""
+  import plotly.graph_objs as go
+  plotData = []
+  for row in rows:
+    if row['kind'] == 'sampling':
+      plotData.append(go.Box(
+        name = row['label'],
+        x = [row['sampling']] * len(row['scores']),
+        y = row['scores'],
+        boxpoints = 'outliers' if pdf else 'all',
+        pointpos = 0 if pdf else -1.8
+      ))
+    else:
+      # Complete predictions (100% sampling)
+      plotData.append(go.Scatter(
+        name = row['label'],
+        x = [row['sampling']],
+        y = [row['score_mean']]
+      ))
+  # Add number of predictions (mean, max, min)
+  plotValues = [row['sampling'] for row in rows]
+  predStats = [('pred_mean', 'blue', 'Mean # pred')]
+  if predLines == 'mmm':
+    predStats += [('pred_max', 'green', 'Max # pred'), ('pred_min', 'red', 'Min # pred')]
+  if predLines is not None:
+    for c, color, name in predStats:
+      plotData.append(go.Scatter(
+        x = plotValues,
+        y = [row[c] for row in rows],
+        yaxis = 'y2',
+        mode = 'lines+markers',
+        line = dict(
+          color = color
+        ),
+        name = name
+      ))
+  # Layout
+  title = 'Boxplot of the precision scores for each sampling'
+  if predLines == 'mmm':
+    title += ' & mean, min and max number of predictions'
+  elif predLines == 'mean':
+    title += ' & mean number of predictions'
+  plotLayout = go.Layout(
+    title = title,
+    showlegend = False,
+    xaxis = dict(
+      title = 'Sampling (%)',
+    ),
+    yaxis = dict(
+      title = 'Score'
+    )
+  )
+  if predLines is not None:
+    plotLayout['yaxis2'] = dict(
+      autorange = True,
+      overlaying = 'y',
+      side = 'right',
+      rangemode = "tozero", # "nonnegative",
+      title = 'Number of predictions'
+    )
+  return go.Figure(data = plotData, layout = plotLayout)
+
+def robustnessCurves(rows):
+  """Curves of a robustness table (dict name: dict function: list of percentages for each sampling)"""
+  return {k[0]: {f[0]: [row['{}_{}'.format(k[0], f[0].lower())] for row in rows] for f in ROBUSTNESS_FUNCTIONS}
+    for k in ROBUSTNESS_KEYS}
+
+def robustnessFigure(plotValues, curves, finalPoint = False, cumulative = False, pdf = False):
+  """Curves of the percentages of good, bad and missing predictions for each sampling of plotValues
+  (curves: as returned by robustnessCurves), extended to the 100% sampling if finalPoint"""
+  import plotly.graph_objs as go
+  plotValues = list(plotValues) + [100]
+  allPlots = []
+  for k in ROBUSTNESS_KEYS:
+    for f in ROBUSTNESS_FUNCTIONS:
+      y = list(curves[k[0]][f[0]])
+      # Add final ordinates point
+      if finalPoint:
+        y.append(100 if k[0] == 'good' else 0)
+      allPlots.append(go.Scatter(
+        x = plotValues,
+        y = y,
+        mode = 'lines+markers',
+        fill = f[3],
+        fillcolor = 'rgba({}, {}, {}, {})'.format(*[c * f[1] * 255 for c in k[1]], .1),
+        line = dict(
+          color = 'rgba({}, {}, {}, {})'.format(*[c * f[1] * 255 for c in k[1]], f[2])
+        ),
+        marker = dict(
+          symbol = f[4]
+        ),
+        name = '{} {}'.format(f[0], k[0])
+      ))
+  plotLayout = go.Layout(
+    title = '{}volution of max, min, mean and median of{}good, bad and missing predictions compared to 100% sampling'.format('Cumulative e' if cumulative else 'E', '<br />' if pdf else ' '),
+    showlegend = True,
+    xaxis = dict(
+      title = 'Sampling (%)'
+    ),
+    yaxis = dict(
+      title = 'Number of good/bad/missing predictions (%)'
+    )
+  )
+  return go.Figure(data = allPlots, layout = plotLayout)
+
+
+
+# Output
+
+def writePlotlyJS(dirName):
+  """Write the plotly.js file shared by the HTML plots of a folder, unless it is already up to date"""
+  import plotly.offline as pl
+  fileName = os.path.join(dirName, PLOTLYJS_FILE_NAME)
+  if fileName in writtenPlotlyJS:
+    return
+  plotlyJS = pl.get_plotlyjs()
+  try:
+    with open(fileName, 'r', encoding = 'utf-8') as jsFile:
+      upToDate = jsFile.read() == plotlyJS
+  except OSError:
+    upToDate = False
+  if not upToDate:
+    with open(fileName, 'w', encoding = 'utf-8') as jsFile:
+      jsFile.write(plotlyJS)
+  writtenPlotlyJS.add(fileName)
+
+def writeHTML(fig, fileName, autoOpen = False, imageFileName = None):
+  """Write an HTML plot referencing the shared plotly.js file of its folder, and open it if autoOpen;
+  with imageFileName, the page downloads a PNG image of the plot (imageFileName.png) when opened"""
+  import plotly.offline as pl
+  writePlotlyJS(os.path.dirname(os.path.abspath(fileName)))
+  imageOptions = {}
+  if imageFileName is not None:
+    imageOptions = dict(image = 'png', image_width = 1600, image_height = 1200, image_filename = imageFileName)
+  pl.plot(fig, filename = fileName, show_link = False, auto_open = autoOpen, include_plotlyjs = 'directory',
+    **imageOptions)
+
+def writeImage(fig, fileName):
+  """Write a static image of a plot (format given by the extension, such as .png or .pdf)"""
+  import plotly.io
+  plotly.io.write_image(fig, fileName)
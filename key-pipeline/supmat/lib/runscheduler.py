@@ -0,0 +1,140 @@
+# Scheduler of the shell commands of the pipeline runs, with timeouts and retries
+# -------------------------------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+###
+# Scheduler of the shell commands of the pipeline runs, with timeouts and retries
+###
+# The tasks (coroutines, such as a call to Iggy followed by its post-processing) are run by asyncio
+# in a single event loop, at most JOBS at once; the event loop is kept by the scheduler
+# for all its calls to runAll, until it is closed.
+# Each shell command is run in its own process group (session); once it has run for TIMEOUT seconds,
+# the whole group (the shell, Iggy and its solver) receives SIGTERM, then SIGKILL KILL_DELAY seconds later.
+# A command which timed out or was killed by a signal is run again, at most RETRIES more times;
+# if its last attempt timed out, the exception Timeout is raised.
+# When a trace is given (see pipetrace.py), each attempt is recorded as a process of the trace,
+# with its exit status, CPU time and peak RSS: the commands are waited for with wait4()
+# in threads (at most JOBS), the child watcher of asyncio not giving their resource usage.
+#
+# Typical usage:
+#   scheduler = runscheduler.RunScheduler(4, timeout = 3600, retries = 1)
+#   async def task(i):
+#     return await scheduler.call('iggy ... > out{}.txt'.format(i))
+#   results = scheduler.runAll([functools.partial(task, i) for i in range(10)])
+#   scheduler.close()
+###
+
+
+
+import os
+import signal
+import asyncio
+import subprocess
+import concurrent.futures
+
+import pipetrace
+
+
+
+# Seconds between the SIGTERM and the SIGKILL sent to the process group of a timed-out command
+KILL_DELAY = 5
+
+# Beginning of the message of the exception Timeout
+TIMEOUT_MESSAGE = 'Timed out'
+
+
+
+class Timeout(Exception):
+  """Command killed after the timeout, at each of its attempts"""
+
+  def __init__(self, command, timeout, attempts):
+    super().__init__('{} after {:g} s ({} attempt(s)) with command:\n$ {}'.format(TIMEOUT_MESSAGE, timeout,
+      attempts, command))
+    self.command = command
+    self.timeout = timeout
+    self.attempts = attempts
+
+class RunScheduler:
+  """Run tasks at most jobs at once, their commands being killed after timeout seconds (None: never)
+  and run again at most retries times"""
+
+  def __init__(self, jobs, timeout = None, retries = 0, trace = None):
+    self.jobs = jobs
+    self.timeout = timeout
+    self.retries = retries
+    self.trace = trace
+    self.timedOut = []   # Commands of the attempts which timed out
+    self.waiters = concurrent.futures.ThreadPoolExecutor(max_workers = jobs)   # Threads waiting for the commands
+    self.loop = None   # Event loop running the tasks, created by the first call to runAll
+
+  def runAll(self, tasks, finish = None):
+    """Run the tasks (functions returning a coroutine) in the event loop of the scheduler, at most jobs at once;
+    call finish(index, result) as each task ends; return the list of their results"""
+    if self.loop is None:
+      self.loop = asyncio.new_event_loop()
+    return self.loop.run_until_complete(self.schedule(tasks, finish))
+
+  def close(self):
+    """Close the event loop and the threads of the scheduler"""
+    if self.loop is not None:
+      self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+      self.loop.close()
+      self.loop = None
+    self.waiters.shutdown()
+
+  async def schedule(self, tasks, finish):
+    slots = asyncio.Semaphore(self.jobs)   # Created in the event loop running the tasks
+    async def runTask(index, task):
+      async with slots:
+        result = await task()
+      if finish is not None:
+        finish(index, result)
+      return result
+    return await asyncio.gather(*[runTask(index, task) for index, task in enumerate(tasks)])
+
+  async def call(self, command, name = None):
+    """Run a shell command with the timeout and the retries of the scheduler;
+    return its exit code (negative if killed by a signal), or raise Timeout"""
+    attempt = 0
+    while True:
+      attempt += 1
+      returnCode = await self.attempt(command, name, attempt)
+      if returnCode is not None and returnCode >= 0 or attempt > self.retries:
+        break
+    if returnCode is None:
+      raise Timeout(command, self.timeout, attempt)
+    return returnCode
+
+  async def attempt(self, command, name, attempt):
+    """Run a shell command in a new process group; return its exit code, or None if it timed out"""
+    start = pipetrace.now()
+    process = subprocess.Popen(command, shell = True, start_new_session = True)
+    waiting = asyncio.get_running_loop().run_in_executor(self.waiters, pipetrace.wait4, process)
+    try:
+      # (shielded: waiting for the command goes on after a timeout, until it is killed)
+      _, usage = await asyncio.wait_for(asyncio.shield(waiting), self.timeout)
+      returnCode = process.returncode
+    except asyncio.TimeoutError:
+      _, usage = await self.kill(process, waiting)
+      self.timedOut.append(command)
+      returnCode = None
+    if self.trace is not None:
+      pipetrace.recordProcess(self.trace, command, start, process.pid,
+        returnCode if returnCode is not None else 'timeout', usage, name, {'attempt': attempt})
+    return returnCode
+
+  async def kill(self, process, waiting):
+    """Terminate the process group of a process (of which it is the leader), then kill it;
+    return the result of waiting (its wait status and resource usage)"""
+    for sig in [signal.SIGTERM, signal.SIGKILL]:
+      try:
+        os.killpg(process.pid, sig)
+      except ProcessLookupError:
+        break
+      if sig == signal.SIGTERM:
+        try:
+          await asyncio.wait_for(asyncio.shield(waiting), KILL_DELAY)
+        except asyncio.TimeoutError:
+          pass
+    return await waiting
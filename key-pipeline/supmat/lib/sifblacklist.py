@@ -0,0 +1,93 @@
+# Removal of the edges of blacklisted genes from a SIF network
+# ------------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+###
+# In-process replacement of the command:
+#   grep -wvi -f <blackFile> <inFile> > <outFile>
+###
+# The blacklist contains gene names (one per line, such as a list of weakly expressed genes).
+# A node of the network is blacklisted if its name, without the suffix _gen or _prot,
+# is in the blacklist, or if it is a complex (A::B::C) with such a member.
+# An edge (line of the SIF file) is removed if its source or one of its targets is blacklisted;
+# the other lines are copied unchanged.
+#
+# As with grep -i, the names are compared case-insensitively (both sides casefolded).
+# Unlike grep, they are compared exactly (set lookups) to the whole node names and complex members:
+# a blacklisted gene ABC no longer removes the edges of the nodes which merely contain it
+# between word boundaries (such as "-" or "."), for instance ABC-1_gen or ABC.2_prot.
+# The SIF file is read in a single pass, and each node name is checked once.
+#
+# Typical usage:
+#   blacklist = sifblacklist.Blacklist(sifblacklist.loadNames('blacklist.txt'))
+#   kept, removed = sifblacklist.filterSIF('network.sif', 'network-filtered.sif', blacklist)
+###
+
+
+
+# Suffixes of the gene and protein nodes of a gene
+SUFFIXES = ['_gen', '_prot']
+
+# Separator of the members of a complex
+COMPLEX_SEPARATOR = '::'
+
+
+
+def loadNames(fileName):
+  """Set of the names of a blacklist file (one name per line)"""
+  with open(fileName, 'r') as blackFile:
+    return set(name for name in (line.strip() for line in blackFile) if name != '')
+
+def baseName(node):
+  """Name of the gene of a node (without the suffix _gen or _prot)"""
+  for suffix in SUFFIXES:
+    if node.endswith(suffix):
+      return node[:-len(suffix)]
+  return node
+
+class Blacklist:
+  """Set of blacklisted gene names, and the test of the nodes of a network (case-insensitive)"""
+
+  def __init__(self, names):
+    self.names = set(name.casefold() for name in names)
+    self.nodes = {}   # Node name: is blacklisted (cache)
+
+  def __contains__(self, node):
+    """Check if a node (gene, protein or complex) is blacklisted"""
+    black = self.nodes.get(node)
+    if black is None:
+      black = any(baseName(member.strip().casefold()) in self.names for member in node.split(COMPLEX_SEPARATOR))
+      self.nodes[node] = black
+    return black
+
+  def keepLine(self, line):
+    """Check if a line of a SIF file (source, sign, targets) has no blacklisted node"""
+    fields = line.rstrip('\r\n').split('\t')
+    return not any(node in self for node in fields[:1] + fields[2:] if node.strip() != '')
+
+def filterSIF(inFileName, outFileName, blacklist):
+  """Copy the SIF file inFileName into outFileName without the edges of blacklisted nodes;
+  return the numbers of kept and removed edges"""
+  kept, removed = 0, 0
+  checked = blacklist.nodes.get   # Result of the nodes already checked (None for the others)
+  with open(inFileName, 'r') as inFile, open(outFileName, 'w') as outFile:
+    for line in inFile:
+      fields = line.rstrip('\r\n').split('\t')
+      if len(fields) == 3:
+        # Usual line (source, sign, target), checked without method calls once its nodes are known
+        black = checked(fields[0])
+        if black is None:
+          black = fields[0] in blacklist
+        if not black:
+          black = checked(fields[2])
+          if black is None:
+            black = fields[2] in blacklist
+      else:
+        black = not blacklist.keepLine(line)
+      if black:
+        removed += 1
+      else:
+        outFile.write(line)
+        kept += 1
+  return kept, removed
@@ -0,0 +1,282 @@
+# Compact integer-indexed signed graph loaded from a SIF file
+# -----------------------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+###
+# Compact integer-indexed signed graph loaded from a SIF file
+###
+# The SIF file is read once; node names are interned into integer IDs (0..n-1)
+# in order of first appearance, and edges are stored in file order in NumPy arrays:
+#   edgeSrc[e], edgeTgt[e]: source and target node IDs of edge e
+#   edgeSign[e]: 1 or -1 for the labels '1' and '-1', 0 for any other label
+#   edgeLabel[e]: index of the original label of edge e in labels
+# Successors and predecessors are stored in CSR (compressed sparse row) style:
+#   the edges leaving node v are outEdges[outPtr[v]:outPtr[v+1]],
+#   the edges entering node v are inEdges[inPtr[v]:inPtr[v+1]],
+#   both in file order.
+#
+# With cache = True, the graph is also saved in a binary cache file next to the SIF file
+# (out-filtered.sif -> out-filtered.sifc), loaded instead of parsing the SIF file as long as
+# the SHA-256 of the SIF file is unchanged (otherwise the cache is rebuilt). The cache holds:
+#   a header: magic 'SIFC', version, length of the JSON description, then the JSON description
+#     (SHA-256 of the SIF file, numbers of nodes, edges and labels, and the type, offset and length
+#     of each array)
+#   the node names and the labels (UTF-8, separated by '\n')
+#   the arrays edgeSrc, edgeTgt, edgeLabel, edgeSign, outPtr, outEdges, inPtr and inEdges
+#     (little-endian, aligned on 64 bytes)
+# The arrays of a cached graph are read-only views of a memory map of the cache file:
+# all the processes loading the same graph share one copy of its pages.
+#
+# Typical usage:
+#   g = sifgraph.load('out-filtered.sif')
+#   g.sources()           # Sorted names of the nodes without predecessor (as extract-inputs.sh)
+#   g.nodeNames()         # Sorted names of all nodes (as get-genes-from-sif.sh)
+#   'EGFR_gen' in g       # Membership
+#   g.inDegree(g.ids['EGFR_gen'])
+###
+
+
+
+import os
+import json
+import mmap
+import struct
+import hashlib
+from operator import methodcaller
+import numpy as np
+
+
+
+# Sign of the usual edge labels
+SIGNS = {'1': 1, '-1': -1}
+
+# Binary cache files: extension, magic number, version and alignment of the arrays
+CACHE_EXTENSION = '.sifc'
+CACHE_MAGIC = b'SIFC'
+CACHE_VERSION = 1
+CACHE_ALIGN = 64
+
+# Arrays of the cache file (besides the names and labels) and their types
+CACHE_ARRAYS = [('edgeSrc', '<i4'), ('edgeTgt', '<i4'), ('edgeLabel', '<i4'), ('edgeSign', 'i1'),
+  ('outPtr', '<i4'), ('outEdges', '<i4'), ('inPtr', '<i4'), ('inEdges', '<i4')]
+
+
+
+class SIFGraph:
+  """Signed directed graph with interned node IDs and CSR adjacency arrays"""
+
+  def __init__(self, names, labels, edgeSrc, edgeTgt, edgeLabel, arrays = None):
+    """Build the graph from its nodes, labels and edges; the derived arrays (edgeSign and CSR arrays)
+    are computed, unless given (arrays, as read from a cache file)"""
+    self.names = names    # Node ID: node name
+    self.ids = dict(zip(names, range(len(names))))    # Node name: node ID
+    self.labels = labels    # Label index: edge label (such as '1' or '-1')
+    self.edgeSrc = edgeSrc
+    self.edgeTgt = edgeTgt
+    self.edgeLabel = edgeLabel
+    if arrays is not None:
+      self.edgeSign = arrays['edgeSign']
+      self.outPtr, self.outEdges = arrays['outPtr'], arrays['outEdges']
+      self.inPtr, self.inEdges = arrays['inPtr'], arrays['inEdges']
+      return
+    labelSigns = np.array([SIGNS.get(l, 0) for l in labels], dtype = np.int8)
+    self.edgeSign = labelSigns[edgeLabel]
+    self.outPtr, self.outEdges = buildCSR(edgeSrc, len(names))
+    self.inPtr, self.inEdges = buildCSR(edgeTgt, len(names))
+
+  def numNodes(self):
+    return len(self.names)
+
+  def numEdges(self):
+    return len(self.edgeSrc)
+
+  def __contains__(self, name):
+    return name in self.ids
+
+  def nodeNames(self):
+    """Sorted list of all node names"""
+    return sorted(self.names)
+
+  def outDegree(self, v):
+    return int(self.outPtr[v + 1] - self.outPtr[v])
+
+  def inDegree(self, v):
+    return int(self.inPtr[v + 1] - self.inPtr[v])
+
+  def successors(self, v):
+    """Successor IDs of node v, in file order (with repetitions in case of multi-edges)"""
+    return self.edgeTgt[self.outEdges[self.outPtr[v]:self.outPtr[v + 1]]]
+
+  def predecessors(self, v):
+    """Predecessor IDs of node v, in file order (with repetitions in case of multi-edges)"""
+    return self.edgeSrc[self.inEdges[self.inPtr[v]:self.inPtr[v + 1]]]
+
+  def sources(self):
+    """Sorted list of the names of the nodes without predecessor (inputs of the graph)"""
+    return sorted(self.names[v] for v in np.flatnonzero(np.diff(self.inPtr) == 0))
+
+  def edgeLine(self, e):
+    """Line of the SIF file for edge e (without line return)"""
+    return '{}\t{}\t{}'.format(self.names[self.edgeSrc[e]], self.labels[self.edgeLabel[e]],
+      self.names[self.edgeTgt[e]])
+
+
+
+def buildCSR(keys, n):
+  """Group the edge indices by key (node ID), keeping the file order inside each group"""
+  ptr = np.zeros(n + 1, dtype = np.int32)
+  np.cumsum(np.bincount(keys, minlength = n), out = ptr[1:])
+  order = np.argsort(keys, kind = 'stable').astype(np.int32)
+  return ptr, order
+
+def intern(names, ids):
+  """Return the IDs of a list of names, adding the new names to the ids dictionary"""
+  for name in dict.fromkeys(names):
+    if name not in ids:
+      ids[name] = len(ids)
+  return list(map(ids.__getitem__, names))
+
+def parseLine(line):
+  """Split a SIF line into source, label and targets (tab-separated, or space-separated if no tab)"""
+  fields = line.split('\t') if '\t' in line else line.split()
+  label = fields[1].strip() if len(fields) > 1 else ''
+  return fields[0].strip(), label, [t.strip() for t in fields[2:] if t.strip() != '']
+
+def load(sifFileName, cache = False):
+  """Load a SIF file into a SIFGraph; with cache, use (or build) its binary cache file"""
+  if cache:
+    return loadCached(sifFileName)
+  return parse(sifFileName)
+
+def parse(sifFileName):
+  """Parse a SIF file into a SIFGraph"""
+  with open(sifFileName, 'r') as sifFile:
+    lines = list(filter(None, sifFile.read().splitlines()))
+  ids = {}
+  labelIds = {}
+  # Fast path: all lines are 'source<tab>label<tab>target'
+  tabCounts = list(map(methodcaller('count', '\t'), lines))
+  if len(lines) > 0 and tabCounts.count(2) == len(lines):
+    fields = '\t'.join(lines).split('\t')
+    # Interleave sources and targets so that IDs follow the order of first appearance
+    ends = [None] * (2 * len(lines))
+    ends[0::2] = fields[0::3]
+    ends[1::2] = fields[2::3]
+    endIds = np.array(intern(ends, ids), dtype = np.int32)
+    edgeSrc = endIds[0::2].copy()
+    edgeTgt = endIds[1::2].copy()
+    edgeLabel = np.array(intern(fields[1::3], labelIds), dtype = np.int32)
+  # General case: space-separated lines, several targets per line or isolated nodes
+  else:
+    edgeSrc = []
+    edgeTgt = []
+    edgeLabel = []
+    for line in lines:
+      if line.isspace():
+        continue
+      src, label, tgts = parseLine(line)
+      s = ids.setdefault(src, len(ids))
+      if len(tgts) > 0:
+        l = labelIds.setdefault(label, len(labelIds))
+        for t in intern(tgts, ids):
+          edgeSrc.append(s)
+          edgeTgt.append(t)
+          edgeLabel.append(l)
+    edgeSrc = np.array(edgeSrc, dtype = np.int32)
+    edgeTgt = np.array(edgeTgt, dtype = np.int32)
+    edgeLabel = np.array(edgeLabel, dtype = np.int32)
+  names = list(ids)
+  labels = list(labelIds)
+  return SIFGraph(names, labels, edgeSrc, edgeTgt, edgeLabel)
+
+
+
+def cacheFileName(sifFileName):
+  """Name of the binary cache file of a SIF file"""
+  root, ext = os.path.splitext(sifFileName)
+  return (root if ext == '.sif' else sifFileName) + CACHE_EXTENSION
+
+def hashFile(fileName):
+  """SHA-256 of the content of a file"""
+  h = hashlib.sha256()
+  with open(fileName, 'rb') as f:
+    for chunk in iter(lambda: f.read(1 << 20), b''):
+      h.update(chunk)
+  return h.hexdigest()
+
+def joinNames(names):
+  """Encode a list of names (without line returns) as UTF-8 bytes"""
+  return np.frombuffer('\n'.join(names).encode('utf-8'), dtype = np.uint8)
+
+def splitNames(data, count):
+  """Decode a list of count names from UTF-8 bytes"""
+  return bytes(data).decode('utf-8').split('\n') if count > 0 else []
+
+def saveCache(graph, fileName, sifHash):
+  """Write the binary cache file of a graph (atomically: written aside, then renamed)"""
+  arrays = [('names', 'u1', joinNames(graph.names)), ('labels', 'u1', joinNames(graph.labels))]
+  arrays += [(name, dtype, getattr(graph, name)) for name, dtype in CACHE_ARRAYS]
+  # Offsets relative to the end of the header, whose length is only known once the offsets are
+  description = {'sha256': sifHash, 'numNodes': graph.numNodes(), 'numEdges': graph.numEdges(),
+    'numLabels': len(graph.labels), 'arrays': {}}
+  offset = 0
+  for name, dtype, array in arrays:
+    description['arrays'][name] = [dtype, offset, len(array)]
+    offset += -(-len(array) * np.dtype(dtype).itemsize // CACHE_ALIGN) * CACHE_ALIGN
+  header = json.dumps(description, sort_keys = True).encode('utf-8')
+  prefix = CACHE_MAGIC + struct.pack('<II', CACHE_VERSION, len(header)) + header
+  start = -(-len(prefix) // CACHE_ALIGN) * CACHE_ALIGN
+  tmpFileName = '{}.{}.tmp'.format(fileName, os.getpid())
+  try:
+    with open(tmpFileName, 'wb') as cacheFile:
+      cacheFile.write(prefix.ljust(start, b'\0'))
+      for name, dtype, array in arrays:
+        cacheFile.seek(start + description['arrays'][name][1])
+        cacheFile.write(np.ascontiguousarray(array, dtype = dtype).tobytes())
+      cacheFile.truncate(start + offset)
+    os.replace(tmpFileName, fileName)
+  finally:
+    if os.path.exists(tmpFileName):
+      os.remove(tmpFileName)
+
+def loadCache(fileName, sifHash):
+  """Load a graph from its binary cache file, memory-mapped; None if the file is missing,
+  invalid, or built from another version of the SIF file (other SHA-256 than sifHash)"""
+  try:
+    with open(fileName, 'rb') as cacheFile:
+      data = mmap.mmap(cacheFile.fileno(), 0, access = mmap.ACCESS_READ)
+  except (OSError, ValueError):
+    return None
+  try:
+    if data[:4] != CACHE_MAGIC:
+      return None
+    version, headerLength = struct.unpack('<II', data[4:12])
+    if version != CACHE_VERSION:
+      return None
+    description = json.loads(data[12:12 + headerLength].decode('utf-8'))
+    if description['sha256'] != sifHash:
+      return None
+    start = -(-(12 + headerLength) // CACHE_ALIGN) * CACHE_ALIGN
+    arrays = {name: np.frombuffer(data, dtype = dtype, count = count, offset = start + offset)
+      for name, (dtype, offset, count) in description['arrays'].items()}
+    names = splitNames(arrays['names'], description['numNodes'])
+    labels = splitNames(arrays['labels'], description['numLabels'])
+  except (ValueError, KeyError, TypeError, struct.error):
+    return None
+  if len(names) != description['numNodes'] or len(labels) != description['numLabels']:
+    return None
+  return SIFGraph(names, labels, arrays['edgeSrc'], arrays['edgeTgt'], arrays['edgeLabel'], arrays)
+
+def loadCached(sifFileName):
+  """Load a SIF file through its binary cache file, rebuilt if the SIF file changed
+  (the graph is still loaded if the cache file cannot be written)"""
+  sifHash = hashFile(sifFileName)
+  graph = loadCache(cacheFileName(sifFileName), sifHash)
+  if graph is None:
+    graph = parse(sifFileName)
+    try:
+      saveCache(graph, cacheFileName(sifFileName), sifHash)
+    except OSError:
+      pass
+  return graph
@@ -0,0 +1,19 @@
+# Configuration of the tests of the pipeline
+# ------------------------------------------
+# This file is part of the Supplementary Material of the submission entitled:
+# A pipeline to create predictive functional networks: application to the tumor progression of hepatocellular carcinoma
+# Authors: Maxime Folschette, Vincent Legagneux, Arnaud Poret, Lokmane Chebouba, Carito Guziolowski and Nathalie Théret
+###
+# Tests of the shared library (supmat/lib) and of the libraries of the cross-validation
+# (supmat/4-validation/scripts), imported as the scripts import them
+###
+# Usage (from key-pipeline):
+#   python3 -m pytest tests
+###
+
+import os
+import sys
+
+SUPMAT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'supmat')
+sys.path.insert(0, os.path.join(SUPMAT_DIR, 'lib'))
+sys.path.insert(0, os.path.join(SUPMAT_DIR, '4-validation', 'scripts'))
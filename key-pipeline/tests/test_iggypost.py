@@ -0,0 +1,37 @@
+# Tests of the threshold sweep of the post-processing of Iggy's output (supmat/lib/iggypost.py)
+
+import collections
+import numpy as np
+import iggypost
+
+# Observations and predictions, and fold-changes of the ICGC data (F has none, G is not found)
+ROWS = [['A', 'pred:+'], ['B', 'pred:-'], ['C', 'pred:NOT+'], ['D', 'obs:+'], ['E', 'pred:0'],
+  ['F', 'pred:CHANGE'], ['G', 'pred:+'], ['H', 'obs:-'], ['I', 'pred:NOT-']]
+DATA_FC = {'A': '2.5', 'B': '-1.0', 'C': '0.2', 'D': '-3.0', 'E': '0', 'F': 'nan', 'H': '-0.5', 'I': '0.5'}
+
+def testSweepCountsAtZeroThresholds():
+  groups, notFound = iggypost.foldChangeGroups(ROWS, DATA_FC, False)
+  counts = iggypost.sweepCounts(groups, [0], [0])
+  assert notFound == 1
+  assert {key: int(n[0]) for key, n in counts.items() if n[0] > 0} == {
+    ('pred', 'match'): 3,        # A (+), B (-), E (0)
+    ('pred', 'weak-match'): 1,   # I (+ for NOT-)
+    ('pred', 'no-match'): 2,     # C (+ for NOT+), F (0 for CHANGE)
+    ('obs', 'match'): 1,         # H (-)
+    ('obs', 'no-match'): 1}      # D (- for +)
+
+def testSweepCountsAsCompareRows():
+  # Each pair of thresholds gives the same counts as the comparison of the genes one by one
+  downTs = [-2, -1, -0.5, 0, 0, 0.2]
+  upTs = [2, 1, 0.5, 0, 0.3, 0.2]
+  groups, _ = iggypost.foldChangeGroups(ROWS, DATA_FC, False)
+  counts = iggypost.sweepCounts(groups, downTs, upTs)
+  for i, (downT, upT) in enumerate(zip(downTs, upTs)):
+    expected = collections.Counter(tuple(row[4].split(':')) for row in
+      iggypost.compareRows(ROWS, DATA_FC, downT, upT, False) if row[2] != 'not-found')
+    assert {key: int(n[i]) for key, n in counts.items() if n[i] > 0} == dict(expected)
+
+def testSweepCountsWithoutGroups():
+  counts = iggypost.sweepCounts({}, [0, 1], [0, 1])
+  assert sorted(counts) == sorted((infoIggy, comp) for infoIggy in ['pred', 'obs'] for comp in iggypost.COMPARISONS)
+  assert all(np.array_equal(n, [0, 0]) for n in counts.values())
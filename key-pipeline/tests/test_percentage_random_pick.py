@@ -0,0 +1,21 @@
+# Tests of the adaptive number of runs of the cross-validation
+# (supmat/4-validation/scripts/percentage_random_pick.py)
+
+import pytest
+import percentage_random_pick as prp
+
+def testConfidenceHalfWidth():
+  # t(1) × √2 / √2 (sample standard deviation √2)
+  assert prp.confidenceHalfWidth([1, 3]) == pytest.approx(12.706)
+  # t(4) × √2.5 / √5
+  assert prp.confidenceHalfWidth([1, 2, 3, 4, 5]) == pytest.approx(2.776 * 2.5 ** .5 / 5 ** .5)
+  # Normal quantile above 30 degrees of freedom
+  assert prp.confidenceHalfWidth([0, 1] * 20) == pytest.approx(1.960 * (10 / 39) ** .5 / 40 ** .5)
+
+def testIsPrecise():
+  assert not prp.isPrecise([10], 1)
+  # Half-width 12.706 × 0.5 ≈ 6.35 around the mean 10.5
+  assert not prp.isPrecise([10, 11], .6)
+  assert prp.isPrecise([10, 11], .61)
+  # A constant sample is precise, whatever the tolerance
+  assert prp.isPrecise([3, 3, 3], 1e-9)
@@ -0,0 +1,41 @@
+# Tests of the bit matrices of the predictions of the runs (supmat/4-validation/scripts/predbits.py)
+
+import numpy as np
+import predbits
+
+def testPopcount():
+  a = np.array([[0x00, 0xff], [0x81, 0x10]], dtype = np.uint8)
+  assert predbits.popcount(a).tolist() == [8, 3]
+  assert predbits.popcount(a, None) == 11
+
+def makeBits():
+  """Predictions of 10 runs (2 bytes per gene): A is + in runs 0-4 and - in runs 5-9,
+  B is + in runs 0-1, C (missing from the graph) is - in run 9"""
+  bits = predbits.PredictionBits(['A', 'B'], predbits.PRED_TYPES, 10)
+  for r in range(10):
+    rows = [['A', 'pred:+' if r < 5 else 'pred:-', '1.0']]
+    if r < 2:
+      rows.append(['B', 'pred:+', '0.5'])
+    if r == 9:
+      rows.append(['C', 'pred:-', '-2.0'])
+    bits.addRun(r, rows)
+  return bits
+
+def testCounts():
+  bits = makeBits()
+  assert bits.names == ['A', 'B', 'C']
+  counts = bits.counts()
+  assert counts[bits.typeIndex['+']].tolist() == [5, 2, 0]
+  assert counts[bits.typeIndex['-']].tolist() == [5, 0, 1]
+  assert bits.counts([0, 1, 9])[bits.typeIndex['+']].tolist() == [2, 2, 0]
+
+def testOverlaps():
+  bits = makeBits()
+  # Consensus (half of the runs): {A+, B+} for runs 0-1, {A-} for runs 5-8, {A-, C-} for runs 8-9,
+  # and no prediction for an empty set of runs
+  jaccard = bits.overlaps([[0, 1], [5, 6, 7, 8], [8, 9], []])
+  assert np.allclose(jaccard, [
+    [1, 0, 0, 0],
+    [0, 1, .5, 0],
+    [0, .5, 1, 0],
+    [0, 0, 0, 1]])
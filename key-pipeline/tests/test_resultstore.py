@@ -0,0 +1,57 @@
+# Tests of the parse cache of the results of the cross-validation (supmat/4-validation/scripts/resultstore.py)
+
+import os
+import resultstore
+
+RESULT = ('-e gene\tpred&obs\tdiffexp-icgc\tobs-icgc\tcomp\n'
+  'SNAI1\tpred:+\t1.5\ticgc:+\tpred:match\n'
+  'CDH1\tpred:-\t-0.2\ticgc:0\tpred:no-match\n'
+  'TGFB1\tobs:+\t2.0\ticgc:+\tobs:match\n')
+
+def writeRun(tmp_path, runName, content, mtime):
+  runDir = tmp_path / runName
+  runDir.mkdir(parents = True, exist_ok = True)
+  (runDir / 'result-0.0.tsv').write_text(content)
+  os.utime(str(runDir / 'result-0.0.tsv'), ns = (mtime, mtime))
+
+def loadRun(tmp_path, runName):
+  """Prediction rows of a run read through the cache, and whether the cache was modified"""
+  results = resultstore.DirResults(str(tmp_path))
+  rows = results.loadResult(runName)
+  modified = results.cache.modified
+  results.close()
+  return rows, modified
+
+def testParseCacheReused(tmp_path):
+  writeRun(tmp_path, 'prp010/1', RESULT, 10 ** 18)
+  expected = [['SNAI1', 'pred:+', '1.5'], ['CDH1', 'pred:-', '-0.2']]
+  assert loadRun(tmp_path, 'prp010/1') == (expected, True)
+  assert os.path.isfile(str(tmp_path / resultstore.CACHE_FILE_NAME))
+  # Parsed once: read from the cache file by the next scripts
+  assert loadRun(tmp_path, 'prp010/1') == (expected, False)
+
+def testParseCacheInvalidated(tmp_path):
+  writeRun(tmp_path, 'prp010/1', RESULT, 10 ** 18)
+  loadRun(tmp_path, 'prp010/1')
+  # Same size, other modification time: parsed again
+  changed = RESULT.replace('pred:+\t1.5', 'pred:0\t1.5')
+  writeRun(tmp_path, 'prp010/1', changed, 10 ** 18 + 1)
+  assert loadRun(tmp_path, 'prp010/1') == ([['SNAI1', 'pred:0', '1.5'], ['CDH1', 'pred:-', '-0.2']], True)
+  # Same modification time, other size: parsed again
+  writeRun(tmp_path, 'prp010/1', RESULT + 'ZEB1\tpred:+\t0.7\ticgc:+\tpred:match\n', 10 ** 18 + 1)
+  assert loadRun(tmp_path, 'prp010/1')[0][-1] == ['ZEB1', 'pred:+', '0.7']
+
+def testParseCacheUnreadable(tmp_path):
+  (tmp_path / resultstore.CACHE_FILE_NAME).write_bytes(b'not a cache')
+  writeRun(tmp_path, 'prp010/1', RESULT, 10 ** 18)
+  assert loadRun(tmp_path, 'prp010/1') == ([['SNAI1', 'pred:+', '1.5'], ['CDH1', 'pred:-', '-0.2']], True)
+
+def testStoreRemoveRun(tmp_path):
+  store = resultstore.StoreResults(str(tmp_path / resultstore.STORE_FILE_NAME))
+  store.addRun('prp010/1', [('TGFB1', '+')], [['SNAI1', 'pred:+', '1.5']])
+  store.addRun('prp010/2', [('TGFB1', '+')], [], 'timeout')
+  store.removeRun('prp010/1')
+  store.removeRun('prp010/3')
+  assert not store.hasRun('prp010/1')
+  assert store.hasRun('prp010/2') and not store.hasProperResult('prp010/2')
+  store.close()
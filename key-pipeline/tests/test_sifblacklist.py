@@ -0,0 +1,27 @@
+# Tests of the removal of the edges of blacklisted genes (supmat/lib/sifblacklist.py)
+
+import sifblacklist
+
+NETWORK = [
+  'tgfb1_gen\t1\tSMAD2_prot\n',
+  'SMAD2_prot\t1\tSNAI1_gen\n',
+  'ABC-1_gen\t-1\tSNAI1_gen\n',
+  'SMAD2_prot\t1\tSMAD4::SMAD3\n',
+  'SNAI1_gen\t-1\tCDH1_gen\n']
+
+def filterNetwork(tmp_path, names):
+  (tmp_path / 'in.sif').write_text(''.join(NETWORK))
+  counts = sifblacklist.filterSIF(str(tmp_path / 'in.sif'), str(tmp_path / 'out.sif'), sifblacklist.Blacklist(names))
+  return counts, (tmp_path / 'out.sif').read_text()
+
+def testFilterSIF(tmp_path):
+  # TGFB1 matches tgfb1_gen (case-insensitive) and SMAD3 the complex SMAD4::SMAD3,
+  # but ABC does not match ABC-1_gen (unlike grep -w)
+  counts, out = filterNetwork(tmp_path, ['TGFB1', 'SMAD3', 'ABC'])
+  assert counts == (3, 2)
+  assert out == NETWORK[1] + NETWORK[2] + NETWORK[4]
+
+def testFilterSIFEmptyBlacklist(tmp_path):
+  counts, out = filterNetwork(tmp_path, [])
+  assert counts == (5, 0)
+  assert out == ''.join(NETWORK)
@@ -0,0 +1,36 @@
+# Tests of the leases of the spool of the cross-validation (supmat/4-validation/scripts/spool.py)
+
+import os
+import spool
+
+def expireLease(s, claim, age):
+  """Make the lease of a claim look age seconds old (on the clock of the spool)"""
+  t = s.now() - age
+  os.utime(claim.fileName, (t, t))
+
+def testStaleLeaseRequeued(tmp_path):
+  s = spool.Spool(str(tmp_path))
+  s.submit('prp010/1')
+  s.submit('prp010/2')
+  stale = s.claim('host-1')
+  alive = s.claim('host-2')
+  assert (stale.runName, alive.runName) == ('prp010/1', 'prp010/2')
+  expireLease(s, stale, 100)
+  assert s.requeueStale(60) == [('prp010/1', 'host-1', 1)]
+  # The worker of the stale lease has lost it, the job can be claimed again
+  assert not s.heartbeat(stale)
+  assert s.heartbeat(alive)
+  again = s.claim('host-3')
+  assert again.runName == 'prp010/1'
+  expireLease(s, again, 100)
+  assert s.requeueStale(60) == [('prp010/1', 'host-3', 2)]
+
+def testRecentLeaseKept(tmp_path):
+  s = spool.Spool(str(tmp_path))
+  s.submit('prp010/1')
+  claim = s.claim('host-1')
+  expireLease(s, claim, 30)
+  assert s.requeueStale(60) == []
+  s.complete(claim, 'prp010/1.host-1.tmp', None)
+  assert s.collect() == [('prp010/1', 'prp010/1.host-1.tmp', None)]
+  assert s.claim('host-2') is None